@@ -1,4 +1,16 @@
 # Import all models for easy access
+from .image import ImageVariant
 from .user import User, UserCreate, UserUpdate, UserAuth, UserResponse, Token, TokenData, UserRole
-from .audio import Album, AlbumCreate, Song, SongCreate, PodcastShow, PodcastShowCreate, PodcastEpisode, PodcastEpisodeCreate
-from .blog import BlogPost, BlogPostCreate, BlogPostUpdate, ArtistPost, ArtistPostCreate, ArtistPostUpdate
+from .audio import (
+    Album, AlbumCreate, Song, SongSummary, SongCreate, PodcastShow, PodcastShowCreate,
+    PodcastEpisode, PodcastEpisodeSummary, PodcastEpisodeCreate
+)
+from .blog import (
+    BlogPost, BlogPostSummary, BlogPostCreate, BlogPostUpdate,
+    ArtistPost, ArtistPostSummary, ArtistPostCreate, ArtistPostUpdate
+)
+from .upload import (
+    UploadKind, UploadStatus, UploadSession, UploadSessionCreate, UploadSessionProgress,
+    DirectUpload, DirectUploadCreate, DirectUploadGrant, DirectUploadComplete
+)
+from .job import JobStatus, Job
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 import uuid
 from datetime import datetime
+from .image import ImageVariant
 
 # Album model
 class Album(BaseModel):
@@ -9,6 +10,7 @@ class Album(BaseModel):
     title: str
     artist_id: str
     cover_art_url: Optional[str] = None
+    cover_art_variants: List[ImageVariant] = []
     release_date: Optional[datetime] = None
     description: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -30,10 +32,27 @@ class Song(BaseModel):
     album_id: Optional[str] = None
     file_path: str
     duration: Optional[float] = None
+    file_size: Optional[int] = None  # bytes, filled in from the upload
+    mime_type: Optional[str] = None
+    bitrate: Optional[int] = None  # kbps
+    sample_rate: Optional[int] = None  # Hz
+    loudness: Optional[float] = None  # Integrated loudness, LUFS
+    loudness_range: Optional[float] = None  # LU
+    true_peak: Optional[float] = None  # dBFS
     track_number: Optional[int] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Song summary model (list views)
+class SongSummary(BaseModel):
+    id: str
+    title: str
+    artist_id: str
+    album_id: Optional[str] = None
+    file_path: str
+    duration: Optional[float] = None
+    track_number: Optional[int] = None
+
 # Song creation model
 class SongCreate(BaseModel):
     title: str
@@ -50,6 +69,7 @@ class PodcastShow(BaseModel):
     host_id: str
     description: str
     cover_art_url: Optional[str] = None
+    cover_art_variants: List[ImageVariant] = []
     category: Optional[str] = None
     is_original: bool = False  # Whether it's an "IYR Original"
     is_classic: bool = False   # Whether it's an "IYR Classic"
@@ -74,11 +94,29 @@ class PodcastEpisode(BaseModel):
     description: str
     file_path: str
     duration: Optional[float] = None
+    file_size: Optional[int] = None  # bytes, filled in from the upload
+    mime_type: Optional[str] = None
+    bitrate: Optional[int] = None  # kbps
+    sample_rate: Optional[int] = None  # Hz
+    loudness: Optional[float] = None  # Integrated loudness, LUFS
+    loudness_range: Optional[float] = None  # LU
+    true_peak: Optional[float] = None  # dBFS
     published_at: datetime = Field(default_factory=datetime.utcnow)
     episode_number: Optional[int] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
+# Podcast episode summary model (list views)
+class PodcastEpisodeSummary(BaseModel):
+    id: str
+    show_id: str
+    title: str
+    excerpt: Optional[str] = None  # Start of the description, stored on write
+    file_path: str
+    duration: Optional[float] = None
+    published_at: datetime
+    episode_number: Optional[int] = None
+
 # Podcast episode creation model
 class PodcastEpisodeCreate(BaseModel):
     show_id: str
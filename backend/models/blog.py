@@ -15,6 +15,15 @@ class BlogPost(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
+# Blog post summary model (list views)
+class BlogPostSummary(BaseModel):
+    id: str
+    title: str
+    excerpt: Optional[str] = None  # Start of the content, stored on write
+    author_id: str
+    featured_image_url: Optional[str] = None
+    published_at: Optional[datetime] = None
+
 # Blog post creation model
 class BlogPostCreate(BaseModel):
     title: str
@@ -44,6 +53,15 @@ class ArtistPost(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+# Artist blog post summary model (list views)
+class ArtistPostSummary(BaseModel):
+    id: str
+    artist_id: str
+    title: str
+    excerpt: Optional[str] = None  # Start of the content, stored on write
+    featured_image_url: Optional[str] = None
+    published_at: Optional[datetime] = None
+
 # Artist blog post creation model
 class ArtistPostCreate(BaseModel):
     artist_id: str
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+# Resized WebP rendition of an uploaded image
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    url: str
+    size: int
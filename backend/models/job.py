@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Any, Dict
+from enum import Enum
+import uuid
+from datetime import datetime
+
+# Background job status
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+# Background job model
+class Job(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    type: str
+    key: Optional[str] = None  # Idempotency key; enqueueing the same key again returns this job
+    user_id: Optional[str] = None
+    payload: Dict[str, Any] = {}
+    status: JobStatus = JobStatus.QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
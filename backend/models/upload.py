@@ -0,0 +1,86 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+from enum import Enum
+import uuid
+from datetime import datetime
+
+# Kinds of media that can be uploaded through a resumable session
+class UploadKind(str, Enum):
+    MUSIC = "music"
+    PODCAST = "podcast"
+
+# Upload session status
+class UploadStatus(str, Enum):
+    UPLOADING = "uploading"
+    COMPLETE = "complete"
+
+# Resumable upload session model
+class UploadSession(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    kind: UploadKind
+    filename: str
+    target_path: str  # Path relative to public_html once finalized
+    total_size: int
+    received_ranges: List[List[int]] = []  # [start, end) byte ranges written so far
+    status: UploadStatus = UploadStatus.UPLOADING
+    sha256: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+# Upload session creation model
+class UploadSessionCreate(BaseModel):
+    kind: UploadKind
+    filename: str
+    total_size: int = Field(gt=0)
+    artist_name: Optional[str] = None
+    album_name: Optional[str] = None
+    show_name: Optional[str] = None
+
+# Upload session progress model
+class UploadSessionProgress(BaseModel):
+    id: str
+    kind: UploadKind
+    filename: str
+    total_size: int
+    received_bytes: int
+    missing_ranges: List[List[int]]
+    status: UploadStatus
+
+# Direct-to-storage upload model
+class DirectUpload(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    kind: UploadKind
+    filename: str
+    target_path: str  # Storage key the file ends up at
+    total_size: int
+    sha256: str
+    status: UploadStatus = UploadStatus.UPLOADING
+    expires_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+# Direct upload creation model
+class DirectUploadCreate(UploadSessionCreate):
+    sha256: str = Field(pattern=r"^[0-9a-f]{64}$")  # Checked by the store (S3) or on completion (local)
+
+# Where and how to send the file for a direct upload
+class DirectUploadGrant(BaseModel):
+    id: str
+    method: str = "PUT"
+    url: str
+    headers: Dict[str, str] = {}
+    expires_at: datetime
+
+# Song or episode to register when a direct upload completes
+class DirectUploadComplete(BaseModel):
+    title: Optional[str] = None  # Nothing is registered without a title
+    artist_id: Optional[str] = None  # Music; defaults to the current user
+    album_id: Optional[str] = None
+    track_number: Optional[int] = None
+    show_id: Optional[str] = None  # Podcast
+    description: Optional[str] = None
+    episode_number: Optional[int] = None
+    published_at: Optional[datetime] = None
+    duration: Optional[float] = None
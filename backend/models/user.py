@@ -3,6 +3,7 @@ from typing import Optional, List
 from enum import Enum
 import uuid
 from datetime import datetime
+from .image import ImageVariant
 
 # Define the different user roles
 class UserRole(str, Enum):
@@ -20,7 +21,9 @@ class User(BaseModel):
     full_name: Optional[str] = None
     role: UserRole = UserRole.MEMBER
     profile_image_url: Optional[str] = None
+    profile_image_variants: List[ImageVariant] = []
     cover_image_url: Optional[str] = None
+    cover_image_variants: List[ImageVariant] = []
     bio: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -69,6 +72,7 @@ class UserResponse(BaseModel):
     full_name: Optional[str] = None
     role: UserRole
     profile_image_url: Optional[str] = None
+    profile_image_variants: List[ImageVariant] = []
     bio: Optional[str] = None
     created_at: datetime
     
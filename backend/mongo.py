@@ -0,0 +1,117 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+import importlib.util
+import logging
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from pymongo import read_preferences
+
+from mongo_metrics import mongo_metrics
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection settings
+mongo_url = os.environ['MONGO_URL']
+DB_NAME = os.environ.get('DB_NAME', 'itsyourradio_db')
+
+# Connection pool. Requests that can't get a connection within the wait
+# queue timeout fail fast (and get a 503) instead of piling up.
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 10))  # Kept open (and warmed) by the driver
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+
+# Timeouts
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 30000))
+
+# Wire compression, in order of preference; ones whose library isn't installed are skipped
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zstd,snappy,zlib')
+
+# Read preference for public reads (listings, feeds, the search index). Secondary
+# reads can lag writes, and a lagging read right after an invalidation would be
+# cached, so they are opt-in and bounded by a staleness limit.
+MONGO_PUBLIC_READ_PREFERENCE = os.environ.get('MONGO_PUBLIC_READ_PREFERENCE', 'primary')
+MONGO_MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', 90))
+
+# Library each compressor needs
+_COMPRESSOR_MODULES = {'zstd': 'zstandard', 'snappy': 'snappy', 'zlib': 'zlib'}
+
+_READ_PREFERENCES = {
+    'primary': read_preferences.Primary,
+    'primaryPreferred': read_preferences.PrimaryPreferred,
+    'secondary': read_preferences.Secondary,
+    'secondaryPreferred': read_preferences.SecondaryPreferred,
+    'nearest': read_preferences.Nearest,
+}
+
+
+def available_compressors(names: str):
+    """The configured compressors whose library is installed."""
+    compressors = []
+    for name in (name.strip() for name in names.split(',')):
+        module = _COMPRESSOR_MODULES.get(name)
+        if module and importlib.util.find_spec(module) is not None:
+            compressors.append(name)
+        elif name:
+            logger.info("MongoDB %s compression is not available, skipping it", name)
+    return compressors
+
+
+def read_preference(name: str):
+    """Build a read preference from its name, bounding staleness for secondary reads."""
+    if name not in _READ_PREFERENCES:
+        raise ValueError(f"Unknown MongoDB read preference: {name}")
+    if name == 'primary':
+        return read_preferences.Primary()
+    return _READ_PREFERENCES[name](max_staleness=MONGO_MAX_STALENESS_SECONDS)
+
+
+def create_client(url: str = mongo_url) -> AsyncIOMotorClient:
+    """Create the Motor client with the configured pool, timeouts, compression and metrics."""
+    options = {}
+    if compressors:
+        options['compressors'] = ','.join(compressors)
+    return AsyncIOMotorClient(
+        url,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        event_listeners=[mongo_metrics],
+        **options
+    )
+
+
+def pool_stats():
+    """Get the pool configuration alongside the driver metrics."""
+    return {
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+        "wait_queue_timeout_ms": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "compressors": compressors,
+        "public_read_preference": MONGO_PUBLIC_READ_PREFERENCE,
+        **mongo_metrics.stats(),
+    }
+
+
+async def check_connection():
+    """Fail startup early if MongoDB can't be reached, and open the first pooled connection."""
+    await client.admin.command('ping')
+
+
+# MongoDB connection shared by the app and its utilities
+compressors = available_compressors(MONGO_COMPRESSORS)
+client = create_client()
+db = client[DB_NAME]
+
+# Same database for public, cacheable reads, which may be served by secondaries
+read_db = client.get_database(DB_NAME, read_preference=read_preference(MONGO_PUBLIC_READ_PREFERENCE))
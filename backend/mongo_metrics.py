@@ -0,0 +1,186 @@
+"""
+MongoDB driver metrics for itsyourradio.
+The driver reports connection pool and command events to listeners
+registered on the client; these are folded into counters so the admin
+metrics show pool saturation (connections checked out against the pool
+size, time spent waiting for one, checkout timeouts) and command latency
+per collection. Events arrive on the driver's worker threads, hence the lock.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+
+from pymongo import monitoring
+
+# Commands slower than this are counted as slow
+MONGO_SLOW_COMMAND_MS = float(os.environ.get("MONGO_SLOW_COMMAND_MS", 100))
+
+
+def _address(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+class _Timing:
+    """Count, total and worst case of a duration."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def stats(self):
+        return {
+            "avg_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max, 2),
+        }
+
+
+class _PoolCounters:
+    """Counters for the connection pool of one server."""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = defaultdict(int)  # reason -> count
+        self.cleared = 0
+        self.wait = _Timing()
+
+    def stats(self):
+        return {
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "checkout_failures": dict(self.checkout_failures),
+            "cleared": self.cleared,
+            "wait": self.wait.stats(),
+        }
+
+
+class _CommandCounters:
+    """Counters for one command against one collection."""
+
+    def __init__(self):
+        self.failed = 0
+        self.slow = 0
+        self.latency = _Timing()
+
+    def stats(self):
+        return {"count": self.latency.count, "failed": self.failed, "slow": self.slow, **self.latency.stats()}
+
+
+class MongoMetrics(monitoring.ConnectionPoolListener, monitoring.CommandListener):
+    """Pool and command listener for the Motor client, reporting through stats()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = defaultdict(_PoolCounters)
+        self._commands = defaultdict(_CommandCounters)  # (collection, command) -> counters
+        self._checkout_started = {}  # thread -> when it asked for a connection
+        self._in_flight = {}  # request id -> (collection, command)
+
+    # Connection pool events
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pools[_address(event.address)].cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pools[_address(event.address)].open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._pools[_address(event.address)].open -= 1
+
+    def connection_check_out_started(self, event):
+        # Checkout blocks the calling thread, so the thread identifies the wait
+        self._checkout_started[threading.get_ident()] = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        started = self._checkout_started.pop(threading.get_ident(), None)
+        with self._lock:
+            pool = self._pools[_address(event.address)]
+            pool.checkout_failures[str(event.reason)] += 1
+            if started is not None:
+                pool.wait.add((time.perf_counter() - started) * 1000)
+
+    def connection_checked_out(self, event):
+        started = self._checkout_started.pop(threading.get_ident(), None)
+        with self._lock:
+            pool = self._pools[_address(event.address)]
+            pool.checkouts += 1
+            pool.checked_out += 1
+            pool.peak_checked_out = max(pool.peak_checked_out, pool.checked_out)
+            if started is not None:
+                pool.wait.add((time.perf_counter() - started) * 1000)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._pools[_address(event.address)].checked_out -= 1
+
+    # Command events
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection")  # getMore names its collection separately
+        self._in_flight[event.request_id] = (target if isinstance(target, str) else "$cmd", event.command_name)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        key = self._in_flight.pop(event.request_id, None)
+        if key is None:
+            return
+        ms = event.duration_micros / 1000
+        with self._lock:
+            command = self._commands[key]
+            command.latency.add(ms)
+            if failed:
+                command.failed += 1
+            if ms >= MONGO_SLOW_COMMAND_MS:
+                command.slow += 1
+
+    def stats(self):
+        """Get pool and per-collection command metrics."""
+        with self._lock:
+            commands = {}
+            for (collection, command_name), command in sorted(self._commands.items()):
+                commands.setdefault(collection, {})[command_name] = command.stats()
+            return {
+                "pools": {address: pool.stats() for address, pool in self._pools.items()},
+                "commands": commands,
+            }
+
+
+mongo_metrics = MongoMetrics()
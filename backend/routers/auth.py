@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from ..models import User, UserCreate, UserResponse, UserAuth, Token
-from ..utils.auth import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from ..utils.auth import verify_password_async, get_password_hash_async, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from motor.motor_asyncio import AsyncIOMotorClient
 import logging
 
@@ -35,7 +35,7 @@ async def register_user(user: UserCreate, db: AsyncIOMotorClient = Depends(lambd
         )
     
     # Create the new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_data = User(
         email=user.email,
         username=user.username,
@@ -60,7 +60,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     user = await db.users.find_one({"email": form_data.username})
     
     # Check if user exists and password is correct
-    if not user or not verify_password(form_data.password, user.get("hashed_password", "")):
+    if not user or not await verify_password_async(form_data.password, user.get("hashed_password", "")):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -1,14 +1,20 @@
 # Import all necessary libraries
 import sys
 from pathlib import Path
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import (
+    FastAPI, APIRouter, Depends, HTTPException, status, File, UploadFile, Request, Response, WebSocket,
+    WebSocketDisconnect, Query
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from pymongo.errors import ServerSelectionTimeoutError, WaitQueueTimeoutError
+from starlette.websockets import WebSocketState
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -22,22 +28,81 @@ load_dotenv(ROOT_DIR / '.env')
 
 # Import models and utilities
 from models.user import User, UserCreate, UserUpdate, UserAuth, UserResponse, Token, TokenData, UserRole
-from models.audio import Album, AlbumCreate, Song, SongCreate, PodcastShow, PodcastShowCreate, PodcastEpisode, PodcastEpisodeCreate
-from models.blog import BlogPost, BlogPostCreate, BlogPostUpdate, ArtistPost, ArtistPostCreate, ArtistPostUpdate
-from utils.auth import verify_password, get_password_hash, create_access_token, get_current_user, get_user_role, has_role
+from models.audio import (
+    Album, AlbumCreate, Song, SongSummary, SongCreate, PodcastShow, PodcastShowCreate,
+    PodcastEpisode, PodcastEpisodeSummary, PodcastEpisodeCreate
+)
+from models.blog import (
+    BlogPost, BlogPostSummary, BlogPostCreate, BlogPostUpdate,
+    ArtistPost, ArtistPostSummary, ArtistPostCreate, ArtistPostUpdate
+)
+from models.upload import (
+    UploadKind, UploadStatus, UploadSession, UploadSessionCreate, UploadSessionProgress,
+    DirectUpload, DirectUploadCreate, DirectUploadGrant, DirectUploadComplete
+)
+from models.job import Job
+from utils.auth import (
+    verify_and_update_password_async, get_password_hash_async, create_access_token, get_current_user, get_user_role,
+    has_role, configure_password_hashing, password_hash_stats, oauth2_scheme, revoke_token
+)
+from utils.token_cache import token_cache
+from utils.user_cache import user_cache
 from utils.default_accounts import ensure_default_accounts
+from utils.uploads import (
+    MAX_IMAGE_UPLOAD_SIZE, MAX_MUSIC_UPLOAD_SIZE, MAX_PODCAST_UPLOAD_SIZE,
+    UploadSizeLimitMiddleware, StoredUpload, safe_filename, safe_path_segment, upload_too_large
+)
+from utils.blobstore import blob_store
+from utils.direct_uploads import (
+    DIRECT_UPLOAD_COMPLETE_GRACE, DIRECT_UPLOAD_EXPIRES, direct_uploads_enabled, receive_direct_upload, schedule_expiry,
+    upload_instructions
+)
+from utils.storage import storage
+from utils.media import media_file_details, media_key, media_response, record_media_file
+from utils.media_jobs import enqueue_image_jobs, enqueue_media_jobs
+from utils.images import IMAGE_URL_FIELDS, attach_image_variants, image_variants, pick_variant, shutdown_image_pool
+from utils.jobs import job_queue
+from utils.waveform import waveform_response
+from utils.indexes import ensure_indexes, index_report
+from utils.pagination import PageParams, paginate, set_pagination_headers
+from utils.now_playing import now_playing_engine, STREAM_HEARTBEAT_INTERVAL, STREAM_SEND_TIMEOUT
+from utils.etag import ETagMiddleware
+from utils.fast_json import ViewParams, check_fast_models, fast_projection, json_response, register_fast_models
+from utils.excerpts import enqueue_excerpt_backfill, make_excerpt
+from utils.response_cache import response_cache
+from utils.search import SEARCH_MAX_LIMIT, SEARCH_TYPES, search_index
+from utils.rss import EPISODE_FEED_FIELDS, feed_cache, feed_response, render_podcast_feed
+from utils.resumable import (
+    create_part_file, write_chunk, finalize_part_file, discard_part_file,
+    received_bytes, missing_ranges
+)
 
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'itsyourradio_db')]
+from mongo import MONGO_WAIT_QUEUE_TIMEOUT_MS, check_connection, client, db, pool_stats, read_db
 
 # Create the main app without a prefix
 app = FastAPI(title="ItsYourRadio API")
 
+# A saturated connection pool (or an unreachable database) means try again shortly, not a 500
+@app.exception_handler(WaitQueueTimeoutError)
+@app.exception_handler(ServerSelectionTimeoutError)
+async def database_busy_handler(request: Request, exc: Exception):
+    logger.warning("Database unavailable for %s %s: %s", request.method, request.url.path, exc)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The service is busy, please try again shortly"},
+        headers={"Retry-After": str(max(1, MONGO_WAIT_QUEUE_TIMEOUT_MS // 1000))},
+    )
+
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Response models rendered without per-item validation (checked at startup)
+register_fast_models(
+    UserResponse, Album, Song, SongSummary, ArtistPost, ArtistPostSummary,
+    PodcastShow, PodcastEpisode, PodcastEpisodeSummary, BlogPost, BlogPostSummary
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -48,6 +113,21 @@ logger = logging.getLogger(__name__)
 # --------------------------------
 # User Authentication Routes
 # --------------------------------
+async def authenticate_user(email: str, password: str):
+    """Check a user's credentials, upgrading their stored hash if it is outdated."""
+    user = await db.users.find_one({"email": email})
+    if not user:
+        return None
+    
+    verified, new_hash = await verify_and_update_password_async(password, user.get("hashed_password", ""))
+    if not verified:
+        return None
+    
+    # Rehash transparently when the cost profile has changed
+    if new_hash:
+        await db.users.update_one({"id": user["id"]}, {"$set": {"hashed_password": new_hash}})
+    return user
+
 @api_router.post("/auth/register", response_model=UserResponse)
 async def register_user(user: UserCreate):
     """Register a new user."""
@@ -68,7 +148,7 @@ async def register_user(user: UserCreate):
         )
     
     # Create the new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_data = User(
         email=user.email,
         username=user.username,
@@ -82,6 +162,9 @@ async def register_user(user: UserCreate):
     
     # Insert into database
     await db.users.insert_one(user_dict)
+    search_index.index_document("users", user_dict)
+    if user_dict["role"] == UserRole.ARTIST:
+        await response_cache.invalidate("artists")
     
     # Return the user without the password
     return UserResponse(**user_dict)
@@ -89,11 +172,9 @@ async def register_user(user: UserCreate):
 @api_router.post("/auth/token", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """Generate an access token for a user."""
-    # Find the user
-    user = await db.users.find_one({"email": form_data.username})
-    
     # Check if user exists and password is correct
-    if not user or not verify_password(form_data.password, user.get("hashed_password", "")):
+    user = await authenticate_user(form_data.username, form_data.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -112,11 +193,9 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_auth: UserAuth):
     """Login with email and password."""
-    # Find the user
-    user = await db.users.find_one({"email": user_auth.email})
-    
     # Check if user exists and password is correct
-    if not user or not verify_password(user_auth.password, user.get("hashed_password", "")):
+    user = await authenticate_user(user_auth.email, user_auth.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -132,23 +211,19 @@ async def login(user_auth: UserAuth):
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+@api_router.post("/auth/logout")
+async def logout(token: str = Depends(oauth2_scheme), current_user = Depends(get_current_user)):
+    """Revoke the current access token (in this worker process; the client should discard it too)."""
+    revoke_token(token)
+    return {"message": "Logged out"}
+
 # --------------------------------
 # User Profile Routes
 # --------------------------------
 @api_router.get("/users/me", response_model=UserResponse)
 async def get_current_user_profile(current_user = Depends(get_current_user)):
     """Get the current user's profile."""
-    # For now, return some sample user data
-    return {
-        "id": current_user.get("user_id", "12345"),
-        "email": "user@example.com",
-        "username": "testuser",
-        "full_name": "Test User",
-        "role": current_user.get("role", "member"),
-        "profile_image_url": None,
-        "bio": "This is a test user profile.",
-        "created_at": datetime.utcnow()
-    }
+    return current_user
 
 @api_router.put("/users/me", response_model=UserResponse)
 async def update_user_profile(user_update: UserUpdate, current_user = Depends(get_current_user)):
@@ -157,19 +232,33 @@ async def update_user_profile(user_update: UserUpdate, current_user = Depends(ge
     
     if user_data:
         user_data["updated_at"] = datetime.utcnow()
+        await attach_image_variants(db, "users", user_data)
         await db.users.update_one({"id": current_user["id"]}, {"$set": user_data})
+        for url_field in IMAGE_URL_FIELDS["users"]:
+            if url_field in user_data:
+                await blob_store.track(db, current_user.get(url_field), user_data[url_field])
+        user_cache.invalidate(current_user["id"])
+        feed_cache.invalidate_host(current_user["id"])
+        await response_cache.invalidate(f"artist:{current_user['id']}")
     
     updated_user = await db.users.find_one({"id": current_user["id"]})
+    search_index.index_document("users", updated_user)
     return updated_user
 
 # --------------------------------
 # Admin Routes
 # --------------------------------
 @api_router.get("/admin/users", response_model=List[UserResponse])
-async def get_all_users(current_user = Depends(has_role([UserRole.ADMIN, UserRole.STAFF]))):
-    """Get all users (admin/staff only)."""
-    users = await db.users.find().to_list(1000)
-    return users
+async def get_all_users(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    current_user = Depends(has_role([UserRole.ADMIN, UserRole.STAFF]))
+):
+    """Get all users (admin/staff only), newest first."""
+    users, next_cursor = await paginate(db.users, {}, page, projection=fast_projection(UserResponse))
+    set_pagination_headers(request, response, next_cursor)
+    return json_response(response, List[UserResponse], users)
 
 @api_router.put("/admin/users/{user_id}", response_model=UserResponse)
 async def update_user(
@@ -186,33 +275,72 @@ async def update_user(
     
     if user_data:
         user_data["updated_at"] = datetime.utcnow()
+        await attach_image_variants(db, "users", user_data)
         await db.users.update_one({"id": user_id}, {"$set": user_data})
+        for url_field in IMAGE_URL_FIELDS["users"]:
+            if url_field in user_data:
+                await blob_store.track(db, user.get(url_field), user_data[url_field])
+        user_cache.invalidate(user_id)
+        feed_cache.invalidate_host(user_id)
+        await response_cache.invalidate(f"artist:{user_id}")
     
     updated_user = await db.users.find_one({"id": user_id})
+    search_index.index_document("users", updated_user)
     return updated_user
 
+@api_router.get("/admin/metrics")
+async def get_metrics(current_user = Depends(has_role([UserRole.ADMIN, UserRole.STAFF]))):
+    """Get runtime metrics for the API process (admin/staff only)."""
+    return {
+        "password_hashing": password_hash_stats(),
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "now_playing": now_playing_engine.stats(),
+        "jobs": job_queue.stats(),
+        "search": search_index.stats(),
+        "response_cache": response_cache.stats(),
+        "mongo": pool_stats()
+    }
+
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user = Depends(has_role([UserRole.ADMIN]))):
+    """Report missing, undeclared and unused MongoDB indexes (admin only)."""
+    return await index_report(db)
+
 # --------------------------------
 # Artist Routes
 # --------------------------------
 @api_router.get("/artists", response_model=List[UserResponse])
-async def get_artists():
-    """Get all artists."""
-    artists = await db.users.find({"role": UserRole.ARTIST}).to_list(1000)
-    return artists
+async def get_artists(request: Request, response: Response, page: PageParams = Depends()):
+    """Get all artists, newest first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    artists, next_cursor = await paginate(read_db.users, {"role": UserRole.ARTIST}, page, projection=fast_projection(UserResponse))
+    set_pagination_headers(request, response, next_cursor)
+    tags = ["artists", *(f"artist:{artist['id']}" for artist in artists)]
+    return await response_cache.put(request, response, List[UserResponse], artists, tags)
 
 @api_router.get("/artists/{artist_id}", response_model=UserResponse)
-async def get_artist(artist_id: str):
+async def get_artist(artist_id: str, request: Request, response: Response):
     """Get an artist by ID."""
-    artist = await db.users.find_one({"id": artist_id, "role": UserRole.ARTIST})
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    artist = await read_db.users.find_one({"id": artist_id, "role": UserRole.ARTIST}, fast_projection(UserResponse))
     if not artist:
         raise HTTPException(status_code=404, detail="Artist not found")
-    return artist
+    return await response_cache.put(request, response, UserResponse, artist, [f"artist:{artist_id}"])
 
 @api_router.get("/artists/{artist_id}/albums", response_model=List[Album])
-async def get_artist_albums(artist_id: str):
-    """Get all albums by an artist."""
-    albums = await db.albums.find({"artist_id": artist_id}).to_list(1000)
-    return albums
+async def get_artist_albums(artist_id: str, request: Request, response: Response, page: PageParams = Depends()):
+    """Get all albums by an artist, newest first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    albums, next_cursor = await paginate(read_db.albums, {"artist_id": artist_id}, page, projection=fast_projection(Album))
+    set_pagination_headers(request, response, next_cursor)
+    return await response_cache.put(request, response, List[Album], albums, [f"artist:{artist_id}:albums"])
 
 @api_router.post("/artists/{artist_id}/albums", response_model=Album)
 async def create_album(
@@ -232,18 +360,32 @@ async def create_album(
         artist_id=artist_id,
         title=album.title,
         cover_art_url=album.cover_art_url,
+        cover_art_variants=await image_variants(db, album.cover_art_url),
         release_date=album.release_date,
         description=album.description
     )
     
     await db.albums.insert_one(album_data.dict())
+    search_index.index_document("albums", album_data.dict())
+    await response_cache.invalidate(f"artist:{artist_id}:albums")
+    await blob_store.acquire(db, album_data.cover_art_url)
     return album_data
 
-@api_router.get("/artists/{artist_id}/songs", response_model=List[Song])
-async def get_artist_songs(artist_id: str):
-    """Get all songs by an artist."""
-    songs = await db.songs.find({"artist_id": artist_id}).to_list(1000)
-    return songs
+@api_router.get("/artists/{artist_id}/songs", response_model=Union[List[Song], List[SongSummary]])
+async def get_artist_songs(
+    artist_id: str, request: Request, response: Response,
+    page: PageParams = Depends(), view: ViewParams = Depends()
+):
+    """Get all songs by an artist, newest first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    selected = view.select(Song, SongSummary)
+    songs, next_cursor = await paginate(read_db.songs, {"artist_id": artist_id}, page, projection=selected.projection)
+    set_pagination_headers(request, response, next_cursor)
+    return await response_cache.put(
+        request, response, List[selected.model], songs, [f"artist:{artist_id}:songs"], selected.fields
+    )
 
 @api_router.post("/artists/{artist_id}/songs", response_model=Song)
 async def create_song(
@@ -259,23 +401,48 @@ async def create_song(
             detail="Not authorized to create songs for this artist"
         )
     
+    # Prefer the details measured from the upload over client-supplied values
+    details = await media_file_details(db, song.file_path)
     song_data = Song(
         artist_id=artist_id,
         title=song.title,
         album_id=song.album_id,
         file_path=song.file_path,
-        duration=song.duration,
-        track_number=song.track_number
+        track_number=song.track_number,
+        **{**details, "duration": details.get("duration") or song.duration}
     )
     
     await db.songs.insert_one(song_data.dict())
+    search_index.index_document("songs", song_data.dict())
+    await response_cache.invalidate(f"artist:{artist_id}:songs")
     return song_data
 
-@api_router.get("/artists/{artist_id}/posts", response_model=List[ArtistPost])
-async def get_artist_posts(artist_id: str):
-    """Get all blog posts by an artist."""
-    posts = await db.artist_posts.find({"artist_id": artist_id, "is_published": True}).to_list(1000)
-    return posts
+@api_router.get("/artists/{artist_id}/songs/{song_id}/waveform")
+async def get_song_waveform(artist_id: str, song_id: str, request: Request, buckets: Optional[int] = Query(None, ge=1)):
+    """Get precomputed waveform peaks for a song."""
+    song = await db.songs.find_one({"id": song_id, "artist_id": artist_id}, {"file_path": 1})
+    if not song:
+        raise HTTPException(status_code=404, detail="Song not found")
+    return await waveform_response(request, media_key(song["file_path"]), buckets)
+
+@api_router.get("/artists/{artist_id}/posts", response_model=Union[List[ArtistPost], List[ArtistPostSummary]])
+async def get_artist_posts(
+    artist_id: str, request: Request, response: Response,
+    page: PageParams = Depends(), view: ViewParams = Depends()
+):
+    """Get all blog posts by an artist, most recently published first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    selected = view.select(ArtistPost, ArtistPostSummary, sort_field="published_at")
+    posts, next_cursor = await paginate(
+        read_db.artist_posts, {"artist_id": artist_id, "is_published": True}, page,
+        sort_field="published_at", projection=selected.projection
+    )
+    set_pagination_headers(request, response, next_cursor)
+    return await response_cache.put(
+        request, response, List[selected.model], posts, [f"artist:{artist_id}:posts"], selected.fields
+    )
 
 @api_router.post("/artists/{artist_id}/posts", response_model=ArtistPost)
 async def create_artist_post(
@@ -300,34 +467,52 @@ async def create_artist_post(
         published_at=post.published_at or datetime.utcnow()
     )
     
-    await db.artist_posts.insert_one(post_data.dict())
+    await db.artist_posts.insert_one({**post_data.dict(), "excerpt": make_excerpt(post_data.content)})
+    search_index.index_document("artist_posts", post_data.dict())
+    await response_cache.invalidate(f"artist:{artist_id}:posts")
+    await blob_store.acquire(db, post_data.featured_image_url)
     return post_data
 
 # --------------------------------
 # Podcast Routes
 # --------------------------------
 @api_router.get("/podcasts", response_model=List[PodcastShow])
-async def get_podcasts():
-    """Get all podcast shows."""
-    podcasts = await db.podcast_shows.find().to_list(1000)
-    return podcasts
+async def get_podcasts(request: Request, response: Response, page: PageParams = Depends()):
+    """Get all podcast shows, newest first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    podcasts, next_cursor = await paginate(read_db.podcast_shows, {}, page, projection=fast_projection(PodcastShow))
+    set_pagination_headers(request, response, next_cursor)
+    tags = ["podcasts", *(f"show:{podcast['id']}" for podcast in podcasts)]
+    return await response_cache.put(request, response, List[PodcastShow], podcasts, tags)
 
 @api_router.get("/podcasts/originals", response_model=List[PodcastShow])
-async def get_original_podcasts():
-    """Get all IYR Original podcast shows."""
-    podcasts = await db.podcast_shows.find({"is_original": True}).to_list(1000)
-    return podcasts
+async def get_original_podcasts(request: Request, response: Response, page: PageParams = Depends()):
+    """Get all IYR Original podcast shows, newest first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    podcasts, next_cursor = await paginate(read_db.podcast_shows, {"is_original": True}, page, projection=fast_projection(PodcastShow))
+    set_pagination_headers(request, response, next_cursor)
+    tags = ["podcasts", *(f"show:{podcast['id']}" for podcast in podcasts)]
+    return await response_cache.put(request, response, List[PodcastShow], podcasts, tags)
 
 @api_router.get("/podcasts/classics", response_model=List[PodcastShow])
-async def get_classic_podcasts():
-    """Get all IYR Classic podcast shows."""
-    podcasts = await db.podcast_shows.find({"is_classic": True}).to_list(1000)
-    return podcasts
+async def get_classic_podcasts(request: Request, response: Response, page: PageParams = Depends()):
+    """Get all IYR Classic podcast shows, newest first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    podcasts, next_cursor = await paginate(read_db.podcast_shows, {"is_classic": True}, page, projection=fast_projection(PodcastShow))
+    set_pagination_headers(request, response, next_cursor)
+    tags = ["podcasts", *(f"show:{podcast['id']}" for podcast in podcasts)]
+    return await response_cache.put(request, response, List[PodcastShow], podcasts, tags)
 
 @api_router.get("/podcasts/{show_id}", response_model=PodcastShow)
 async def get_podcast(show_id: str):
     """Get a podcast show by ID."""
-    podcast = await db.podcast_shows.find_one({"id": show_id})
+    podcast = await read_db.podcast_shows.find_one({"id": show_id})
     if not podcast:
         raise HTTPException(status_code=404, detail="Podcast show not found")
     return podcast
@@ -343,19 +528,32 @@ async def create_podcast(
         title=podcast.title,
         description=podcast.description,
         cover_art_url=podcast.cover_art_url,
+        cover_art_variants=await image_variants(db, podcast.cover_art_url),
         category=podcast.category,
         is_original=podcast.is_original,
         is_classic=podcast.is_classic
     )
     
     await db.podcast_shows.insert_one(podcast_data.dict())
+    search_index.index_document("podcast_shows", podcast_data.dict())
+    await response_cache.invalidate("podcasts")
+    await blob_store.acquire(db, podcast_data.cover_art_url)
+    feed_cache.invalidate(podcast_data.id)
     return podcast_data
 
-@api_router.get("/podcasts/{show_id}/episodes", response_model=List[PodcastEpisode])
-async def get_podcast_episodes(show_id: str):
-    """Get all episodes for a podcast show."""
-    episodes = await db.podcast_episodes.find({"show_id": show_id}).to_list(1000)
-    return episodes
+@api_router.get("/podcasts/{show_id}/episodes", response_model=Union[List[PodcastEpisode], List[PodcastEpisodeSummary]])
+async def get_podcast_episodes(
+    show_id: str, request: Request, response: Response,
+    page: PageParams = Depends(), view: ViewParams = Depends()
+):
+    """Get all episodes for a podcast show, most recently published first."""
+    selected = view.select(PodcastEpisode, PodcastEpisodeSummary, sort_field="published_at")
+    episodes, next_cursor = await paginate(
+        read_db.podcast_episodes, {"show_id": show_id}, page,
+        sort_field="published_at", projection=selected.projection
+    )
+    set_pagination_headers(request, response, next_cursor)
+    return json_response(response, List[selected.model], episodes, selected.fields)
 
 @api_router.post("/podcasts/{show_id}/episodes", response_model=PodcastEpisode)
 async def create_podcast_episode(
@@ -376,35 +574,60 @@ async def create_podcast_episode(
             detail="Not authorized to create episodes for this podcast"
         )
     
+    # Prefer the details measured from the upload over client-supplied values
+    details = await media_file_details(db, episode.file_path)
     episode_data = PodcastEpisode(
         show_id=show_id,
         title=episode.title,
         description=episode.description,
         file_path=episode.file_path,
-        duration=episode.duration,
+        **{**details, "duration": details.get("duration") or episode.duration},
         published_at=episode.published_at or datetime.utcnow(),
         episode_number=episode.episode_number
     )
     
-    await db.podcast_episodes.insert_one(episode_data.dict())
+    await db.podcast_episodes.insert_one({**episode_data.dict(), "excerpt": make_excerpt(episode_data.description)})
+    search_index.index_document("podcast_episodes", episode_data.dict())
+    feed_cache.invalidate(show_id)
     return episode_data
 
+@api_router.get("/podcasts/{show_id}/episodes/{episode_id}/waveform")
+async def get_episode_waveform(show_id: str, episode_id: str, request: Request, buckets: Optional[int] = Query(None, ge=1)):
+    """Get precomputed waveform peaks for a podcast episode."""
+    episode = await db.podcast_episodes.find_one({"id": episode_id, "show_id": show_id}, {"file_path": 1})
+    if not episode:
+        raise HTTPException(status_code=404, detail="Podcast episode not found")
+    return await waveform_response(request, media_key(episode["file_path"]), buckets)
+
 # --------------------------------
 # Blog Routes
 # --------------------------------
-@api_router.get("/blog", response_model=List[BlogPost])
-async def get_blog_posts():
-    """Get all published blog posts."""
-    posts = await db.blog_posts.find({"is_published": True}).sort("published_at", -1).to_list(1000)
-    return posts
+@api_router.get("/blog", response_model=Union[List[BlogPost], List[BlogPostSummary]])
+async def get_blog_posts(
+    request: Request, response: Response, page: PageParams = Depends(), view: ViewParams = Depends()
+):
+    """Get all published blog posts, most recently published first."""
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    selected = view.select(BlogPost, BlogPostSummary, sort_field="published_at")
+    posts, next_cursor = await paginate(
+        read_db.blog_posts, {"is_published": True}, page, sort_field="published_at", projection=selected.projection
+    )
+    set_pagination_headers(request, response, next_cursor)
+    tags = ["blog", *(f"blog:{post['id']}" for post in posts)]
+    return await response_cache.put(request, response, List[selected.model], posts, tags, selected.fields)
 
 @api_router.get("/blog/{post_id}", response_model=BlogPost)
-async def get_blog_post(post_id: str):
+async def get_blog_post(post_id: str, request: Request, response: Response):
     """Get a blog post by ID."""
-    post = await db.blog_posts.find_one({"id": post_id})
+    cached = await response_cache.get(request)
+    if cached is not None:
+        return cached
+    post = await read_db.blog_posts.find_one({"id": post_id}, fast_projection(BlogPost))
     if not post:
         raise HTTPException(status_code=404, detail="Blog post not found")
-    return post
+    return await response_cache.put(request, response, BlogPost, post, [f"blog:{post_id}"])
 
 @api_router.post("/blog", response_model=BlogPost)
 async def create_blog_post(
@@ -421,7 +644,10 @@ async def create_blog_post(
         published_at=post.published_at or datetime.utcnow()
     )
     
-    await db.blog_posts.insert_one(post_data.dict())
+    await db.blog_posts.insert_one({**post_data.dict(), "excerpt": make_excerpt(post_data.content)})
+    search_index.index_document("blog_posts", post_data.dict())
+    await response_cache.invalidate("blog")
+    await blob_store.acquire(db, post_data.featured_image_url)
     return post_data
 
 @api_router.put("/blog/{post_id}", response_model=BlogPost)
@@ -447,11 +673,50 @@ async def update_blog_post(
     
     if post_data:
         post_data["updated_at"] = datetime.utcnow()
+        if "content" in post_data:
+            post_data["excerpt"] = make_excerpt(post_data["content"])
         await db.blog_posts.update_one({"id": post_id}, {"$set": post_data})
+        if "featured_image_url" in post_data:
+            await blob_store.track(db, post.get("featured_image_url"), post_data["featured_image_url"])
+        # Publishing or re-dating a post changes which page of the listing it is on
+        listing_changed = "is_published" in post_data or "published_at" in post_data
+        await response_cache.invalidate(f"blog:{post_id}", *(["blog"] if listing_changed else []))
     
     updated_post = await db.blog_posts.find_one({"id": post_id})
+    search_index.index_document("blog_posts", updated_post)
     return updated_post
 
+# --------------------------------
+# Search Routes
+# --------------------------------
+@api_router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    prefix: bool = True
+):
+    """
+    Search artists, songs, albums, podcasts, episodes and posts. types is a
+    comma-separated subset of the searchable types; with prefix set the last
+    word may be incomplete, for search-as-you-type.
+    """
+    wanted = None
+    if types:
+        wanted = {doc_type.strip() for doc_type in types.split(",") if doc_type.strip()}
+        unknown = wanted - set(SEARCH_TYPES)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown search types: {', '.join(sorted(unknown))} (expected {', '.join(SEARCH_TYPES)})"
+            )
+    
+    return {
+        "query": q,
+        "results": search_index.search(q, wanted, limit, prefix),
+        "complete": search_index.ready
+    }
+
 # --------------------------------
 # File Upload Routes
 # --------------------------------
@@ -461,26 +726,27 @@ async def upload_profile_image(
     current_user = Depends(get_current_user)
 ):
     """Upload a profile image for the current user."""
-    # Create directory if it doesn't exist
-    upload_dir = Path("public_html/uploads/profile_images")
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    # Stream the file into the blob store (identical content is stored once)
+    blob = await blob_store.put(db, file, MAX_IMAGE_UPLOAD_SIZE, Path(safe_filename(file.filename)).suffix)
+    generation = await record_media_file(db, blob.path, blob.stored)
+    jobs = await enqueue_image_jobs(blob.path, blob.stored, generation, current_user["id"])
     
-    # Generate a unique filename
-    filename = f"{current_user['id']}_{datetime.now().strftime('%Y%m%d%H%M%S')}{Path(file.filename).suffix}"
-    file_path = upload_dir / filename
-    
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
-    
-    # Update the user's profile_image_url
-    image_url = f"/uploads/profile_images/{filename}"
+    # Update the user's profile_image_url; resized variants are attached once rendered
+    image_url = blob.url
     await db.users.update_one(
         {"id": current_user["id"]},
-        {"$set": {"profile_image_url": image_url, "updated_at": datetime.utcnow()}}
+        {"$set": {
+            "profile_image_url": image_url,
+            "profile_image_variants": await image_variants(db, image_url),
+            "updated_at": datetime.utcnow(),
+        }}
     )
+    await blob_store.track(db, current_user.get("profile_image_url"), image_url)
+    user_cache.invalidate(current_user["id"])
+    await response_cache.invalidate(f"artist:{current_user['id']}")
+    search_index.index_document("users", {**current_user, "profile_image_url": image_url})
     
-    return {"filename": filename, "url": image_url}
+    return {"filename": Path(blob.path).name, "url": image_url, "size": blob.stored.size, "sha256": blob.stored.sha256, "jobs": jobs}
 
 @api_router.post("/upload/cover-image")
 async def upload_cover_image(
@@ -488,26 +754,26 @@ async def upload_cover_image(
     current_user = Depends(get_current_user)
 ):
     """Upload a cover image for the current user."""
-    # Create directory if it doesn't exist
-    upload_dir = Path("public_html/uploads/cover_images")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate a unique filename
-    filename = f"{current_user['id']}_{datetime.now().strftime('%Y%m%d%H%M%S')}{Path(file.filename).suffix}"
-    file_path = upload_dir / filename
+    # Stream the file into the blob store (identical content is stored once)
+    blob = await blob_store.put(db, file, MAX_IMAGE_UPLOAD_SIZE, Path(safe_filename(file.filename)).suffix)
+    generation = await record_media_file(db, blob.path, blob.stored)
+    jobs = await enqueue_image_jobs(blob.path, blob.stored, generation, current_user["id"])
     
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
-    
-    # Update the user's cover_image_url
-    image_url = f"/uploads/cover_images/{filename}"
+    # Update the user's cover_image_url; resized variants are attached once rendered
+    image_url = blob.url
     await db.users.update_one(
         {"id": current_user["id"]},
-        {"$set": {"cover_image_url": image_url, "updated_at": datetime.utcnow()}}
+        {"$set": {
+            "cover_image_url": image_url,
+            "cover_image_variants": await image_variants(db, image_url),
+            "updated_at": datetime.utcnow(),
+        }}
     )
+    await blob_store.track(db, current_user.get("cover_image_url"), image_url)
+    user_cache.invalidate(current_user["id"])
+    await response_cache.invalidate(f"artist:{current_user['id']}")
     
-    return {"filename": filename, "url": image_url}
+    return {"filename": Path(blob.path).name, "url": image_url, "size": blob.stored.size, "sha256": blob.stored.sha256, "jobs": jobs}
 
 @api_router.post("/upload/album-art")
 async def upload_album_art(
@@ -515,21 +781,13 @@ async def upload_album_art(
     current_user = Depends(has_role([UserRole.ADMIN, UserRole.STAFF, UserRole.ARTIST]))
 ):
     """Upload album artwork."""
-    # Create directory if it doesn't exist
-    upload_dir = Path("public_html/uploads/album_art")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate a unique filename
-    filename = f"{current_user['id']}_{datetime.now().strftime('%Y%m%d%H%M%S')}{Path(file.filename).suffix}"
-    file_path = upload_dir / filename
-    
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+    # Stream the file into the blob store; it is kept once an album or show refers to it
+    blob = await blob_store.put(db, file, MAX_IMAGE_UPLOAD_SIZE, Path(safe_filename(file.filename)).suffix)
+    generation = await record_media_file(db, blob.path, blob.stored)
+    jobs = await enqueue_image_jobs(blob.path, blob.stored, generation, current_user["id"])
     
     # Return the URL
-    image_url = f"/uploads/album_art/{filename}"
-    return {"filename": filename, "url": image_url}
+    return {"filename": Path(blob.path).name, "url": blob.url, "size": blob.stored.size, "sha256": blob.stored.sha256, "jobs": jobs}
 
 @api_router.post("/upload/podcast-cover")
 async def upload_podcast_cover(
@@ -537,21 +795,13 @@ async def upload_podcast_cover(
     current_user = Depends(has_role([UserRole.ADMIN, UserRole.STAFF, UserRole.PODCASTER]))
 ):
     """Upload podcast cover artwork."""
-    # Create directory if it doesn't exist
-    upload_dir = Path("public_html/uploads/podcast_covers")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Generate a unique filename
-    filename = f"{current_user['id']}_{datetime.now().strftime('%Y%m%d%H%M%S')}{Path(file.filename).suffix}"
-    file_path = upload_dir / filename
-    
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+    # Stream the file into the blob store; it is kept once an album or show refers to it
+    blob = await blob_store.put(db, file, MAX_IMAGE_UPLOAD_SIZE, Path(safe_filename(file.filename)).suffix)
+    generation = await record_media_file(db, blob.path, blob.stored)
+    jobs = await enqueue_image_jobs(blob.path, blob.stored, generation, current_user["id"])
     
     # Return the URL
-    image_url = f"/uploads/podcast_covers/{filename}"
-    return {"filename": filename, "url": image_url}
+    return {"filename": Path(blob.path).name, "url": blob.url, "size": blob.stored.size, "sha256": blob.stored.sha256, "jobs": jobs}
 
 @api_router.post("/upload/music")
 async def upload_music(
@@ -571,18 +821,20 @@ async def upload_music(
     if not album_name:
         album_name = "Singles"
     
-    # Create directory structure if it doesn't exist
-    upload_dir = Path(f"public_html/station/music/{artist_name}/{album_name}")
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    artist_name = safe_path_segment(artist_name)
+    album_name = safe_path_segment(album_name)
+    filename = safe_filename(file.filename)
     
-    # Save the file
-    file_path = upload_dir / file.filename
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+    # Stream the file into the station music tree
+    music_path = f"station/music/{artist_name}/{album_name}/{filename}"
+    stored = await storage.save(file, music_path, MAX_MUSIC_UPLOAD_SIZE)
+    generation = await record_media_file(db, music_path, stored)
+    
+    # Probing and analysis run in the background; the file is already durable
+    jobs = await enqueue_media_jobs(music_path, stored, generation, current_user["id"])
     
     # Return the path
-    music_path = f"station/music/{artist_name}/{album_name}/{file.filename}"
-    return {"filename": file.filename, "path": music_path}
+    return {"filename": filename, "path": music_path, "size": stored.size, "sha256": stored.sha256, "jobs": jobs}
 
 @api_router.post("/upload/podcast")
 async def upload_podcast(
@@ -591,78 +843,377 @@ async def upload_podcast(
     show_name: str = None
 ):
     """Upload podcast episode file."""
-    # Create directory structure if it doesn't exist
-    upload_dir = Path(f"public_html/station/podcasts/{show_name}")
-    upload_dir.mkdir(parents=True, exist_ok=True)
+    if not show_name:
+        raise HTTPException(status_code=400, detail="Show name is required")
+    show_name = safe_path_segment(show_name)
+    filename = safe_filename(file.filename)
+    
+    # Stream the file into the station podcast tree
+    podcast_path = f"station/podcasts/{show_name}/{filename}"
+    stored = await storage.save(file, podcast_path, MAX_PODCAST_UPLOAD_SIZE)
+    generation = await record_media_file(db, podcast_path, stored)
     
-    # Save the file
-    file_path = upload_dir / file.filename
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+    # Probing and analysis run in the background; the file is already durable
+    jobs = await enqueue_media_jobs(podcast_path, stored, generation, current_user["id"])
     
     # Return the path
-    podcast_path = f"station/podcasts/{show_name}/{file.filename}"
-    return {"filename": file.filename, "path": podcast_path}
+    return {"filename": filename, "path": podcast_path, "size": stored.size, "sha256": stored.sha256, "jobs": jobs}
 
 # --------------------------------
-# RSS Feed Routes
+# Resumable Upload Routes
 # --------------------------------
-@api_router.get("/podcasts/{show_id}/rss")
-async def get_podcast_rss_feed(show_id: str):
-    """Get the RSS feed for a podcast show."""
-    # Get the podcast show
-    show = await db.podcast_shows.find_one({"id": show_id})
-    if not show:
-        raise HTTPException(status_code=404, detail="Podcast show not found")
+async def get_upload_session(session_id: str, current_user):
+    """Load an upload session owned by the current user."""
+    session = await db.upload_sessions.find_one({"id": session_id})
+    if not session or session["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+def upload_session_progress(session) -> UploadSessionProgress:
+    """Summarize how much of an upload session has been received."""
+    return UploadSessionProgress(
+        id=session["id"],
+        kind=session["kind"],
+        filename=session["filename"],
+        total_size=session["total_size"],
+        received_bytes=received_bytes(session["received_ranges"]),
+        missing_ranges=missing_ranges(session["received_ranges"], session["total_size"]),
+        status=session["status"]
+    )
+
+def upload_target_path(upload: UploadSessionCreate, current_user):
+    """Work out (and authorize) where a music or podcast upload will be stored, checking its size limit."""
+    filename = safe_filename(upload.filename)
+    
+    if upload.kind == UploadKind.MUSIC:
+        if current_user["role"] not in [UserRole.ADMIN, UserRole.STAFF, UserRole.ARTIST]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        
+        # Same defaults as /upload/music
+        artist_name = upload.artist_name
+        if not artist_name and current_user["role"] == UserRole.ARTIST:
+            artist_name = current_user["username"]
+        elif not artist_name:
+            raise HTTPException(status_code=400, detail="Artist name is required")
+        album_name = upload.album_name or "Singles"
+        
+        target_path = f"station/music/{safe_path_segment(artist_name)}/{safe_path_segment(album_name)}/{filename}"
+        max_size = MAX_MUSIC_UPLOAD_SIZE
+    else:
+        if current_user["role"] not in [UserRole.ADMIN, UserRole.STAFF, UserRole.PODCASTER]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+        if not upload.show_name:
+            raise HTTPException(status_code=400, detail="Show name is required")
+        
+        target_path = f"station/podcasts/{safe_path_segment(upload.show_name)}/{filename}"
+        max_size = MAX_PODCAST_UPLOAD_SIZE
+    
+    if upload.total_size > max_size:
+        raise upload_too_large(max_size)
+    return target_path
+
+@api_router.post("/upload/sessions", response_model=UploadSessionProgress)
+async def create_upload_session(
+    upload: UploadSessionCreate,
+    current_user = Depends(has_role([UserRole.ADMIN, UserRole.STAFF, UserRole.ARTIST, UserRole.PODCASTER]))
+):
+    """Start a resumable upload of a music or podcast file."""
+    target_path = upload_target_path(upload, current_user)
+    session = UploadSession(
+        user_id=current_user["id"],
+        kind=upload.kind,
+        filename=safe_filename(upload.filename),
+        target_path=target_path,
+        total_size=upload.total_size
+    )
+    
+    await create_part_file(session.id, session.total_size)
+    await db.upload_sessions.insert_one(session.dict())
+    return upload_session_progress(session.dict())
+
+@api_router.get("/upload/sessions/{session_id}", response_model=UploadSessionProgress)
+async def get_upload_session_progress(session_id: str, current_user = Depends(get_current_user)):
+    """Get the progress of a resumable upload."""
+    session = await get_upload_session(session_id, current_user)
+    return upload_session_progress(session)
+
+@api_router.put("/upload/sessions/{session_id}", response_model=UploadSessionProgress)
+async def upload_session_chunk(
+    session_id: str,
+    offset: int,
+    request: Request,
+    current_user = Depends(get_current_user)
+):
+    """Upload one chunk of a resumable upload, starting at byte offset."""
+    session = await get_upload_session(session_id, current_user)
+    if session["status"] != UploadStatus.UPLOADING:
+        raise HTTPException(status_code=409, detail="Upload session is already complete")
+    
+    # Stream the request body straight to its offset in the part file
+    written = await write_chunk(session_id, offset, session["total_size"], request.stream())
+    
+    # Record the received range only once it is fully on disk
+    if written:
+        await db.upload_sessions.update_one(
+            {"id": session_id},
+            {
+                "$push": {"received_ranges": [offset, offset + written]},
+                "$set": {"updated_at": datetime.utcnow()}
+            }
+        )
+    
+    session = await db.upload_sessions.find_one({"id": session_id})
+    return upload_session_progress(session)
+
+@api_router.post("/upload/sessions/{session_id}/complete")
+async def complete_upload_session(session_id: str, current_user = Depends(get_current_user)):
+    """Finalize a resumable upload once every byte has been received."""
+    session = await get_upload_session(session_id, current_user)
+    if session["status"] != UploadStatus.UPLOADING:
+        raise HTTPException(status_code=409, detail="Upload session is already complete")
+    
+    missing = missing_ranges(session["received_ranges"], session["total_size"])
+    if missing:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is incomplete", "missing_ranges": missing}
+        )
+    
+    # Claim the session so concurrent finalize calls don't race
+    claimed = await db.upload_sessions.update_one(
+        {"id": session_id, "status": UploadStatus.UPLOADING},
+        {"$set": {"status": UploadStatus.COMPLETE, "updated_at": datetime.utcnow()}}
+    )
+    if not claimed.modified_count:
+        raise HTTPException(status_code=409, detail="Upload session is already complete")
+    
+    try:
+        sha256 = await finalize_part_file(session_id, session["target_path"])
+    except Exception:
+        await db.upload_sessions.update_one({"id": session_id}, {"$set": {"status": UploadStatus.UPLOADING}})
+        raise
+    await db.upload_sessions.update_one({"id": session_id}, {"$set": {"sha256": sha256}})
+    stored = StoredUpload(path=Path(session["target_path"]), size=session["total_size"], sha256=sha256)
+    generation = await record_media_file(db, session["target_path"], stored)
+    jobs = await enqueue_media_jobs(session["target_path"], stored, generation, current_user["id"])
+    
+    # Same response shape as /upload/music and /upload/podcast
+    return {
+        "filename": session["filename"],
+        "path": session["target_path"],
+        "size": session["total_size"],
+        "sha256": sha256,
+        "jobs": jobs
+    }
+
+@api_router.delete("/upload/sessions/{session_id}")
+async def cancel_upload_session(session_id: str, current_user = Depends(get_current_user)):
+    """Abandon a resumable upload and discard its partial data."""
+    session = await get_upload_session(session_id, current_user)
+    if session["status"] != UploadStatus.UPLOADING:
+        raise HTTPException(status_code=409, detail="Upload session is already complete")
+    
+    await db.upload_sessions.delete_one({"id": session_id})
+    await discard_part_file(session_id)
+    return {"message": "Upload session cancelled"}
+
+# --------------------------------
+# Direct Upload Routes
+# --------------------------------
+@api_router.post("/upload/direct", response_model=DirectUploadGrant)
+async def create_direct_upload(
+    upload: DirectUploadCreate,
+    current_user = Depends(has_role([UserRole.ADMIN, UserRole.STAFF, UserRole.ARTIST, UserRole.PODCASTER]))
+):
+    """Get a short-lived URL to PUT a music or podcast file to without going through the API."""
+    if not direct_uploads_enabled():
+        raise HTTPException(status_code=503, detail="Direct uploads are not available")
+    
+    direct_upload = DirectUpload(
+        user_id=current_user["id"],
+        kind=upload.kind,
+        filename=safe_filename(upload.filename),
+        target_path=upload_target_path(upload, current_user),
+        total_size=upload.total_size,
+        sha256=upload.sha256,
+        expires_at=datetime.utcnow() + timedelta(seconds=DIRECT_UPLOAD_EXPIRES)
+    ).dict()
     
-    # Get the podcast episodes
-    episodes = await db.podcast_episodes.find({"show_id": show_id}).sort("published_at", -1).to_list(1000)
-    
-    # Get the host information
-    host = await db.users.find_one({"id": show["host_id"]})
-    host_name = host["full_name"] or host["username"] if host else "Unknown Host"
-    
-    # Build the RSS feed
-    rss = f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd" xmlns:content="http://purl.org/rss/1.0/modules/content/">
-  <channel>
-    <title>{show["title"]}</title>
-    <description>{show["description"]}</description>
-    <link>{os.environ.get('WEBSITE_URL', 'https://itsyourradio.com')}/podcasts/{show_id}</link>
-    <language>en-us</language>
-    <itunes:author>{host_name}</itunes:author>
-    <itunes:owner>
-      <itunes:name>{host_name}</itunes:name>
-      <itunes:email>podcasts@itsyourradio.com</itunes:email>
-    </itunes:owner>
-    <itunes:image href="{show.get('cover_art_url', '')}" />
-    <itunes:category text="{show.get('category', 'Music')}" />
-    <itunes:explicit>false</itunes:explicit>
+    url, headers = await upload_instructions(direct_upload)
+    await db.direct_uploads.insert_one(direct_upload)
+    await schedule_expiry(direct_upload)
+    return DirectUploadGrant(id=direct_upload["id"], url=url, headers=headers, expires_at=direct_upload["expires_at"])
+
+@api_router.post("/upload/direct/{upload_id}/complete")
+async def complete_direct_upload(
+    upload_id: str,
+    details: Optional[DirectUploadComplete] = None,
+    current_user = Depends(get_current_user)
+):
+    """
+    Finish a direct upload once the file has been PUT, and optionally
+    register it as a song or podcast episode in the same call.
     """
+    upload = await db.direct_uploads.find_one({"id": upload_id})
+    if not upload or upload["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    # The expiry job forgets these uploads too, but it may not have run yet
+    expired_at = upload["expires_at"] + timedelta(seconds=DIRECT_UPLOAD_COMPLETE_GRACE)
+    if upload["status"] == UploadStatus.UPLOADING and datetime.utcnow() > expired_at:
+        raise HTTPException(status_code=410, detail="Upload has expired")
+    register = details is not None and bool(details.title)
+    if register and upload["kind"] == UploadKind.PODCAST and not details.show_id:
+        raise HTTPException(status_code=400, detail="Show ID is required to register an episode")
+    
+    # Refuse a registration create_song/create_podcast_episode would refuse before
+    # claiming the upload, so the client can fix the request and complete it again
+    if register:
+        privileged = current_user["role"] in [UserRole.ADMIN, UserRole.STAFF]
+        if upload["kind"] == UploadKind.MUSIC:
+            if (details.artist_id or current_user["id"]) != current_user["id"] and not privileged:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Not authorized to create songs for this artist"
+                )
+        else:
+            show = await db.podcast_shows.find_one({"id": details.show_id}, {"host_id": 1})
+            if not show:
+                raise HTTPException(status_code=404, detail="Podcast show not found")
+            if show["host_id"] != current_user["id"] and not privileged:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Not authorized to create episodes for this podcast"
+                )
+    
+    # Claim the upload so concurrent completions don't race
+    claimed = await db.direct_uploads.update_one(
+        {"id": upload_id, "status": UploadStatus.UPLOADING},
+        {"$set": {"status": UploadStatus.COMPLETE, "updated_at": datetime.utcnow()}}
+    )
+    if not claimed.modified_count:
+        raise HTTPException(status_code=409, detail="Upload is already complete")
+    
+    try:
+        stored = await receive_direct_upload(upload)
+    except Exception:
+        await db.direct_uploads.update_one({"id": upload_id}, {"$set": {"status": UploadStatus.UPLOADING}})
+        raise
+    generation = await record_media_file(db, upload["target_path"], stored)
+    jobs = await enqueue_media_jobs(upload["target_path"], stored, generation, current_user["id"])
+    
+    # Same response shape as /upload/music and /upload/podcast
+    result = {
+        "filename": upload["filename"],
+        "path": upload["target_path"],
+        "size": stored.size,
+        "sha256": stored.sha256,
+        "jobs": jobs
+    }
+    
+    if register:
+        if upload["kind"] == UploadKind.MUSIC:
+            artist_id = details.artist_id or current_user["id"]
+            result["song"] = await create_song(
+                artist_id,
+                SongCreate(
+                    title=details.title,
+                    artist_id=artist_id,
+                    album_id=details.album_id,
+                    file_path=upload["target_path"],
+                    duration=details.duration,
+                    track_number=details.track_number
+                ),
+                current_user
+            )
+        else:
+            result["episode"] = await create_podcast_episode(
+                details.show_id,
+                PodcastEpisodeCreate(
+                    show_id=details.show_id,
+                    title=details.title,
+                    description=details.description or "",
+                    file_path=upload["target_path"],
+                    duration=details.duration,
+                    published_at=details.published_at,
+                    episode_number=details.episode_number
+                ),
+                current_user
+            )
+    
+    return result
+
+# --------------------------------
+# Job Routes
+# --------------------------------
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str, current_user = Depends(get_current_user)):
+    """Get the status of a background job started by the current user."""
+    job = await db.jobs.find_one({"id": job_id})
+    if not job or (job.get("user_id") != current_user["id"] and current_user["role"] not in [UserRole.ADMIN, UserRole.STAFF]):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# --------------------------------
+# Media Routes
+# --------------------------------
+@api_router.api_route("/images/{file_path:path}", methods=["GET", "HEAD"])
+async def get_image(file_path: str, request: Request, w: Optional[int] = Query(None, ge=1)):
+    """Get an uploaded image as the smallest WebP variant at least w pixels wide (or the original)."""
+    record = await db.media_files.find_one({"path": file_path}, {"variants": 1})
+    variant = pick_variant((record or {}).get("variants") or [], w)
+    if variant and "image/webp" in request.headers.get("accept", ""):
+        file_path = variant["url"].lstrip("/")
+    
+    response = await media_response(request, db, file_path)
+    response.headers["Vary"] = "Accept"
+    return response
+
+@api_router.api_route("/media/{file_path:path}", methods=["GET", "HEAD"])
+async def get_media_file(file_path: str, request: Request):
+    """Serve an uploaded music, podcast or image file, with byte-range support."""
+    return await media_response(request, db, file_path)
+
+# --------------------------------
+# RSS Feed Routes
+# --------------------------------
+@api_router.api_route("/podcasts/{show_id}/rss", methods=["GET", "HEAD"])
+async def get_podcast_rss_feed(show_id: str, request: Request):
+    """Get the RSS feed for a podcast show."""
+    feed = feed_cache.get(show_id)
     
-    # Add episodes
-    for episode in episodes:
-        published_date = episode["published_at"].strftime("%a, %d %b %Y %H:%M:%S +0000")
-        episode_url = f"{os.environ.get('WEBSITE_URL', 'https://itsyourradio.com')}/{episode['file_path']}"
+    if feed is None:
+        # Get the podcast show
+        show = await read_db.podcast_shows.find_one({"id": show_id})
+        if not show:
+            raise HTTPException(status_code=404, detail="Podcast show not found")
         
-        rss += f"""
-    <item>
-      <title>{episode["title"]}</title>
-      <description>{episode["description"]}</description>
-      <pubDate>{published_date}</pubDate>
-      <enclosure url="{episode_url}" length="0" type="audio/mpeg" />
-      <itunes:duration>{episode.get('duration', 0)}</itunes:duration>
-      <itunes:explicit>false</itunes:explicit>
-      <guid isPermaLink="false">{episode["id"]}</guid>
-    </item>
-        """
-    
-    rss += """
-  </channel>
-</rss>
-    """
+        # Get the podcast episodes
+        episodes = await read_db.podcast_episodes.find(
+            {"show_id": show_id}, EPISODE_FEED_FIELDS
+        ).sort([("published_at", -1), ("id", -1)]).to_list(1000)
+        
+        # Episodes created before upload probing take their details from the media records
+        unprobed = {episode["file_path"]: episode for episode in episodes if not episode.get("file_size")}
+        if unprobed:
+            async for record in read_db.media_files.find({"path": {"$in": list(unprobed)}}):
+                episode = unprobed[record["path"]]
+                episode["file_size"] = record.get("size")
+                episode["mime_type"] = record.get("mime_type")
+                episode["duration"] = episode.get("duration") or record.get("duration")
+        
+        # Get the host information
+        host = await read_db.users.find_one({"id": show["host_id"]}, {"full_name": 1, "username": 1})
+        host_name = host.get("full_name") or host["username"] if host else "Unknown Host"
+        
+        # Render once and cache until the show or its episodes change
+        body = render_podcast_feed(show, episodes, host_name, os.environ.get('WEBSITE_URL', 'https://itsyourradio.com'))
+        last_modified = max(
+            [show.get("updated_at") or show["created_at"]] +
+            [episode.get("updated_at") or episode["published_at"] for episode in episodes]
+        )
+        feed = feed_cache.store(show_id, show["host_id"], body, last_modified)
     
-    return {"rss": rss}
+    return feed_response(request, feed)
 
 # Base route
 @api_router.get("/")
@@ -684,32 +1235,109 @@ async def health_check():
 @api_router.get("/stream/info")
 async def stream_info():
     """Get information about the radio stream."""
-    return {
-        "station_name": "itsyourradio",
-        "stream_url": "https://example.com:8000/stream",
-        "bitrate": "128kbps",
-        "format": "audio/mpeg",
-        "description": "Your Music, Your Way",
-        "status": "online",
-        "listeners": 42
-    }
+    return now_playing_engine.stream_info
 
 @api_router.get("/stream/now-playing")
 async def now_playing():
     """Get information about what's currently playing on the radio."""
-    return {
-        "title": "Summer Vibes",
-        "artist": "DJ Cool",
-        "album": "Beach Party Mix",
-        "cover_art": "https://example.com/covers/summer-vibes.jpg",
-        "started_at": (datetime.utcnow() - timedelta(minutes=2)).isoformat(),
-        "duration": 240,  # in seconds
-        "progress": 120  # in seconds
-    }
+    return now_playing_engine.current_track()
+
+@api_router.get("/stream/events")
+async def stream_events():
+    """Push now-playing and stream status changes as Server-Sent Events."""
+    if now_playing_engine.events.is_full():
+        raise HTTPException(status_code=503, detail="Too many listeners connected", headers={"Retry-After": "30"})
+    
+    async def event_stream():
+        # Subscribe once the response starts, so the finally below always pairs with it
+        subscriber = now_playing_engine.events.subscribe()
+        if subscriber is None:
+            return  # Filled up since the check; the client reconnects
+        try:
+            while not subscriber.closed:
+                events = await subscriber.next_events(timeout=STREAM_HEARTBEAT_INTERVAL)
+                if not events:
+                    # Keep proxies from closing an idle connection
+                    yield b": keep-alive\n\n"
+                for event in events:
+                    yield event.sse
+        finally:
+            now_playing_engine.events.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.websocket("/stream/ws")
+async def stream_websocket(websocket: WebSocket):
+    """Push now-playing and stream status changes over a WebSocket."""
+    subscriber = now_playing_engine.events.subscribe()
+    if subscriber is None:
+        await websocket.close(code=1013)  # Try again later
+        return
+    
+    await websocket.accept()
+    
+    async def watch_for_close():
+        # Clients don't send anything; this only notices disconnects, ignoring stray (even binary) frames
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        finally:
+            subscriber.close()
+    
+    watcher = asyncio.create_task(watch_for_close())
+    try:
+        while not subscriber.closed:
+            for event in await subscriber.next_events(timeout=STREAM_HEARTBEAT_INTERVAL):
+                await asyncio.wait_for(websocket.send_text(event.json), STREAM_SEND_TIMEOUT)
+    except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+        pass
+    finally:
+        watcher.cancel()
+        now_playing_engine.events.unsubscribe(subscriber)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Reject oversized uploads before their bodies are parsed
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/upload/profile-image": MAX_IMAGE_UPLOAD_SIZE,
+        "/api/upload/cover-image": MAX_IMAGE_UPLOAD_SIZE,
+        "/api/upload/album-art": MAX_IMAGE_UPLOAD_SIZE,
+        "/api/upload/podcast-cover": MAX_IMAGE_UPLOAD_SIZE,
+        "/api/upload/music": MAX_MUSIC_UPLOAD_SIZE,
+        "/api/upload/podcast": MAX_PODCAST_UPLOAD_SIZE,
+    },
+)
+
+# ETags, 304s and Cache-Control for JSON GETs, by route family
+app.add_middleware(
+    ETagMiddleware,
+    cache_control=[
+        # Catalog data: always revalidate, so edits show up on the next navigation
+        ("/api/artists", "public, no-cache"),
+        ("/api/podcasts", "public, no-cache"),
+        ("/api/blog", "public, no-cache"),
+        ("/api/search", "public, max-age=60"),
+        ("/api/stream/", "no-cache"),
+        ("/api/health", "no-store"),
+        # Per-user and admin data
+        ("/api/users/", "private, no-cache"),
+        ("/api/jobs/", "private, no-cache"),
+        ("/api/upload/", "private, no-cache"),
+        ("/api/admin/", "private, no-store"),
+    ],
+)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -717,6 +1345,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link"],
 )
 
 # Startup event
@@ -725,8 +1354,40 @@ async def startup_event():
     """Initialize the application on startup."""
     # Initialize the database tables if they don't exist
     init_db()
+    
+    # Make sure MongoDB is reachable before serving anything
+    await check_connection()
+    
+    # Make sure every query shape is backed by an index
+    await ensure_indexes(db)
+    
+    # Pick the password hash cost (calibrated once per deployment, shared by every worker)
+    await configure_password_hashing(db)
+    
+    # Make sure fast list rendering still matches the response models
+    check_fast_models()
+    
+    # Start polling the streaming server for now-playing data
+    now_playing_engine.start()
+    
+    # Start the background job workers
+    job_queue.start(db)
+    
+    # Store excerpts on posts and episodes written before they were kept
+    await enqueue_excerpt_backfill()
+    
+    # Connect the shared tier of the response cache
+    response_cache.start()
+    
+    # Load the search index
+    search_index.start(read_db)
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await now_playing_engine.stop()
+    await job_queue.stop()
+    await search_index.stop()
+    await response_cache.stop()
+    shutdown_image_pool()
     client.close()
@@ -7,4 +7,7 @@ ROOT_DIR = Path(__file__).parent.parent
 sys.path.append(str(ROOT_DIR))
 
 # Import auth utilities
-from utils.auth import verify_password, get_password_hash, create_access_token, get_current_user, get_user_role, has_role
+from utils.auth import (
+    verify_password, get_password_hash, verify_password_async, get_password_hash_async,
+    create_access_token, get_current_user, get_user_role, has_role
+)
@@ -1,9 +1,12 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -15,6 +18,12 @@ sys.path.append(str(ROOT_DIR))
 
 # Now import from models
 from models.user import TokenData, UserRole
+from utils.hash_profiles import (
+    calibrate_cost, configured_cost, describe_hash_settings, hash_scheme, hash_settings, stored_cost
+)
+from utils.token_cache import token_cache
+from utils.user_cache import user_cache
+from mongo import db
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent.parent
@@ -25,8 +34,12 @@ SECRET_KEY = os.environ.get("SECRET_KEY", "supersecretkeyyoushouldnotcommittogit
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
+# Password hashing (the cost profile is finalized by configure_password_hashing at startup)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_hash_profile = {}
+
+# User fields never exposed through current_user
+USER_PROJECTION = {"_id": 0, "hashed_password": 0}
 
 # OAuth2 token URL (this is the endpoint where the client will request a token)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
@@ -39,6 +52,98 @@ def get_password_hash(password):
     """Generate a password hash."""
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    """Verify a password and return (verified, new_hash); new_hash is set when the stored hash is outdated."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def configure_password_hashing(db):
+    """
+    Apply the hash profile: the cost set in the environment, or the one
+    calibrated for this deployment and shared by every worker through the
+    settings collection.
+    """
+    scheme = hash_scheme()
+    cost = configured_cost(scheme)
+    if cost is None:
+        cost = await stored_cost(db, scheme, lambda: asyncio.to_thread(calibrate_cost, scheme))
+    settings = hash_settings(scheme, cost)
+    pwd_context.load(settings)
+    _hash_profile.clear()
+    _hash_profile.update(describe_hash_settings(settings))
+
+# Password hashing worker pool. bcrypt is deliberately slow (~250ms), so it runs
+# on a small dedicated pool instead of the event loop, and callers get a 503 when
+# too much hashing work is already queued.
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", 16))
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get("PASSWORD_HASH_RETRY_AFTER", 2))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_stats = {
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "completed": 0,
+    "rejected": 0,
+    "total_wait_seconds": 0.0,
+    "total_run_seconds": 0.0,
+}
+
+async def _run_password_job(func, *args):
+    """Run a hashing job on the password pool, rejecting it if the queue is full."""
+    if _hash_stats["in_flight"] >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+        _hash_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, please try again shortly",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        )
+    
+    submitted_at = time.perf_counter()
+    
+    def timed_job():
+        started_at = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            _hash_stats["total_wait_seconds"] += started_at - submitted_at
+            _hash_stats["total_run_seconds"] += time.perf_counter() - started_at
+    
+    _hash_stats["in_flight"] += 1
+    _hash_stats["peak_in_flight"] = max(_hash_stats["peak_in_flight"], _hash_stats["in_flight"])
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, timed_job)
+    finally:
+        _hash_stats["in_flight"] -= 1
+        _hash_stats["completed"] += 1
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password against a hash without blocking the event loop."""
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Generate a password hash without blocking the event loop."""
+    return await _run_password_job(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """Verify a password and check its hash is current, without blocking the event loop."""
+    return await _run_password_job(verify_and_update_password, plain_password, hashed_password)
+
+def password_hash_stats():
+    """Get queue-depth and latency metrics for the password pool."""
+    completed = _hash_stats["completed"]
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_limit": PASSWORD_HASH_QUEUE_LIMIT,
+        "in_flight": _hash_stats["in_flight"],
+        "queue_depth": max(0, _hash_stats["in_flight"] - PASSWORD_HASH_WORKERS),
+        "peak_in_flight": _hash_stats["peak_in_flight"],
+        "completed": completed,
+        "rejected": _hash_stats["rejected"],
+        "avg_wait_ms": round(_hash_stats["total_wait_seconds"] * 1000 / completed, 2) if completed else 0.0,
+        "avg_run_ms": round(_hash_stats["total_run_seconds"] * 1000 / completed, 2) if completed else 0.0,
+        "profile": dict(_hash_profile),
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a new JWT access token."""
     to_encode = data.copy()
@@ -49,42 +154,70 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time()})
     
     # Create the JWT token
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db=None):
-    """Get the current user from the token."""
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
+    """Get the current user document from the token."""
+    # Resolve the user at most once per request
+    current_user = getattr(request.state, "current_user", None)
+    if current_user is not None:
+        return current_user
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        # Decode the JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        role: str = payload.get("role")
-        
-        if user_id is None:
-            raise credentials_exception
+    # Reuse the claims of a recently verified token
+    token_data = token_cache.get(token)
+    
+    if token_data is None:
+        try:
+            # Decode the JWT token
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id: str = payload.get("sub")
+            role: str = payload.get("role")
             
-        token_data = TokenData(user_id=user_id, role=role)
+            if user_id is None or token_cache.is_revoked(token):
+                raise credentials_exception
+                
+            token_data = TokenData(user_id=user_id, role=role)
+            
+        except JWTError:
+            raise credentials_exception
         
-    except JWTError:
-        raise credentials_exception
+        token_cache.put(token, token_data, payload.get("exp"))
         
-    # Get the user from the database
-    if db:
-        user = await db.users.find_one({"id": token_data.user_id})
+    # Get the user, from the cache when possible
+    user = user_cache.get(token_data.user_id)
+    if user is None:
+        user = await db.users.find_one({"id": token_data.user_id}, USER_PROJECTION)
         if user is None:
             raise credentials_exception
-        return user
-        
-    return token_data
+        user_cache.put(token_data.user_id, user)
+    
+    if not user.get("is_active", True):
+        raise credentials_exception
+    
+    # Hand out a copy so handlers can't modify the cached document
+    request.state.current_user = dict(user)
+    return request.state.current_user
+
+def revoke_token(token: str):
+    """
+    Revoke an access token (e.g. on logout) for the rest of its lifetime.
+    Only this worker process refuses it afterwards; see utils/token_cache.
+    """
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return
+    token_cache.revoke(token, exp)
 
 def get_user_role(current_user=Depends(get_current_user)):
     """Get the role of the current user."""
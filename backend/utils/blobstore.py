@@ -0,0 +1,156 @@
+"""
+Content-addressed blob store for itsyourradio uploads.
+Uploaded images are stored once per distinct content, at a path derived
+from their SHA-256 (uploads/blobs/ab/cd/<sha256>.<ext>). Re-uploading the
+same file reuses the existing blob, and since a URL always names the same
+bytes it can be cached forever. Documents that point at a blob hold a
+reference to it; blobs nobody references are deleted after a grace period.
+"""
+
+import asyncio
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+from pymongo import ReturnDocument
+
+from models import JobStatus
+from utils.jobs import job_queue
+from utils.storage import storage
+from utils.uploads import StoredUpload, save_upload
+
+# Storage key prefix for blobs
+BLOB_PREFIX = "uploads/blobs"
+
+# How long an unreferenced blob is kept (e.g. art uploaded for an album not created yet)
+BLOB_ORPHAN_GRACE = int(os.environ.get("BLOB_ORPHAN_GRACE", 86400))
+
+
+@dataclass
+class StoredBlob:
+    """A blob holding an upload's content."""
+    path: str  # Storage key
+    url: str
+    stored: StoredUpload
+    created: bool  # False when identical content was already stored
+
+
+def _normalize_suffix(suffix: str) -> str:
+    suffix = suffix.lower()
+    return suffix if re.fullmatch(r"\.[a-z0-9]{1,8}", suffix) else ""
+
+
+class BlobStore:
+    """Stores uploads by content hash and tracks which documents use them."""
+
+    def __init__(self, prefix: str = BLOB_PREFIX):
+        self.prefix = prefix
+
+    def blob_path(self, sha256: str, suffix: str) -> str:
+        """Storage key for content with a given hash."""
+        return f"{self.prefix}/{sha256[:2]}/{sha256[2:4]}/{sha256}{suffix}"
+
+    def path_for_url(self, url: Optional[str]) -> Optional[str]:
+        """The blob path behind a URL, or None if the URL isn't a blob."""
+        if url and url.startswith(f"/{self.prefix}/"):
+            return url[1:]
+        return None
+
+    async def put(self, db, file: UploadFile, max_size: int, suffix: str = "") -> StoredBlob:
+        """
+        Stream an upload into the store. The content is hashed while it is
+        written to the staging directory, then either moved into storage
+        under its hash or, if that content is already stored, discarded in
+        favour of the existing blob.
+        """
+        suffix = _normalize_suffix(suffix)
+        incoming = storage.staging_dir / f"blob-{uuid.uuid4().hex}{suffix}"
+        stored = await save_upload(file, incoming, max_size)
+        path = self.blob_path(stored.sha256, suffix)
+
+        # Register first: a fresh orphaned_at keeps a pending collection from deleting it underneath us
+        now = datetime.utcnow()
+        blob = await db.blobs.find_one_and_update(
+            {"path": path},
+            {
+                "$setOnInsert": {"path": path, "sha256": stored.sha256, "size": stored.size, "refs": 0, "created_at": now},
+                "$set": {"orphaned_at": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        try:
+            created = not await storage.exists(path)
+            if created:
+                await storage.put_file(incoming, path)
+        finally:
+            await asyncio.to_thread(incoming.unlink, missing_ok=True)
+        if blob["refs"] <= 0:
+            await self._schedule_collection(path, now)
+
+        stored = StoredUpload(path=Path(path), size=stored.size, sha256=stored.sha256)
+        return StoredBlob(path=path, url=f"/{path}", stored=stored, created=created)
+
+    async def acquire(self, db, url: Optional[str]):
+        """Record that a document now points at a blob URL."""
+        path = self.path_for_url(url)
+        if path:
+            await db.blobs.update_one({"path": path}, {"$inc": {"refs": 1}})
+
+    async def release(self, db, url: Optional[str]):
+        """Record that a document no longer points at a blob URL."""
+        path = self.path_for_url(url)
+        if not path:
+            return
+        blob = await db.blobs.find_one_and_update(
+            {"path": path}, {"$inc": {"refs": -1}}, return_document=ReturnDocument.AFTER
+        )
+        if blob and blob["refs"] <= 0:
+            now = datetime.utcnow()
+            await db.blobs.update_one({"path": path, "refs": {"$lte": 0}}, {"$set": {"orphaned_at": now}})
+            await self._schedule_collection(path, now)
+
+    async def track(self, db, old_url: Optional[str], new_url: Optional[str]):
+        """Move a document's reference from one URL to another."""
+        if old_url == new_url:
+            return
+        await self.acquire(db, new_url)
+        await self.release(db, old_url)
+
+    async def _schedule_collection(self, path: str, orphaned_at: datetime):
+        await job_queue.enqueue(
+            "blob-gc", {"path": path},
+            key=f"blob-gc:{path}:{orphaned_at.isoformat()}",
+            delay=BLOB_ORPHAN_GRACE
+        )
+
+    async def collect(self, db, path: str) -> bool:
+        """Delete a blob, its derived files and records if it is still unreferenced after the grace period."""
+        cutoff = datetime.utcnow() - timedelta(seconds=BLOB_ORPHAN_GRACE)
+        blob = await db.blobs.find_one_and_delete({"path": path, "refs": {"$lte": 0}, "orphaned_at": {"$lte": cutoff}})
+        if blob is None:
+            return False
+
+        directory, _, name = path.rpartition("/")
+        stem = name.split(".", 1)[0]
+        # The blob itself plus derivatives named after it (e.g. <sha256>.320w.webp)
+        for key in await storage.list(f"{directory}/{stem}."):
+            await storage.delete(key)
+        await db.media_files.delete_many({"path": {"$regex": f"^{re.escape(directory)}/{stem}\\."}})
+        # Forget finished processing so the same content uploaded again is processed again
+        await db.jobs.delete_many({"payload.path": path, "status": {"$in": [JobStatus.SUCCEEDED, JobStatus.FAILED]}})
+        return True
+
+
+blob_store = BlobStore()
+
+
+@job_queue.register("blob-gc", concurrency=1, timeout=60)
+async def collect_blob_job(db, payload):
+    """Delete an unreferenced blob once its grace period is over."""
+    return {"deleted": await blob_store.collect(db, payload["path"])}
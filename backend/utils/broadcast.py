@@ -0,0 +1,128 @@
+"""
+In-process event broadcaster for itsyourradio push channels.
+Each published event is serialized once and handed to every subscriber.
+Subscribers keep only the latest event of each type, so bursts of updates
+coalesce instead of queueing, and a subscriber that falls too far behind
+is dropped rather than holding memory for a slow connection.
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# Drop a subscriber after this many unread events were overwritten in a row
+BROADCAST_MAX_LAG = int(os.environ.get("BROADCAST_MAX_LAG", 20))
+
+# Maximum concurrent push connections per process
+BROADCAST_MAX_SUBSCRIBERS = int(os.environ.get("BROADCAST_MAX_SUBSCRIBERS", 5000))
+
+
+@dataclass(frozen=True)
+class Event:
+    """A published event, pre-serialized for both SSE and WebSocket clients."""
+    type: str
+    json: str
+    sse: bytes
+
+
+def make_event(event_type: str, data) -> Event:
+    """Serialize an event once for every transport."""
+    payload = json.dumps({"type": event_type, "data": data}, default=str, separators=(",", ":"))
+    return Event(
+        type=event_type,
+        json=payload,
+        sse=f"event: {event_type}\ndata: {payload}\n\n".encode(),
+    )
+
+
+class Subscriber:
+    """One connection's view of the event stream."""
+
+    def __init__(self, max_lag: int):
+        self.max_lag = max_lag
+        self.closed = False
+        self._pending = {}  # event type -> latest unread event
+        self._lag = 0
+        self._ready = asyncio.Event()
+
+    def offer(self, event: Event) -> bool:
+        """Queue an event, replacing any unread one of the same type. Returns False if lagging too far."""
+        if event.type in self._pending:
+            self._lag += 1
+            if self._lag > self.max_lag:
+                self.close()
+                return False
+        self._pending[event.type] = event
+        self._ready.set()
+        return True
+
+    def close(self):
+        """Stop delivering events to this subscriber."""
+        self.closed = True
+        self._pending.clear()
+        self._ready.set()
+
+    async def next_events(self, timeout: Optional[float] = None):
+        """Wait for pending events; returns [] on timeout or once closed."""
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        events = list(self._pending.values())
+        self._pending.clear()
+        self._lag = 0
+        return events
+
+
+class Broadcaster:
+    """Fans events out to subscribers, remembering the latest of each type."""
+
+    def __init__(self, max_lag: int = BROADCAST_MAX_LAG, max_subscribers: int = BROADCAST_MAX_SUBSCRIBERS):
+        self.max_lag = max_lag
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._latest = {}  # event type -> Event
+        self.published = 0
+        self.dropped = 0
+
+    def is_full(self) -> bool:
+        """Check whether another subscriber would be turned away."""
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """Register a subscriber primed with the latest events, or None when full."""
+        if self.is_full():
+            return None
+        subscriber = Subscriber(self.max_lag)
+        for event in self._latest.values():
+            subscriber.offer(event)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Remove a subscriber."""
+        subscriber.close()
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, data):
+        """Send an event to every subscriber."""
+        event = make_event(event_type, data)
+        self._latest[event_type] = event
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            if not subscriber.offer(event):
+                self._subscribers.discard(subscriber)
+                self.dropped += 1
+
+    def stats(self):
+        """Get fan-out metrics."""
+        return {
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "published": self.published,
+            "dropped_slow_subscribers": self.dropped,
+        }
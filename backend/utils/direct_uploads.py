@@ -0,0 +1,122 @@
+"""
+Direct-to-storage uploads for itsyourradio.
+Large audio files can go straight to storage instead of streaming through
+an API worker: the client asks for a short-lived signed URL, PUTs the file
+to it and calls back once it is done. With S3 storage the URL is a
+presigned PUT of the object itself, and the store checks the declared
+SHA-256. With local storage it is an nginx location guarded by
+secure_link that writes the body into a staging directory; the API
+verifies the file there and moves it into place.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from models import UploadStatus
+from utils.jobs import job_queue
+from utils.storage import storage
+from utils.uploads import UPLOAD_CHUNK_SIZE, StoredUpload
+
+# Direct upload settings
+DIRECT_UPLOAD_EXPIRES = int(os.environ.get("DIRECT_UPLOAD_EXPIRES", 900))
+# How long after its URL expires an unfinished upload may still be completed
+DIRECT_UPLOAD_COMPLETE_GRACE = int(os.environ.get("DIRECT_UPLOAD_COMPLETE_GRACE", 3600))
+
+# Local storage: secret shared with nginx's secure_link, the location nginx
+# accepts PUTs on, and the directory it writes them to
+DIRECT_UPLOAD_SECRET = os.environ.get("DIRECT_UPLOAD_SECRET")
+DIRECT_UPLOAD_URL_PREFIX = os.environ.get("DIRECT_UPLOAD_URL_PREFIX", "/_upload/")
+DIRECT_UPLOAD_DIR = Path(os.environ.get("DIRECT_UPLOAD_DIR", "direct_uploads"))
+
+
+def direct_uploads_enabled() -> bool:
+    """Whether this deployment can take uploads that bypass the API."""
+    return storage.remote or bool(DIRECT_UPLOAD_SECRET)
+
+
+def staged_path(upload_id: str) -> Path:
+    """Where nginx writes the body of a local direct upload."""
+    return DIRECT_UPLOAD_DIR / upload_id
+
+
+def sign_local_url(upload_id: str, expires: int) -> str:
+    """Build a URL nginx's secure_link accepts (md5 of "<expires><uri> <secret>", base64url)."""
+    uri = DIRECT_UPLOAD_URL_PREFIX.rstrip("/") + "/" + upload_id
+    digest = hashlib.md5(f"{expires}{uri} {DIRECT_UPLOAD_SECRET}".encode()).digest()
+    token = base64.urlsafe_b64encode(digest).decode().rstrip("=")
+    return f"{uri}?md5={token}&expires={expires}"
+
+
+async def upload_instructions(upload: dict):
+    """Get the URL and headers the client should PUT the file with."""
+    if storage.remote:
+        return await storage.presigned_put_url(upload["target_path"], upload["sha256"], DIRECT_UPLOAD_EXPIRES)
+    expires = int((upload["expires_at"] - datetime(1970, 1, 1)).total_seconds())
+    return sign_local_url(upload["id"], expires), {}
+
+
+def _hash_file(path: Path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+async def receive_direct_upload(upload: dict) -> StoredUpload:
+    """
+    Check that the client's PUT arrived intact and make sure the file is in
+    place in storage. Raises 409 if it hasn't arrived or doesn't match
+    (removing a mismatched local file).
+    """
+    if storage.remote:
+        info = await storage.stat(upload["target_path"])
+        if info is None:
+            raise HTTPException(status_code=409, detail="File has not been uploaded yet")
+        size, sha256 = info.size, info.sha256
+        if sha256 is None:
+            # The store kept no checksum, so hash the object rather than trust the declared one
+            async with storage.local_copy(upload["target_path"]) as path:
+                size, sha256 = await asyncio.to_thread(_hash_file, path)
+    else:
+        try:
+            size, sha256 = await asyncio.to_thread(_hash_file, staged_path(upload["id"]))
+        except FileNotFoundError:
+            raise HTTPException(status_code=409, detail="File has not been uploaded yet")
+
+    if size != upload["total_size"] or sha256 != upload["sha256"]:
+        if not storage.remote:
+            # Clear the bad file so the client can PUT it again while the URL is valid
+            await asyncio.to_thread(staged_path(upload["id"]).unlink, missing_ok=True)
+        raise HTTPException(status_code=409, detail="Uploaded file does not match the declared size and SHA-256")
+
+    if not storage.remote:
+        await storage.put_file(staged_path(upload["id"]), upload["target_path"])
+    return StoredUpload(path=Path(upload["target_path"]), size=size, sha256=sha256)
+
+
+async def schedule_expiry(upload: dict):
+    """Queue the cleanup of a direct upload that is never completed."""
+    await job_queue.enqueue(
+        "expire-direct-upload", {"id": upload["id"]},
+        key=f"expire-direct-upload:{upload['id']}",
+        user_id=upload["user_id"],
+        delay=DIRECT_UPLOAD_EXPIRES + DIRECT_UPLOAD_COMPLETE_GRACE
+    )
+
+
+@job_queue.register("expire-direct-upload", concurrency=1, timeout=60)
+async def expire_direct_upload_job(db, payload):
+    """Forget an unfinished direct upload and remove anything it staged."""
+    result = await db.direct_uploads.delete_one({"id": payload["id"], "status": UploadStatus.UPLOADING})
+    if result.deleted_count and not storage.remote:
+        await asyncio.to_thread(staged_path(payload["id"]).unlink, missing_ok=True)
+    return {"expired": bool(result.deleted_count)}
@@ -0,0 +1,102 @@
+"""
+Conditional GET support for itsyourradio's JSON API.
+Every successful JSON GET gets a strong ETag (a hash of the body, or the
+one the response cache computed when it stored the body) and a
+Cache-Control policy for its route family, so browsers revalidate with
+If-None-Match and get an empty 304 when nothing changed.
+"""
+
+import hashlib
+from typing import Iterable, Optional, Tuple
+
+# Used when no route family matches
+DEFAULT_CACHE_CONTROL = "no-cache"
+AUTHENTICATED_CACHE_CONTROL = "private, no-cache"
+
+# Headers a 304 repeats from the full response
+NOT_MODIFIED_HEADERS = (b"etag", b"cache-control", b"vary", b"expires", b"last-modified")
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    plain = etag.removeprefix("W/")
+    return any(tag == "*" or tag.removeprefix("W/") == plain for tag in (tag.strip() for tag in header.split(",")))
+
+
+class ETagMiddleware:
+    """
+    Add ETags and Cache-Control to JSON GET responses and answer matching
+    If-None-Match requests with 304. Responses that already carry an ETag
+    keep it (and are only checked against If-None-Match); anything that
+    isn't a 200 JSON response with a known length (streamed responses
+    have none) passes through untouched.
+    """
+
+    def __init__(self, app, cache_control: Iterable[Tuple[str, str]] = (), prefix: str = "/api/"):
+        self.app = app
+        self.prefix = prefix
+        # Longest prefix first, so specific routes win over their family
+        self.cache_control = sorted(cache_control, key=lambda item: len(item[0]), reverse=True)
+
+    def _cache_control(self, path: str, authenticated: bool) -> str:
+        for prefix, policy in self.cache_control:
+            if path.startswith(prefix):
+                return policy
+        return AUTHENTICATED_CACHE_CONTROL if authenticated else DEFAULT_CACHE_CONTROL
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        if_none_match: Optional[bytes] = request_headers.get(b"if-none-match")
+        start = None
+        body = []
+
+        async def buffered_send(message):
+            nonlocal start
+            if start is None:
+                headers = dict(message["headers"])
+                content_type = headers.get(b"content-type", b"")
+                if (message["status"] != 200 or not content_type.startswith(b"application/json")
+                        or b"content-length" not in headers):
+                    start = False  # Not ours; pass everything straight through
+                    await send(message)
+                    return
+                start = message
+                return
+            if start is False:
+                await send(message)
+                return
+
+            body.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(scope, send, start, b"".join(body), if_none_match, b"authorization" in request_headers)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _finish(self, scope, send, start, body: bytes, if_none_match: Optional[bytes], authenticated: bool):
+        headers = [(name, value) for name, value in start["headers"]]
+        names = {name.lower() for name, _ in headers}
+        etag = next((value.decode() for name, value in headers if name.lower() == b"etag"), None)
+        if etag is None:
+            etag = body_etag(body)
+            headers.append((b"etag", etag.encode()))
+        if b"cache-control" not in names:
+            headers.append((b"cache-control", self._cache_control(scope["path"], authenticated).encode()))
+
+        if if_none_match is not None and etag_matches(if_none_match.decode("latin-1"), etag):
+            kept = [(name, value) for name, value in headers if name.lower() in NOT_MODIFIED_HEADERS]
+            await send({"type": "http.response.start", "status": 304, "headers": kept})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({**start, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
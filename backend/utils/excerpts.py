@@ -0,0 +1,77 @@
+"""
+Stored excerpts for itsyourradio's text-heavy documents.
+Summary list views show the start of a blog post or episode description
+instead of the whole body, so the excerpt is computed once on write and
+stored next to the body; list queries then project it and leave the body
+on the server. Documents written before excerpts existed are filled in
+by a one-off backfill job.
+"""
+
+import html
+import os
+import re
+
+from pymongo import UpdateOne
+
+from utils.jobs import job_queue
+from utils.response_cache import response_cache
+
+# Excerpt settings
+EXCERPT_LENGTH = int(os.environ.get("EXCERPT_LENGTH", 200))
+EXCERPT_BACKFILL_BATCH = 500
+
+# Collections with an excerpt, and the field each is taken from
+EXCERPT_SOURCES = {
+    "blog_posts": "content",
+    "artist_posts": "content",
+    "podcast_episodes": "description",
+}
+
+_TAG = re.compile(r"<[^>]*>")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def make_excerpt(text, length: int = EXCERPT_LENGTH):
+    """Plain-text start of a body, cut at a word boundary; None for empty bodies."""
+    if not text:
+        return None
+    text = _WHITESPACE.sub(" ", html.unescape(_TAG.sub(" ", text))).strip()
+    if len(text) <= length:
+        return text or None
+    cut = text[:length]
+    space = cut.rfind(" ")
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip(" .,;:-") + "…"
+
+
+@job_queue.register("backfill-excerpts", timeout=3600)
+async def backfill_excerpts_job(db, payload):
+    """Store excerpts on documents written before they were computed on write."""
+    counts = {}
+    for collection_name, source in EXCERPT_SOURCES.items():
+        collection = db[collection_name]
+        updated = 0
+        while True:
+            docs = await collection.find(
+                {"excerpt": {"$exists": False}}, {"_id": 1, source: 1}
+            ).limit(EXCERPT_BACKFILL_BATCH).to_list(EXCERPT_BACKFILL_BATCH)
+            if not docs:
+                break
+            await collection.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"excerpt": make_excerpt(doc.get(source))}}) for doc in docs
+            ], ordered=False)
+            updated += len(docs)
+        counts[collection_name] = updated
+
+    if counts["blog_posts"]:
+        await response_cache.invalidate("blog")
+    if counts["artist_posts"]:
+        artist_ids = await db.artist_posts.distinct("artist_id")
+        await response_cache.invalidate(*(f"artist:{artist_id}:posts" for artist_id in artist_ids))
+    return counts
+
+
+async def enqueue_excerpt_backfill():
+    """Queue the excerpt backfill; the key makes it run once per deployment history."""
+    return await job_queue.enqueue("backfill-excerpts", {}, key="backfill-excerpts:v1")
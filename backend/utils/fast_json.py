@@ -0,0 +1,259 @@
+"""
+Fast JSON rendering for itsyourradio's list responses.
+List routes return MongoDB documents that FastAPI would validate into
+response models one by one and then re-encode. For registered models the
+documents are instead fetched with a projection of just the model's
+fields and written straight to bytes with orjson, coercing only the
+values that need it (ints stored in float fields, nested models).
+Registration refuses field types this can't reproduce, and a startup
+check renders sample documents both ways to prove the output matches.
+List routes can also be asked for a slimmer shape (?view=summary, or
+?fields=a,b), which narrows both the projection and the rendered fields.
+"""
+
+import datetime
+import enum
+import os
+import types
+import typing
+from collections import OrderedDict
+from typing import Dict, Literal, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel, EmailStr, TypeAdapter
+
+_MISSING = object()
+_PASSTHROUGH = (str, int, bool, datetime.datetime, EmailStr)
+
+# Serializers kept for ?fields= selections; each distinct set of fields builds one
+FAST_JSON_SUBSET_CACHE_SIZE = int(os.environ.get("FAST_JSON_SUBSET_CACHE_SIZE", 256))
+
+# Fixed sample values the startup check renders both ways
+_SAMPLE_DATETIME = datetime.datetime(2024, 1, 2, 3, 4, 5, 678000)
+
+
+def _unwrap_optional(annotation):
+    """The X in Optional[X], or None if the annotation isn't optional."""
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+        raise TypeError(f"{annotation!r} unions can't be rendered without validation")
+    return None
+
+
+def _converter(annotation):
+    """
+    A function making a stored value serialize the way the annotation
+    would, or None if it already does. Raises TypeError for types that
+    need validation to render correctly.
+    """
+    inner = _unwrap_optional(annotation)
+    if inner is not None:
+        convert = _converter(inner)
+        return None if convert is None else (lambda value: None if value is None else convert(value))
+    if typing.get_origin(annotation) is list:
+        (item,) = typing.get_args(annotation)
+        convert = _converter(item)
+        return None if convert is None else (lambda value: [convert(element) for element in value])
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return FastSerializer(annotation).dump
+    if annotation is float:
+        return lambda value: float(value) if type(value) is int else value
+    if annotation in _PASSTHROUGH or (isinstance(annotation, type) and issubclass(annotation, enum.Enum)
+                                      and issubclass(annotation, str)):
+        return None
+    raise TypeError(f"{annotation!r} can't be rendered without validation")
+
+
+def _sample(annotation):
+    """A stored value for the annotation that exercises its conversion."""
+    inner = _unwrap_optional(annotation)
+    if inner is not None:
+        return _sample(inner)
+    if typing.get_origin(annotation) is list:
+        return [_sample(typing.get_args(annotation)[0])]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        sample = {name: _sample(field.annotation) for name, field in annotation.model_fields.items()}
+        sample["_unexpected"] = 1  # Stray stored fields must be dropped
+        return sample
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        return next(iter(annotation)).value
+    return {
+        str: "text é", int: 3, float: 3, bool: True,  # float gets an int on purpose
+        datetime.datetime: _SAMPLE_DATETIME, EmailStr: "someone@example.com",
+    }[annotation]
+
+
+class FastSerializer:
+    """Renders stored documents as a response model without validating them."""
+
+    def __init__(self, model, names: Optional[Tuple[str, ...]] = None):
+        self.model = model
+        if model.__pydantic_decorators__.field_serializers or model.__pydantic_decorators__.model_serializers:
+            raise TypeError(f"{model.__name__} has custom serializers")
+        self.fields = []
+        for name, field in model.model_fields.items():
+            if names is not None and name not in names:
+                continue
+            if field.alias or field.serialization_alias:
+                raise TypeError(f"{model.__name__}.{name} is aliased")
+            try:
+                convert = _converter(field.annotation)
+            except TypeError as e:
+                raise TypeError(f"{model.__name__}.{name}: {e}") from None
+            self.fields.append((name, field.is_required(), field.default, field.default_factory, convert))
+        self.names = tuple(name for name, *_ in self.fields)
+        self.name_set = frozenset(self.names)
+        self.converters = tuple((name, convert) for name, *_, convert in self.fields if convert is not None)
+        self.projection = {"_id": 0, **{name: 1 for name in self.names}}
+
+    def dump(self, doc: dict) -> dict:
+        """The document as the model would serialize it, in field order."""
+        if self.name_set - doc.keys():
+            return self._dump_with_defaults(doc)
+        item = {name: doc[name] for name in self.names}
+        for name, convert in self.converters:
+            value = item[name]
+            if value is not None:
+                item[name] = convert(value)
+        return item
+
+    def _dump_with_defaults(self, doc: dict) -> dict:
+        item = {}
+        for name, required, default, default_factory, convert in self.fields:
+            value = doc.get(name, _MISSING)
+            if value is _MISSING:
+                if required:
+                    raise ValueError(f"{self.model.__name__} document {doc.get('id')} has no {name}")
+                value = default_factory() if default_factory else default
+            elif convert is not None and value is not None:
+                value = convert(value)
+            item[name] = value
+        return item
+
+    def check(self):
+        """Render sample documents both ways and make sure the bytes are identical."""
+        adapter = TypeAdapter(self.model)
+        full = _sample(self.model)
+        # Fields left out entirely fall back to their defaults (factories aside, as they differ per call)
+        sparse = {name: value for name, value in full.items()
+                  if name not in self.model.model_fields or self.model.model_fields[name].is_required()
+                  or self.model.model_fields[name].default_factory}
+        for doc in (full, sparse):
+            expected = adapter.dump_json(adapter.validate_python(doc))
+            actual = orjson.dumps(self.dump(doc))
+            if actual != expected:
+                raise RuntimeError(
+                    f"Fast rendering of {self.model.__name__} doesn't match the model: {actual!r} != {expected!r}"
+                )
+
+
+_serializers: Dict[type, FastSerializer] = {}
+_subsets: "OrderedDict[Tuple[type, Tuple[str, ...]], FastSerializer]" = OrderedDict()
+_adapters: Dict[object, TypeAdapter] = {}
+
+
+def register_fast_models(*models):
+    """Opt response models into fast rendering; raises TypeError for models that can't be."""
+    for model in models:
+        _serializers[model] = FastSerializer(model)
+
+
+def check_fast_models():
+    """Startup check that fast rendering matches pydantic for every registered model."""
+    for serializer in _serializers.values():
+        serializer.check()
+
+
+def fast_projection(model) -> Optional[dict]:
+    """Projection of just the fields a registered model renders (None for other models)."""
+    serializer = _serializers.get(model)
+    return serializer.projection if serializer else None
+
+
+def _subset(model, fields: Tuple[str, ...]) -> FastSerializer:
+    """
+    Serializer for just some fields of a registered model. Clients choose
+    the fields, so only the most recently used selections are kept.
+    """
+    key = (model, fields)
+    serializer = _subsets.get(key)
+    if serializer is None:
+        serializer = _subsets[key] = FastSerializer(model, fields)
+        while len(_subsets) > FAST_JSON_SUBSET_CACHE_SIZE:
+            _subsets.popitem(last=False)
+    else:
+        _subsets.move_to_end(key)
+    return serializer
+
+
+def render_json(model, content, fields: Optional[Tuple[str, ...]] = None) -> bytes:
+    """
+    Serialize content (a document, or a list of them for List[model]) as
+    the response model: fast for registered models, validated otherwise.
+    With fields, only those fields of a registered model are rendered.
+    """
+    many = typing.get_origin(model) is list
+    item_model = typing.get_args(model)[0] if many else model
+    serializer = _serializers.get(item_model)
+    if fields is not None:
+        serializer = _subset(item_model, fields)
+    if serializer is not None:
+        return orjson.dumps([serializer.dump(doc) for doc in content] if many else serializer.dump(content))
+
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters[model] = TypeAdapter(model)
+    return adapter.dump_json(adapter.validate_python(content))
+
+
+def json_response(response: Response, model, content, fields: Optional[Tuple[str, ...]] = None) -> Response:
+    """Render content as the response model, keeping headers already set on the route's response."""
+    headers = {name: value for name, value in response.headers.items() if name not in ("content-length", "content-type")}
+    return Response(content=render_json(model, content, fields), media_type="application/json", headers=headers)
+
+
+class ListView:
+    """The item model, rendered fields and Mongo projection chosen for a list request."""
+
+    def __init__(self, model, fields: Optional[Tuple[str, ...]], projection: dict):
+        self.model = model
+        self.fields = fields
+        self.projection = projection
+
+
+class ViewParams:
+    """Query parameters choosing how much of each item a list route returns."""
+
+    def __init__(
+        self,
+        view: Literal["full", "summary"] = Query("full", description="Summary items leave out bodies and media details"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return for each item")
+    ):
+        self.view = view
+        self.fields = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip())) if fields else None
+
+    def select(self, full, summary, sort_field: str = "created_at") -> ListView:
+        """
+        Pick the item model for the requested view, narrowed to the
+        requested fields. The projection always keeps id and the sort
+        field, which the pagination cursor is built from.
+        """
+        model = summary if self.view == "summary" else full
+        fields = None
+        if self.fields is None:
+            projection = dict(_serializers[model].projection)
+        else:
+            unknown = [name for name in self.fields if name not in model.model_fields]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown fields for {self.view} view: {', '.join(unknown)}"
+                )
+            # In model order, so the same set of fields always shares a serializer
+            fields = tuple(name for name in model.model_fields if name in self.fields)
+            projection = dict(_subset(model, fields).projection)
+        projection.update({"id": 1, sort_field: 1})
+        return ListView(model, fields, projection)
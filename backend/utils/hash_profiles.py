@@ -0,0 +1,162 @@
+"""
+Password hash cost profiles for itsyourradio.
+Picks the hashing scheme and cost parameters from the environment, or
+calibrates them against a latency budget, and builds the matching passlib
+CryptContext settings. Stored hashes made with any other scheme or cost
+are flagged for rehashing on the user's next login, so every worker must
+agree on the cost: a calibrated cost is stored in the settings collection
+by the first worker to start and reused by all the others (delete it, or
+set the cost explicitly, to recalibrate).
+"""
+
+import logging
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import Optional
+
+from passlib.hash import argon2, bcrypt
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Hashing scheme: "bcrypt" or "argon2" (argon2 needs the argon2-cffi package)
+PASSWORD_HASH_SCHEME = os.environ.get("PASSWORD_HASH_SCHEME", "bcrypt")
+
+# Target time for a single hash; used when the cost is not set explicitly
+PASSWORD_HASH_BUDGET_MS = float(os.environ.get("PASSWORD_HASH_BUDGET_MS", 250))
+
+# Calibration takes the median of this many timed hashes
+PASSWORD_HASH_CALIBRATION_RUNS = int(os.environ.get("PASSWORD_HASH_CALIBRATION_RUNS", 5))
+
+# bcrypt cost (log2 rounds); calibrated within [min, max] when BCRYPT_ROUNDS is unset.
+# The floor is passlib's default cost; only an explicit setting goes below it.
+BCRYPT_ROUNDS = os.environ.get("BCRYPT_ROUNDS")
+BCRYPT_MIN_ROUNDS = int(os.environ.get("BCRYPT_MIN_ROUNDS", 12))
+BCRYPT_MAX_ROUNDS = int(os.environ.get("BCRYPT_MAX_ROUNDS", 14))
+
+# argon2id cost; time cost is calibrated when ARGON2_TIME_COST is unset
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", 64 * 1024))  # KiB
+ARGON2_TIME_COST = os.environ.get("ARGON2_TIME_COST")
+ARGON2_MAX_TIME_COST = int(os.environ.get("ARGON2_MAX_TIME_COST", 10))
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", 1))
+
+# Password used only to time hashes during calibration
+_CALIBRATION_SECRET = "calibration-password"
+
+
+def _time_hash(handler) -> float:
+    """Time a hash in milliseconds, as the median of several runs so one slow run doesn't skew it."""
+    timings = []
+    for _ in range(max(1, PASSWORD_HASH_CALIBRATION_RUNS)):
+        started_at = time.perf_counter()
+        handler.hash(_CALIBRATION_SECRET)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(timings)
+
+
+def bcrypt_settings(rounds: int) -> dict:
+    """CryptContext settings pinning bcrypt to exactly `rounds`."""
+    return {
+        "schemes": ["bcrypt"],
+        "default": "bcrypt",
+        "deprecated": "auto",
+        "bcrypt__rounds": rounds,
+        "bcrypt__min_rounds": rounds,
+        "bcrypt__max_rounds": rounds,
+    }
+
+
+def argon2_settings(time_cost: int) -> dict:
+    """CryptContext settings for argon2id, keeping bcrypt verifiable for old hashes."""
+    return {
+        "schemes": ["argon2", "bcrypt"],
+        "default": "argon2",
+        "deprecated": ["bcrypt"],
+        "argon2__type": "ID",
+        "argon2__memory_cost": ARGON2_MEMORY_COST,
+        "argon2__time_cost": time_cost,
+        "argon2__parallelism": ARGON2_PARALLELISM,
+        "argon2__min_rounds": time_cost,  # rounds is passlib's name for time_cost
+        "argon2__max_rounds": time_cost,
+    }
+
+
+def calibrate_bcrypt_rounds(budget_ms: float = PASSWORD_HASH_BUDGET_MS) -> int:
+    """Find the highest bcrypt cost that fits within the latency budget."""
+    # Each extra round doubles the work, so timing the lowest cost is enough
+    baseline_ms = _time_hash(bcrypt.using(rounds=BCRYPT_MIN_ROUNDS))
+    rounds = BCRYPT_MIN_ROUNDS
+    while rounds < BCRYPT_MAX_ROUNDS and baseline_ms * 2 ** (rounds + 1 - BCRYPT_MIN_ROUNDS) <= budget_ms:
+        rounds += 1
+    logger.info("bcrypt cost %d rounds at ~%.0fms (budget %.0fms)",
+                rounds, baseline_ms * 2 ** (rounds - BCRYPT_MIN_ROUNDS), budget_ms)
+    return rounds
+
+
+def calibrate_argon2_time_cost(budget_ms: float = PASSWORD_HASH_BUDGET_MS) -> int:
+    """Find the highest argon2 time cost that fits within the latency budget."""
+    # Work grows linearly with the time cost
+    single_pass_ms = _time_hash(argon2.using(
+        type="ID", memory_cost=ARGON2_MEMORY_COST, time_cost=1, parallelism=ARGON2_PARALLELISM
+    ))
+    time_cost = int(max(1, min(ARGON2_MAX_TIME_COST, budget_ms // max(single_pass_ms, 1))))
+    logger.info("argon2 time cost %d at ~%.0fms (budget %.0fms)",
+                time_cost, single_pass_ms * time_cost, budget_ms)
+    return time_cost
+
+
+def hash_scheme() -> str:
+    """The hashing scheme this deployment can actually use."""
+    scheme = PASSWORD_HASH_SCHEME.lower()
+    if scheme == "argon2":
+        if argon2.has_backend():
+            return scheme
+        logger.warning("PASSWORD_HASH_SCHEME=argon2 but argon2-cffi is not installed; using bcrypt")
+    elif scheme != "bcrypt":
+        logger.warning("Unknown PASSWORD_HASH_SCHEME %r; using bcrypt", PASSWORD_HASH_SCHEME)
+    return "bcrypt"
+
+
+def configured_cost(scheme: str) -> Optional[int]:
+    """The cost set explicitly in the environment, if any."""
+    cost = ARGON2_TIME_COST if scheme == "argon2" else BCRYPT_ROUNDS
+    return int(cost) if cost else None
+
+
+def calibrate_cost(scheme: str) -> int:
+    """Calibrate the cost for a scheme. This hashes many times, so call it off the event loop."""
+    return calibrate_argon2_time_cost() if scheme == "argon2" else calibrate_bcrypt_rounds()
+
+
+def hash_settings(scheme: str, cost: int) -> dict:
+    """CryptContext settings for a scheme at a cost."""
+    return argon2_settings(cost) if scheme == "argon2" else bcrypt_settings(cost)
+
+
+async def stored_cost(db, scheme: str, calibrate) -> int:
+    """
+    Get the calibrated cost every worker shares, calibrating (with the
+    async callable `calibrate`) only when none is stored yet. When workers
+    start together, the first one to store its result wins.
+    """
+    key = f"password-hash-cost:{scheme}"
+    stored = await db.settings.find_one({"key": key})
+    if stored is None:
+        cost = await calibrate()
+        try:
+            await db.settings.insert_one({"key": key, "value": cost, "created_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            pass
+        stored = await db.settings.find_one({"key": key})
+    return stored["value"]
+
+
+def describe_hash_settings(settings: dict) -> dict:
+    """Summarize the active profile for metrics."""
+    return {
+        key.split("__", 1)[-1] if "__" in key else key: value
+        for key, value in settings.items()
+        if key == "default" or "__" in key
+    }
@@ -0,0 +1,134 @@
+"""
+Image derivatives for itsyourradio.
+Uploaded profile, cover and album/podcast art is resized to a few fixed
+widths and re-encoded as WebP after upload. Pillow runs in a process
+pool so decoding large originals never blocks the event loop, and pages
+request the smallest variant that fits instead of the original.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional
+
+# Derivative settings
+IMAGE_WIDTHS = tuple(sorted(int(width) for width in os.environ.get("IMAGE_WIDTHS", "160,320,640,1280").split(",")))
+IMAGE_WEBP_QUALITY = int(os.environ.get("IMAGE_WEBP_QUALITY", 80))
+IMAGE_PROCESS_WORKERS = int(os.environ.get("IMAGE_PROCESS_WORKERS", 2))
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 50_000_000))  # Refuse decompression bombs
+
+# Document fields holding an uploaded image URL, per collection; variants go in "<name>_variants"
+IMAGE_URL_FIELDS = {
+    "users": ("profile_image_url", "cover_image_url"),
+    "albums": ("cover_art_url",),
+    "podcast_shows": ("cover_art_url",),
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def variants_field(url_field: str) -> str:
+    """Name of the field holding the variants for an image URL field."""
+    return url_field[:-len("_url")] + "_variants"
+
+
+def variant_path(source: Path, width: int) -> Path:
+    """Where the WebP derivative of an image at a given width is stored."""
+    return source.with_name(f"{source.stem}.{width}w.webp")
+
+
+def render_variants(source: str, widths=IMAGE_WIDTHS, quality: int = IMAGE_WEBP_QUALITY, max_pixels: int = IMAGE_MAX_PIXELS):
+    """
+    Write WebP derivatives of an image at each width smaller than the
+    original (or one at the original width if it is smaller than all of
+    them). Runs in a worker process; returns [{width, height, path, size}].
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    source = Path(source)
+    with Image.open(source) as original:
+        # Let JPEG decode at a reduced scale when even the largest variant is much smaller
+        original.draft(None, (max(widths), max(widths)))
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    targets = [width for width in widths if width < image.width] or [image.width]
+    variants = []
+    # Resize largest first so each step starts from the previous, smaller image
+    for width in sorted(targets, reverse=True):
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.LANCZOS)
+
+        path = variant_path(source, width)
+        descriptor, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".variant-")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                image.save(file, "WEBP", quality=quality, method=4)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        variants.append({"width": width, "height": height, "path": str(path), "size": path.stat().st_size})
+    return sorted(variants, key=lambda variant: variant["width"])
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned (not forked) workers, since the API process has threads running
+        _pool = ProcessPoolExecutor(
+            max_workers=IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=200,
+        )
+    return _pool
+
+
+async def generate_variants(source: Path) -> List[dict]:
+    """Render derivatives of an image in the process pool."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), render_variants, str(source))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); the next attempt gets a fresh pool
+        shutdown_image_pool()
+        raise
+
+
+def shutdown_image_pool():
+    """Stop the worker processes."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def pick_variant(variants: List[dict], width: Optional[int]) -> Optional[dict]:
+    """The smallest variant at least `width` wide, else the largest one."""
+    if not variants:
+        return None
+    if width:
+        for variant in variants:
+            if variant["width"] >= width:
+                return variant
+    return variants[-1]
+
+
+async def image_variants(db, url: Optional[str]) -> List[dict]:
+    """Get the recorded variants for an uploaded image URL (e.g. /uploads/album_art/x.jpg)."""
+    if not url or not url.startswith("/uploads/"):
+        return []
+    record = await db.media_files.find_one({"path": url.lstrip("/")}, {"variants": 1})
+    return (record or {}).get("variants") or []
+
+
+async def attach_image_variants(db, collection: str, data: dict):
+    """For each image URL field being set in an update, also set its recorded variants."""
+    for url_field in IMAGE_URL_FIELDS[collection]:
+        if url_field in data:
+            data[variants_field(url_field)] = await image_variants(db, data[url_field])
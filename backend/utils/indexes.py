@@ -0,0 +1,125 @@
+"""
+MongoDB index registry for itsyourradio.
+Every query shape used by the API is declared here so indexes can be
+created idempotently at startup and audited at runtime.
+"""
+
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _id_index():
+    """Unique lookup index on the application-level id field."""
+    return IndexModel([("id", ASCENDING)], unique=True, name="id_unique")
+
+
+# Required indexes per collection. List routes page on (sort_field, id)
+# descending, so compound indexes end with those two keys.
+INDEXES = {
+    "users": [
+        _id_index(),
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("role", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="role_created_at_id"),
+    ],
+    "albums": [
+        _id_index(),
+        IndexModel([("artist_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="artist_created_at_id"),
+    ],
+    "songs": [
+        _id_index(),
+        IndexModel([("artist_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="artist_created_at_id"),
+    ],
+    "podcast_shows": [
+        _id_index(),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel([("is_original", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="original_created_at_id"),
+        IndexModel([("is_classic", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="classic_created_at_id"),
+    ],
+    "podcast_episodes": [
+        _id_index(),
+        IndexModel([("show_id", ASCENDING), ("published_at", DESCENDING), ("id", DESCENDING)], name="show_published_at_id"),
+    ],
+    "blog_posts": [
+        _id_index(),
+        IndexModel([("is_published", ASCENDING), ("published_at", DESCENDING), ("id", DESCENDING)], name="published_at_id"),
+    ],
+    "artist_posts": [
+        _id_index(),
+        IndexModel(
+            [("artist_id", ASCENDING), ("is_published", ASCENDING), ("published_at", DESCENDING), ("id", DESCENDING)],
+            name="artist_published_at_id"
+        ),
+    ],
+    "upload_sessions": [
+        _id_index(),
+    ],
+    "direct_uploads": [
+        _id_index(),
+    ],
+    "jobs": [
+        _id_index(),
+        IndexModel(
+            [("key", ASCENDING)], unique=True, name="key_unique",
+            partialFilterExpression={"key": {"$type": "string"}}
+        ),
+        IndexModel([("status", ASCENDING), ("run_after", ASCENDING)], name="status_run_after"),
+    ],
+    "blobs": [
+        IndexModel([("path", ASCENDING)], unique=True, name="path_unique"),
+    ],
+    "media_files": [
+        IndexModel([("path", ASCENDING)], unique=True, name="path_unique"),
+    ],
+    "settings": [
+        IndexModel([("key", ASCENDING)], unique=True, name="key_unique"),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """
+    Create every registered index that does not exist yet.
+    Creating an index that already exists with the same spec is a no-op, so
+    this is safe to run on every startup. Failures (e.g. duplicate values
+    blocking a unique index) are logged rather than stopping the app.
+    """
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created = await db[collection_name].create_indexes(indexes)
+            logger.info("Indexes ensured on %s: %s", collection_name, ", ".join(created))
+        except OperationFailure as e:
+            logger.error("Could not create indexes on %s: %s", collection_name, e)
+
+
+async def index_report(db):
+    """
+    Compare the registry with the indexes that actually exist.
+    For each collection, reports registered indexes that are missing,
+    existing indexes that are not registered, and indexes that have not
+    been used since the server started (from $indexStats).
+    """
+    report = {}
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        declared = {index.document["name"] for index in indexes}
+        existing = set((await collection.index_information()).keys()) - {"_id_"}
+
+        try:
+            stats = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+            usage = {stat["name"]: stat["accesses"]["ops"] for stat in stats}
+        except OperationFailure:
+            usage = {}
+
+        report[collection_name] = {
+            "missing": sorted(declared - existing),
+            "undeclared": sorted(existing - declared),
+            "unused": sorted(name for name in existing if usage.get(name) == 0),
+            "usage": {name: usage.get(name) for name in sorted(existing)},
+        }
+    return report
@@ -0,0 +1,292 @@
+"""
+Background job queue for itsyourradio.
+Work that doesn't need to finish before a request returns (probing and
+analysing uploads, generating derived files) runs in worker tasks. Jobs
+are recorded in MongoDB, which is the source of truth for their status;
+job ids are delivered through an in-process queue, or a Redis list when
+REDIS_URL is set so any API process can pick up work another one queued.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Job queue configuration
+REDIS_URL = os.environ.get("REDIS_URL")
+JOB_REDIS_PREFIX = os.environ.get("JOB_REDIS_PREFIX", "itsyourradio:jobs:")
+JOB_POLL_TIMEOUT = int(os.environ.get("JOB_POLL_TIMEOUT", 5))
+JOB_SWEEP_INTERVAL = float(os.environ.get("JOB_SWEEP_INTERVAL", 10))
+JOB_RETRY_BASE_DELAY = float(os.environ.get("JOB_RETRY_BASE_DELAY", 5))
+JOB_RETRY_MAX_DELAY = float(os.environ.get("JOB_RETRY_MAX_DELAY", 600))
+# Jobs dispatched this long ago but never picked up are dispatched again
+JOB_STALE_AFTER = int(os.environ.get("JOB_STALE_AFTER", 1800))
+# Running jobs past their type's timeout by this much belong to a dead worker and run again
+JOB_STALE_GRACE = int(os.environ.get("JOB_STALE_GRACE", 300))
+
+JobHandler = Callable[[object, dict], Awaitable[Optional[dict]]]
+
+
+@dataclass
+class JobType:
+    """A registered kind of job and how it may be run."""
+    name: str
+    handler: JobHandler
+    concurrency: int
+    max_attempts: int
+    timeout: float
+
+
+class LocalBackend:
+    """Delivers job ids through asyncio queues inside this process."""
+
+    def __init__(self):
+        self._queues: Dict[str, asyncio.Queue] = {}
+
+    def _queue(self, job_type: str) -> asyncio.Queue:
+        if job_type not in self._queues:
+            self._queues[job_type] = asyncio.Queue()
+        return self._queues[job_type]
+
+    async def push(self, job_type: str, job_id: str):
+        self._queue(job_type).put_nowait(job_id)
+
+    async def pop(self, job_type: str, timeout: int) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._queue(job_type).get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def depth(self, job_type: str) -> int:
+        return self._queue(job_type).qsize()
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """Delivers job ids through Redis lists shared by every API process."""
+
+    def __init__(self, url: str, prefix: str = JOB_REDIS_PREFIX):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    async def push(self, job_type: str, job_id: str):
+        await self._redis.lpush(self.prefix + job_type, job_id)
+
+    async def pop(self, job_type: str, timeout: int) -> Optional[str]:
+        item = await self._redis.brpop([self.prefix + job_type], timeout=timeout)
+        return item[1].decode() if item else None
+
+    async def depth(self, job_type: str) -> int:
+        return await self._redis.llen(self.prefix + job_type)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class JobQueue:
+    """Runs registered job types on a fixed number of worker tasks each."""
+
+    def __init__(self):
+        self.types: Dict[str, JobType] = {}
+        self.db = None
+        self.backend = None
+        self._tasks = []
+        self._busy: Dict[str, int] = {}
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def register(self, name: str, concurrency: int = 1, max_attempts: int = 3, timeout: float = 600):
+        """Decorator registering an async handler(db, payload) -> result dict for a job type."""
+        def decorator(handler: JobHandler):
+            self.types[name] = JobType(name, handler, concurrency, max_attempts, timeout)
+            self._busy[name] = 0
+            return handler
+        return decorator
+
+    async def enqueue(
+        self, job_type: str, payload: dict, key: Optional[str] = None, user_id: Optional[str] = None, delay: float = 0
+    ):
+        """
+        Queue a job and return its record. When an idempotency key is given
+        and a job with that key already exists, that job is returned instead
+        of queueing the work again. Delayed jobs are dispatched by the sweep
+        once they are due.
+        """
+        if job_type not in self.types:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if key:
+            existing = await self.db.jobs.find_one({"key": key}, {"_id": 0})
+            if existing:
+                return existing
+
+        now = datetime.utcnow()
+        job = Job(
+            type=job_type, key=key, user_id=user_id, payload=payload,
+            max_attempts=self.types[job_type].max_attempts, run_after=now + timedelta(seconds=delay)
+        ).dict()
+        job["dispatched_at"] = None if delay else now
+        try:
+            await self.db.jobs.insert_one(job)
+        except DuplicateKeyError:
+            # Another request queued the same key first
+            return await self.db.jobs.find_one({"key": key}, {"_id": 0})
+        job.pop("_id", None)
+
+        if not delay:
+            await self.backend.push(job_type, job["id"])
+        return job
+
+    async def _run(self, job_type: JobType, job_id: str):
+        """Claim a job and run it, recording the outcome."""
+        now = datetime.utcnow()
+        job = await self.db.jobs.find_one_and_update(
+            {"id": job_id, "status": JobStatus.QUEUED, "run_after": {"$lte": now}},
+            {"$set": {"status": JobStatus.RUNNING, "started_at": now, "updated_at": now}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            return  # Already claimed elsewhere, finished, or not due yet
+
+        self._busy[job_type.name] += 1
+        try:
+            result = await asyncio.wait_for(job_type.handler(self.db, job["payload"]), job_type.timeout)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without using up an attempt
+            await self.db.jobs.update_one(
+                {"id": job_id},
+                {"$set": {"status": JobStatus.QUEUED, "dispatched_at": None, "updated_at": datetime.utcnow()},
+                 "$inc": {"attempts": -1}}
+            )
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            now = datetime.utcnow()
+            if job["attempts"] < job["max_attempts"]:
+                delay = min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (job["attempts"] - 1))
+                logger.warning("Job %s (%s) failed, retrying in %ss: %s", job_id, job_type.name, delay, error)
+                update = {"status": JobStatus.QUEUED, "run_after": now + timedelta(seconds=delay), "dispatched_at": None}
+                self.retried += 1
+            else:
+                logger.error("Job %s (%s) failed after %s attempts: %s", job_id, job_type.name, job["attempts"], error)
+                update = {"status": JobStatus.FAILED, "finished_at": now}
+                self.failed += 1
+            await self.db.jobs.update_one({"id": job_id}, {"$set": {**update, "error": error, "updated_at": now}})
+        else:
+            now = datetime.utcnow()
+            await self.db.jobs.update_one(
+                {"id": job_id},
+                {"$set": {
+                    "status": JobStatus.SUCCEEDED, "result": result, "error": None,
+                    "finished_at": now, "updated_at": now,
+                }}
+            )
+            self.succeeded += 1
+        finally:
+            self._busy[job_type.name] -= 1
+
+    async def _worker(self, job_type: JobType):
+        while True:
+            job_id = await self.backend.pop(job_type.name, JOB_POLL_TIMEOUT)
+            if job_id is None:
+                continue
+            try:
+                await self._run(job_type, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job worker for %s failed on %s", job_type.name, job_id)
+
+    async def sweep(self):
+        """
+        Dispatch jobs that are due but not waiting in the queue: retries
+        whose backoff has passed, and jobs left behind by a process that
+        stopped (queued but never delivered, or running for too long).
+        """
+        now = datetime.utcnow()
+        # A live worker gives up on a job at its timeout, so only a dead one leaves it running longer
+        for job_type in self.types.values():
+            await self.db.jobs.update_many(
+                {
+                    "status": JobStatus.RUNNING,
+                    "type": job_type.name,
+                    "started_at": {"$lt": now - timedelta(seconds=job_type.timeout + JOB_STALE_GRACE)},
+                },
+                {"$set": {"status": JobStatus.QUEUED, "dispatched_at": None, "updated_at": now}}
+            )
+
+        stale = now - timedelta(seconds=JOB_STALE_AFTER)
+
+        while True:
+            job = await self.db.jobs.find_one_and_update(
+                {
+                    "status": JobStatus.QUEUED,
+                    "type": {"$in": list(self.types)},
+                    "run_after": {"$lte": now},
+                    "$or": [{"dispatched_at": None}, {"dispatched_at": {"$lt": stale}}],
+                },
+                {"$set": {"dispatched_at": now}},
+                projection={"id": 1, "type": 1}
+            )
+            if job is None:
+                break
+            await self.backend.push(job["type"], job["id"])
+
+    async def _sweeper(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Job sweep failed")
+            await asyncio.sleep(JOB_SWEEP_INTERVAL)
+
+    def start(self, db):
+        """Start the workers for every registered job type."""
+        if self._tasks:
+            return
+        self.db = db
+        self.backend = RedisBackend(REDIS_URL) if REDIS_URL else LocalBackend()
+        for job_type in self.types.values():
+            for _ in range(job_type.concurrency):
+                self._tasks.append(asyncio.create_task(self._worker(job_type)))
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        """Stop the workers; jobs they were running are handed back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self):
+        """Get worker metrics."""
+        return {
+            "backend": "redis" if REDIS_URL else "local",
+            "types": {
+                name: {"concurrency": job_type.concurrency, "busy": self._busy[name]}
+                for name, job_type in self.types.items()
+            },
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+
+job_queue = JobQueue()
@@ -0,0 +1,278 @@
+"""
+Media file serving for itsyourradio.
+Serves uploaded audio and images with byte ranges (for seeking and
+podcast client resume), strong ETags taken from the content hash stored
+at upload time, and zero-copy transfer where the deployment allows it:
+the ASGI zerocopysend extension when the server offers it, or an nginx
+X-Accel-Redirect so nginx's sendfile does the work. With remote storage,
+requests are redirected to a short-lived presigned URL instead.
+When nginx serves the bytes it also answers Range / If-Range with its own
+ETag (mtime and size), so in that mode the same ETag is used here too.
+"""
+
+import mimetypes
+import os
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import formatdate
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from fastapi import HTTPException, Request
+from pymongo import ReturnDocument
+from starlette.responses import RedirectResponse, Response
+
+from utils.blobstore import BLOB_PREFIX
+from utils.storage import S3_PRESIGN_EXPIRES, storage
+from utils.uploads import PUBLIC_HTML_DIR, StoredUpload
+
+# Top-level public_html directories that may be served
+MEDIA_ROOTS = ("station", "uploads")
+
+# Internal nginx location aliased to public_html (e.g. /_media/); unset to stream from Python.
+# Leave nginx's etag on there: its ETags are the ones clients send back in If-Range.
+MEDIA_ACCEL_REDIRECT = os.environ.get("MEDIA_ACCEL_REDIRECT")
+
+MEDIA_CHUNK_SIZE = 256 * 1024
+
+# Details measured from an uploaded file and copied onto songs and episodes
+MEDIA_DETAIL_FIELDS = ("mime_type", "duration", "bitrate", "sample_rate", "loudness", "loudness_range", "true_peak")
+MEDIA_MAX_AGE = int(os.environ.get("MEDIA_MAX_AGE", 86400))
+
+# Extra types not always known to the mimetypes module
+mimetypes.add_type("audio/mp4", ".m4a")
+mimetypes.add_type("audio/flac", ".flac")
+mimetypes.add_type("audio/ogg", ".ogg")
+mimetypes.add_type("audio/ogg", ".opus")
+mimetypes.add_type("image/webp", ".webp")
+
+
+async def record_media_file(db, path: str, stored: StoredUpload) -> int:
+    """
+    Remember the size and content hash of an uploaded file, keyed by its
+    public_html path, and return the record's generation. Details measured
+    from a different earlier file at the same path are cleared and the
+    generation moves on, so the processing jobs (keyed by it) run again
+    even for content the path held before; re-uploading identical bytes
+    keeps both, as there is nothing new to measure.
+    """
+    record = {"path": path, "size": stored.size, "sha256": stored.sha256, "updated_at": datetime.utcnow()}
+    existing = await db.media_files.find_one({"path": path}, {"sha256": 1, "generation": 1})
+    if existing is not None and existing.get("sha256") == stored.sha256:
+        await db.media_files.update_one({"path": path}, {"$set": record})
+        return existing.get("generation", 0)
+
+    record.update({field: None for field in MEDIA_DETAIL_FIELDS})
+    record["mime_type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    updated = await db.media_files.find_one_and_update(
+        {"path": path}, {"$set": record, "$inc": {"generation": 1}},
+        projection={"generation": 1}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return updated["generation"]
+
+
+async def media_file_details(db, path: str):
+    """
+    Get the stored size and measured details of an uploaded audio file as
+    Song / PodcastEpisode fields, or {} if the file was never recorded.
+    """
+    record = await db.media_files.find_one({"path": path}, {"_id": 0})
+    if not record:
+        return {}
+    details = {field: record.get(field) for field in MEDIA_DETAIL_FIELDS}
+    details["file_size"] = record.get("size")
+    return details
+
+
+class ETagCache:
+    """Maps (path, mtime, size) to an ETag so hashes are looked up once per file version."""
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        etag = self._entries.get(key)
+        if etag is not None:
+            self._entries.move_to_end(key)
+        return etag
+
+    def put(self, key, etag: str):
+        self._entries[key] = etag
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+etag_cache = ETagCache()
+
+
+def resolve_media_path(file_path: str) -> Path:
+    """Map a request path onto a file under public_html, refusing anything outside the media roots."""
+    root = PUBLIC_HTML_DIR.resolve()
+    path = (root / file_path).resolve()
+    parts = path.relative_to(root).parts if path.is_relative_to(root) else ()
+    if not parts or parts[0] not in MEDIA_ROOTS:
+        raise HTTPException(status_code=404, detail="File not found")
+    return path
+
+
+def media_key(file_path: str) -> str:
+    """Map a request path onto a storage key, refusing anything outside the media roots."""
+    return resolve_media_path(file_path).relative_to(PUBLIC_HTML_DIR.resolve()).as_posix()
+
+
+def nginx_etag(stat) -> str:
+    """The ETag nginx gives a static file."""
+    return '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+async def media_etag(db, relative_path: str, stat) -> str:
+    """
+    Strong ETag from the stored content hash, or a weak one from size and
+    mtime. Behind nginx, its own ETag, so validators match whichever of
+    the two answers the request.
+    """
+    if MEDIA_ACCEL_REDIRECT:
+        return nginx_etag(stat)
+    key = (relative_path, stat.st_mtime_ns, stat.st_size)
+    etag = etag_cache.get(key)
+    if etag is None:
+        record = await db.media_files.find_one({"path": relative_path}, {"sha256": 1, "size": 1})
+        if record and record.get("sha256") and record.get("size") == stat.st_size:
+            etag = '"%s"' % record["sha256"]
+        else:
+            etag = 'W/"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+        etag_cache.put(key, etag)
+    return etag
+
+
+def parse_range(header: Optional[str], size: int):
+    """
+    Parse a single-range "bytes=" header into an inclusive (start, end).
+    Returns None to serve the whole file (no header, or multiple ranges),
+    and raises 416 when the range can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start_text, _, end_text = header[6:].strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    plain = etag.removeprefix("W/")
+    return "*" in tags or any(tag.removeprefix("W/") == plain for tag in tags)
+
+
+class MediaFileResponse(Response):
+    """Sends a byte range of a file, zero-copy when the server supports it."""
+
+    def __init__(self, path: Path, start: int, end: int, status_code: int, headers: dict, send_body: bool):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.count = end - start + 1
+        self.send_body = send_body
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body or self.count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            # Server calls os.sendfile() on the descriptor for us
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.start,
+                    "count": self.count,
+                })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(self.start)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await file.read(min(MEDIA_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+async def media_response(request: Request, db, file_path: str) -> Response:
+    """Build the response for a media request, honouring Range, If-Range and If-None-Match."""
+    if storage.remote:
+        # The object store handles ranges and validators itself
+        url = await storage.presigned_url(media_key(file_path))
+        return RedirectResponse(url, status_code=302, headers={"Cache-Control": f"private, max-age={S3_PRESIGN_EXPIRES // 2}"})
+
+    path = resolve_media_path(file_path)
+    try:
+        stat = await anyio.to_thread.run_sync(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+
+    relative_path = path.relative_to(PUBLIC_HTML_DIR.resolve()).as_posix()
+    etag = await media_etag(db, relative_path, stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={MEDIA_MAX_AGE}",
+    }
+    if relative_path.startswith(BLOB_PREFIX + "/"):
+        # Blob URLs are content-addressed, so they never change
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # Hand the transfer to nginx (which uses sendfile) when it is in front of us
+    if MEDIA_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = MEDIA_ACCEL_REDIRECT.rstrip("/") + "/" + relative_path
+        return Response(status_code=200, headers=headers, media_type=mimetypes.guess_type(path.name)[0])
+
+    # Only honour Range if the client's cached copy is still current
+    byte_range = parse_range(request.headers.get("range"), stat.st_size)
+    if_range = request.headers.get("if-range")
+    if byte_range and if_range and not (if_range.startswith('"') and if_range == etag):
+        byte_range = None
+
+    start, end = byte_range or (0, stat.st_size - 1)
+    headers["Content-Type"] = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = 200
+    if byte_range:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+
+    return MediaFileResponse(path, start, end, status_code, headers, send_body=request.method != "HEAD")
@@ -0,0 +1,190 @@
+"""
+Post-upload media processing jobs for itsyourradio.
+Uploads return as soon as the file is on disk; probing, loudness
+analysis, waveform peaks and image derivatives then run on the job
+queue, and their results are copied onto the media_files record and any
+document that uses the file.
+"""
+
+import asyncio
+import collections
+import os
+import re
+import shutil
+from pathlib import Path
+
+from utils.images import IMAGE_PROCESS_WORKERS, IMAGE_URL_FIELDS, generate_variants, variants_field
+from utils.jobs import job_queue
+from utils.media_probe import probe_media
+from utils.response_cache import response_cache
+from utils.rss import feed_cache
+from utils.user_cache import user_cache
+from utils.storage import storage
+from utils.uploads import StoredUpload
+from utils.waveform import ffmpeg_peaks, peaks_path, wav_peaks
+
+# Job settings
+MEDIA_PROBE_CONCURRENCY = int(os.environ.get("MEDIA_PROBE_CONCURRENCY", 4))
+LOUDNESS_CONCURRENCY = int(os.environ.get("LOUDNESS_CONCURRENCY", 1))
+LOUDNESS_TIMEOUT = float(os.environ.get("LOUDNESS_TIMEOUT", 1800))
+WAVEFORM_CONCURRENCY = int(os.environ.get("WAVEFORM_CONCURRENCY", 2))
+WAVEFORM_TIMEOUT = float(os.environ.get("WAVEFORM_TIMEOUT", 1800))
+
+# Loudness analysis and waveforms decode the file with ffmpeg
+FFMPEG_PATH = os.environ.get("FFMPEG_PATH", "ffmpeg")
+
+_LOUDNESS_PATTERNS = {
+    "loudness": re.compile(r"\bI:\s+(-?[\d.]+|-inf) LUFS"),
+    "loudness_range": re.compile(r"\bLRA:\s+([\d.]+) LU\b"),
+    "true_peak": re.compile(r"\bPeak:\s+(-?[\d.]+|-inf) dBFS"),
+}
+
+
+async def apply_media_details(db, path: str, details: dict):
+    """Store details on a media record and copy them onto songs and episodes using the file."""
+    details = {key: value for key, value in details.items() if value is not None}
+    if not details:
+        return
+    await db.media_files.update_one({"path": path}, {"$set": details})
+    artist_ids = await db.songs.distinct("artist_id", {"file_path": path})
+    if artist_ids:
+        await db.songs.update_many({"file_path": path}, {"$set": details})
+        await response_cache.invalidate(*(f"artist:{artist_id}:songs" for artist_id in artist_ids))
+
+    show_ids = await db.podcast_episodes.distinct("show_id", {"file_path": path})
+    if show_ids:
+        await db.podcast_episodes.update_many({"file_path": path}, {"$set": details})
+        for show_id in show_ids:
+            feed_cache.invalidate(show_id)
+
+
+@job_queue.register("probe-media", concurrency=MEDIA_PROBE_CONCURRENCY, timeout=60)
+async def probe_media_job(db, payload):
+    """Read the MIME type, duration, bitrate and sample rate of an uploaded file."""
+    async with storage.local_copy(payload["path"]) as path:
+        info = await asyncio.to_thread(probe_media, path)
+    details = info.to_dict()
+    await apply_media_details(db, payload["path"], details)
+    return details
+
+
+def ffmpeg_available() -> bool:
+    """Whether ffmpeg is installed for decoding uploads."""
+    return shutil.which(FFMPEG_PATH) is not None
+
+
+def parse_loudness(output: str):
+    """Pull integrated loudness, loudness range and true peak out of an ebur128 summary."""
+    summary = output[output.rfind("Summary:"):]
+    result = {}
+    for name, pattern in _LOUDNESS_PATTERNS.items():
+        match = pattern.search(summary)
+        if match:
+            value = float(match.group(1))
+            result[name] = value if value != float("-inf") else None
+    return result
+
+
+@job_queue.register("analyze-loudness", concurrency=LOUDNESS_CONCURRENCY, timeout=LOUDNESS_TIMEOUT)
+async def analyze_loudness_job(db, payload):
+    """Measure EBU R128 loudness so players can level songs and episodes."""
+    async with storage.local_copy(payload["path"]) as path:
+        process = await asyncio.create_subprocess_exec(
+            FFMPEG_PATH, "-hide_banner", "-nostats", "-i", str(path),
+            "-filter_complex", "ebur128=peak=true", "-f", "null", "-",
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            # ebur128 logs every frame; keep only the tail that holds the summary
+            tail = collections.deque(maxlen=50)
+            async for line in process.stderr:
+                tail.append(line.decode(errors="replace"))
+            return_code = await process.wait()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+
+    output = "".join(tail)
+    if return_code != 0:
+        raise RuntimeError(f"ffmpeg exited with {return_code}: {output[-500:].strip()}")
+    result = parse_loudness(output)
+    if "loudness" not in result:
+        raise RuntimeError("ffmpeg did not report integrated loudness")
+    await apply_media_details(db, payload["path"], result)
+    return result
+
+
+@job_queue.register("waveform-peaks", concurrency=WAVEFORM_CONCURRENCY, timeout=WAVEFORM_TIMEOUT)
+async def waveform_peaks_job(db, payload):
+    """Precompute the min/max peaks players use to draw a waveform."""
+    async with storage.local_copy(payload["path"]) as audio_path:
+        if ffmpeg_available():
+            result = await ffmpeg_peaks(audio_path, FFMPEG_PATH)
+        else:
+            result = await asyncio.to_thread(wav_peaks, audio_path)
+        await storage.put_file(peaks_path(audio_path), peaks_path(Path(payload["path"])).as_posix())
+    return result
+
+
+async def enqueue_media_jobs(path: str, stored: StoredUpload, generation: int, user_id: str):
+    """
+    Queue processing for an uploaded audio file; returns {job type: job id}.
+    The generation comes from record_media_file, so jobs are shared by
+    repeated uploads of the same bytes but not across a content change.
+    """
+    job_types = ["probe-media"]
+    if ffmpeg_available():
+        job_types += ["analyze-loudness", "waveform-peaks"]
+    elif path.lower().endswith(".wav"):
+        job_types.append("waveform-peaks")
+
+    jobs = {}
+    for job_type in job_types:
+        job = await job_queue.enqueue(
+            job_type, {"path": path}, key=f"{job_type}:{path}:{stored.sha256}:{generation}", user_id=user_id
+        )
+        jobs[job_type] = job["id"]
+    return jobs
+
+
+@job_queue.register("image-derivatives", concurrency=IMAGE_PROCESS_WORKERS, timeout=300)
+async def image_derivatives_job(db, payload):
+    """Render resized WebP variants of an uploaded image and attach them to its owners."""
+    async with storage.local_copy(payload["path"]) as source:
+        variants = await generate_variants(source)
+        for variant in variants:
+            # Rendered next to the local copy, under the names they get in storage
+            rendered = Path(variant.pop("path"))
+            key = Path(payload["path"]).with_name(rendered.name).as_posix()
+            await storage.put_file(rendered, key)
+            variant["url"] = "/" + key
+    await db.media_files.update_one({"path": payload["path"]}, {"$set": {"variants": variants}})
+
+    url = "/" + payload["path"]
+    for collection, url_fields in IMAGE_URL_FIELDS.items():
+        for url_field in url_fields:
+            owner_ids = await db[collection].distinct("id", {url_field: url})
+            if not owner_ids:
+                continue
+            await db[collection].update_many({url_field: url}, {"$set": {variants_field(url_field): variants}})
+            if collection == "users":
+                for user_id in owner_ids:
+                    user_cache.invalidate(user_id)
+                await response_cache.invalidate(*(f"artist:{user_id}" for user_id in owner_ids))
+            elif collection == "albums":
+                artist_ids = await db.albums.distinct("artist_id", {url_field: url})
+                await response_cache.invalidate(*(f"artist:{artist_id}:albums" for artist_id in artist_ids))
+            elif collection == "podcast_shows":
+                await response_cache.invalidate(*(f"show:{show_id}" for show_id in owner_ids))
+    return {"variants": variants}
+
+
+async def enqueue_image_jobs(path: str, stored: StoredUpload, generation: int, user_id: str):
+    """Queue derivative rendering for an uploaded image (see enqueue_media_jobs); returns {job type: job id}."""
+    job = await job_queue.enqueue(
+        "image-derivatives", {"path": path}, key=f"image-derivatives:{path}:{stored.sha256}:{generation}", user_id=user_id
+    )
+    return {"image-derivatives": job["id"]}
@@ -0,0 +1,332 @@
+"""
+Audio file probing for itsyourradio.
+Reads just enough of an uploaded file (container headers, the first MPEG
+frame, the last Ogg page) to work out its MIME type, duration, bitrate
+and sample rate, without decoding audio or reading the whole file.
+Supports MP3, WAV, FLAC, Ogg Vorbis/Opus and MP4/M4A.
+"""
+
+import logging
+import mimetypes
+import os
+import struct
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# How far past the ID3 tag to look for the first MPEG frame
+MP3_SYNC_SEARCH_BYTES = 64 * 1024
+
+# How much of the end of an Ogg file to search for the last page
+OGG_TAIL_BYTES = 64 * 1024
+
+
+@dataclass
+class MediaInfo:
+    """Technical details of an audio file."""
+    mime_type: str
+    duration: Optional[float] = None  # seconds
+    bitrate: Optional[int] = None  # kbps
+    sample_rate: Optional[int] = None  # Hz
+
+    def to_dict(self):
+        return asdict(self)
+
+
+# MPEG audio bitrates (kbps) keyed by (is MPEG-1, layer), and sample rates by version bits
+_MPEG_BITRATES = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MPEG_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),   # MPEG-2.5
+}
+
+
+@dataclass
+class _MpegFrame:
+    mpeg1: bool
+    layer: int
+    bitrate: int  # kbps
+    sample_rate: int
+    mono: bool
+    length: int  # bytes
+    samples: int
+
+
+def _parse_mpeg_header(header: bytes) -> Optional[_MpegFrame]:
+    """Decode a 4-byte MPEG audio frame header, or None if it isn't one."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _MPEG_BITRATES[(mpeg1, layer)][bitrate_index]
+    sample_rate = _MPEG_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x01
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate * 1000 // sample_rate + padding
+    return _MpegFrame(mpeg1, layer, bitrate, sample_rate, (header[3] >> 6) == 3, length, samples)
+
+
+def _id3v2_size(header: bytes) -> int:
+    """Size of a leading ID3v2 tag (including its header), or 0 if there isn't one."""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _probe_mp3(file, file_size: int, audio_start: int) -> Optional[MediaInfo]:
+    file.seek(audio_start)
+    buffer = file.read(MP3_SYNC_SEARCH_BYTES)
+
+    # Find a frame header whose successor is also a valid header, to skip false syncs
+    offset = buffer.find(b"\xFF")
+    frame = None
+    while offset != -1 and offset + 4 <= len(buffer):
+        frame = _parse_mpeg_header(buffer[offset:offset + 4])
+        if frame:
+            following = buffer[offset + frame.length:offset + frame.length + 4]
+            if len(following) < 4 or _parse_mpeg_header(following):
+                break
+        frame = None
+        offset = buffer.find(b"\xFF", offset + 1)
+    if frame is None:
+        return None
+
+    # Audio ends before a trailing ID3v1 tag
+    audio_end = file_size
+    if file_size >= 128:
+        file.seek(file_size - 128)
+        if file.read(3) == b"TAG":
+            audio_end -= 128
+    audio_bytes = audio_end - audio_start - offset
+
+    # VBR files carry a Xing/Info or VBRI header in the first frame
+    side_info = (17 if frame.mono else 32) if frame.mpeg1 else (9 if frame.mono else 17)
+    xing = offset + 4 + side_info
+    frames = None
+    if buffer[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", buffer[xing + 4:xing + 8])[0]
+        position = xing + 8
+        if flags & 0x01:
+            frames = struct.unpack(">I", buffer[position:position + 4])[0]
+            position += 4
+        if flags & 0x02:
+            audio_bytes = struct.unpack(">I", buffer[position:position + 4])[0] or audio_bytes
+    elif buffer[offset + 36:offset + 40] == b"VBRI":
+        audio_bytes, frames = struct.unpack(">II", buffer[offset + 46:offset + 54])
+
+    if frames:
+        duration = frames * frame.samples / frame.sample_rate
+        bitrate = round(audio_bytes * 8 / duration / 1000) if duration else frame.bitrate
+    else:
+        # Constant bitrate: every frame has the same bitrate as the first
+        bitrate = frame.bitrate
+        duration = audio_bytes * 8 / (bitrate * 1000)
+    return MediaInfo("audio/mpeg", duration, bitrate, frame.sample_rate)
+
+
+def _probe_wav(file, file_size: int) -> Optional[MediaInfo]:
+    file.seek(12)
+    sample_rate = byte_rate = None
+    while True:
+        chunk = file.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = file.read(chunk_size)
+            _, _, sample_rate, byte_rate = struct.unpack("<HHII", fmt[:12])
+            file.seek(chunk_size % 2, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF
+            data_size = file_size - file.tell()
+            if chunk_size not in (0, 0xFFFFFFFF):
+                data_size = min(chunk_size, data_size)
+            return MediaInfo("audio/wav", data_size / byte_rate, round(byte_rate * 8 / 1000), sample_rate)
+        else:
+            file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def _probe_flac(file, file_size: int, start: int) -> Optional[MediaInfo]:
+    file.seek(start + 4)
+    header = file.read(4)
+    if len(header) < 4 or header[0] & 0x7F != 0:
+        return None  # STREAMINFO must be the first metadata block
+    info = file.read(34)
+    if len(info) < 34:
+        return None
+
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    total_samples = packed & 0xFFFFFFFFF
+    duration = total_samples / sample_rate if sample_rate and total_samples else None
+    bitrate = round((file_size - start) * 8 / duration / 1000) if duration else None
+    return MediaInfo("audio/flac", duration, bitrate, sample_rate or None)
+
+
+def _probe_ogg(file, file_size: int) -> Optional[MediaInfo]:
+    file.seek(0)
+    page = file.read(512)
+    segments = page[26]
+    packet = page[27 + segments:]
+
+    if packet.startswith(b"\x01vorbis"):
+        sample_rate, nominal = struct.unpack("<I4xi", packet[12:24])
+        granule_rate, pre_skip = sample_rate, 0
+        mime_type = "audio/ogg"
+    elif packet.startswith(b"OpusHead"):
+        pre_skip, sample_rate = struct.unpack("<HI", packet[10:16])
+        granule_rate, nominal = 48000, 0  # Opus granule positions are always 48 kHz
+        mime_type = "audio/ogg"
+    else:
+        return None
+
+    # Duration comes from the granule position of the last page
+    tail_start = max(0, file_size - OGG_TAIL_BYTES)
+    file.seek(tail_start)
+    tail = file.read()
+    last_page = tail.rfind(b"OggS")
+    duration = None
+    if last_page != -1 and last_page + 14 <= len(tail):
+        granule = struct.unpack("<q", tail[last_page + 6:last_page + 14])[0]
+        if granule > 0:
+            duration = max(0, granule - pre_skip) / granule_rate
+
+    if duration:
+        bitrate = round(file_size * 8 / duration / 1000)
+    else:
+        bitrate = round(nominal / 1000) if nominal > 0 else None
+    return MediaInfo(mime_type, duration, bitrate, sample_rate or None)
+
+
+def _mp4_atoms(file, start: int, end: int):
+    """Yield (type, payload_start, payload_end) for the atoms between start and end."""
+    position = start
+    while position + 8 <= end:
+        file.seek(position)
+        header = file.read(8)
+        if len(header) < 8:
+            return
+        size, atom_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", file.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            return
+        yield atom_type, position + header_size, min(position + size, end)
+        position += size
+
+
+def _mp4_find(file, start: int, end: int, atom_type: bytes):
+    for found_type, payload_start, payload_end in _mp4_atoms(file, start, end):
+        if found_type == atom_type:
+            return payload_start, payload_end
+    return None
+
+
+def _mp4_timing(file, payload_start: int):
+    """Read (timescale, duration) from an mvhd or mdhd atom."""
+    file.seek(payload_start)
+    version = file.read(4)[0]
+    if version == 1:
+        timescale, duration = struct.unpack(">16xIQ", file.read(28))
+    else:
+        timescale, duration = struct.unpack(">8xII", file.read(16))
+    return timescale, duration
+
+
+def _probe_mp4(file, file_size: int) -> Optional[MediaInfo]:
+    moov = _mp4_find(file, 0, file_size, b"moov")
+    if moov is None:
+        return None
+    mvhd = _mp4_find(file, *moov, b"mvhd")
+    if mvhd is None:
+        return None
+    timescale, length = _mp4_timing(file, mvhd[0])
+    duration = length / timescale if timescale else None
+
+    # For audio tracks the media timescale is the sample rate
+    sample_rate = None
+    for atom_type, trak_start, trak_end in _mp4_atoms(file, *moov):
+        if atom_type != b"trak":
+            continue
+        mdia = _mp4_find(file, trak_start, trak_end, b"mdia")
+        hdlr = mdia and _mp4_find(file, *mdia, b"hdlr")
+        if hdlr:
+            file.seek(hdlr[0] + 8)
+            if file.read(4) == b"soun":
+                mdhd = _mp4_find(file, *mdia, b"mdhd")
+                if mdhd:
+                    sample_rate = _mp4_timing(file, mdhd[0])[0]
+                break
+
+    bitrate = round(file_size * 8 / duration / 1000) if duration else None
+    return MediaInfo("audio/mp4", duration, bitrate, sample_rate)
+
+
+def _probe(file, file_size: int) -> Optional[MediaInfo]:
+    head = file.read(12)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return _probe_wav(file, file_size)
+    if head[:4] == b"OggS":
+        return _probe_ogg(file, file_size)
+    if head[4:8] == b"ftyp":
+        return _probe_mp4(file, file_size)
+
+    # MP3 and FLAC files may start with an ID3v2 tag
+    file.seek(0)
+    tag_size = _id3v2_size(file.read(10))
+    file.seek(tag_size)
+    if file.read(4) == b"fLaC":
+        return _probe_flac(file, file_size, tag_size)
+    return _probe_mp3(file, file_size, tag_size)
+
+
+def probe_media(path: Path) -> MediaInfo:
+    """
+    Work out the MIME type, duration, bitrate and sample rate of a file.
+    Unrecognized or damaged files fall back to the MIME type implied by
+    the extension with no timing details; this never raises for bad input.
+    """
+    fallback = MediaInfo(mimetypes.guess_type(str(path))[0] or "application/octet-stream")
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as file:
+            info = _probe(file, file_size)
+    except (OSError, struct.error, IndexError, ValueError, ZeroDivisionError) as e:
+        logger.warning("Could not probe media file %s: %s", path, e)
+        return fallback
+
+    if info is None:
+        return fallback
+    if info.duration is not None:
+        info.duration = round(info.duration, 3)
+    return info
@@ -0,0 +1,259 @@
+"""
+Now-playing engine for itsyourradio.
+A single background task polls the Icecast/Shoutcast status page at a
+fixed interval and normalizes it into an in-memory snapshot. The stream
+endpoints only ever read that snapshot, so their cost does not depend on
+how many player widgets are polling them.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import urllib.request
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Optional
+
+from utils.broadcast import Broadcaster
+
+logger = logging.getLogger(__name__)
+
+# Stream status configuration
+STREAM_STATUS_URL = os.environ.get("STREAM_STATUS_URL")  # e.g. http://localhost:8000/status-json.xsl
+STREAM_SERVER_TYPE = os.environ.get("STREAM_SERVER_TYPE", "icecast")  # icecast or shoutcast
+STREAM_MOUNT = os.environ.get("STREAM_MOUNT")  # Icecast mount to report, e.g. /stream
+STREAM_POLL_INTERVAL = float(os.environ.get("STREAM_POLL_INTERVAL", 5))
+STREAM_STATUS_TIMEOUT = float(os.environ.get("STREAM_STATUS_TIMEOUT", 5))
+
+# Push channel settings (SSE / WebSocket)
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get("STREAM_HEARTBEAT_INTERVAL", 15))
+STREAM_SEND_TIMEOUT = float(os.environ.get("STREAM_SEND_TIMEOUT", 10))
+
+# Station details reported alongside the live status
+STREAM_URL = os.environ.get("STREAM_URL", "https://example.com:8000/stream")
+STATION_NAME = os.environ.get("STATION_NAME", "itsyourradio")
+STATION_DESCRIPTION = os.environ.get("STATION_DESCRIPTION", "Your Music, Your Way")
+
+
+def _to_int(value, default=0) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def split_stream_title(title: Optional[str]):
+    """Split an "Artist - Title" stream title into (artist, title)."""
+    if not title:
+        return None, None
+    if " - " in title:
+        artist, song = title.split(" - ", 1)
+        return artist.strip() or None, song.strip() or None
+    return None, title.strip()
+
+
+def _parse_document(body: bytes):
+    """Parse a status document as JSON or XML into nested dicts."""
+    text = body.decode("utf-8", errors="replace").strip()
+    if text.startswith("{") or text.startswith("["):
+        return json.loads(text)
+
+    def to_dict(element):
+        children = list(element)
+        if not children:
+            return element.text
+        result = {}
+        for child in children:
+            key = child.tag.lower()
+            value = to_dict(child)
+            if isinstance(value, dict) and child.attrib.get("mount"):
+                value["mount"] = child.attrib["mount"]
+            if key in result:
+                if not isinstance(result[key], list):
+                    result[key] = [result[key]]
+                result[key].append(value)
+            else:
+                result[key] = value
+        return result
+
+    root = ET.fromstring(text)
+    return {root.tag.lower(): to_dict(root)}
+
+
+def parse_icecast_status(document, mount: Optional[str] = None):
+    """Normalize an Icecast status-json.xsl (or /admin/stats XML) document."""
+    stats = document.get("icestats") or {}
+    sources = stats.get("source") or []
+    if isinstance(sources, dict):
+        sources = [sources]
+
+    source = None
+    for candidate in sources:
+        candidate_mount = candidate.get("mount") or (candidate.get("listenurl") or "").rsplit("/", 1)[-1]
+        if mount is None or candidate_mount.strip("/") == mount.strip("/"):
+            source = candidate
+            break
+
+    if source is None:
+        return {"online": False, "listeners": 0}
+
+    artist, title = split_stream_title(source.get("title"))
+    return {
+        "online": True,
+        "listeners": _to_int(source.get("listeners")),
+        "bitrate": _to_int(source.get("bitrate") or source.get("audio_bitrate"), None),
+        "format": source.get("server_type") or "audio/mpeg",
+        "server_name": source.get("server_name"),
+        "server_description": source.get("server_description"),
+        "artist": source.get("artist") or artist,
+        "title": title,
+        "album": source.get("album"),
+    }
+
+
+def parse_shoutcast_status(document):
+    """Normalize a Shoutcast v2 /stats document (json=1 or XML)."""
+    stats = document.get("shoutcastserver") or document
+    stats = {key.lower(): value for key, value in stats.items()}
+
+    artist, title = split_stream_title(stats.get("songtitle"))
+    return {
+        "online": _to_int(stats.get("streamstatus"), 1) == 1,
+        "listeners": _to_int(stats.get("currentlisteners")),
+        "bitrate": _to_int(stats.get("bitrate"), None),
+        "format": stats.get("content") or "audio/mpeg",
+        "server_name": stats.get("servertitle"),
+        "server_description": stats.get("servergenre"),
+        "artist": artist,
+        "title": title,
+        "album": None,
+    }
+
+
+class NowPlayingEngine:
+    """Polls the streaming server and keeps the latest normalized snapshot."""
+
+    def __init__(
+        self,
+        status_url: Optional[str] = STREAM_STATUS_URL,
+        server_type: str = STREAM_SERVER_TYPE,
+        mount: Optional[str] = STREAM_MOUNT,
+        interval: float = STREAM_POLL_INTERVAL,
+    ):
+        self.status_url = status_url
+        self.server_type = server_type.lower()
+        self.mount = mount
+        self.interval = interval
+        self.stream_info = self._build_stream_info({"online": False, "listeners": 0})
+        self.now_playing = self._build_now_playing({}, None)
+        self._started_at = None
+        self.last_polled_at = None
+        self.last_error = None
+        self.events = Broadcaster()
+        self._task = None
+
+    def _build_stream_info(self, status):
+        bitrate = status.get("bitrate")
+        return {
+            "station_name": STATION_NAME,
+            "stream_url": STREAM_URL,
+            "bitrate": f"{bitrate}kbps" if bitrate else None,
+            "format": status.get("format") or "audio/mpeg",
+            "description": STATION_DESCRIPTION,
+            "status": "online" if status.get("online") else "offline",
+            "listeners": status.get("listeners", 0),
+        }
+
+    def _build_now_playing(self, status, started_at: Optional[datetime]):
+        return {
+            "title": status.get("title"),
+            "artist": status.get("artist"),
+            "album": status.get("album"),
+            "cover_art": None,
+            "started_at": started_at.isoformat() if started_at else None,
+            "duration": None,  # Not reported by Icecast/Shoutcast
+        }
+
+    def parse(self, body: bytes):
+        """Normalize a raw status response."""
+        document = _parse_document(body)
+        if self.server_type == "shoutcast":
+            return parse_shoutcast_status(document)
+        return parse_icecast_status(document, self.mount)
+
+    def apply(self, status):
+        """Swap in a new snapshot built from a normalized status."""
+        track_changed = (
+            status.get("title") != self.now_playing["title"]
+            or status.get("artist") != self.now_playing["artist"]
+        )
+        if track_changed:
+            self._started_at = datetime.utcnow() if status.get("title") else None
+            self.now_playing = self._build_now_playing(status, self._started_at)
+            self.events.publish("now-playing", self.now_playing)
+        
+        stream_info = self._build_stream_info(status)
+        if stream_info != self.stream_info:
+            self.stream_info = stream_info
+            self.events.publish("stream", stream_info)
+        return track_changed
+
+    def _fetch(self) -> bytes:
+        request = urllib.request.Request(self.status_url, headers={"User-Agent": f"{STATION_NAME}-now-playing"})
+        with urllib.request.urlopen(request, timeout=STREAM_STATUS_TIMEOUT) as response:
+            return response.read()
+
+    async def poll_once(self):
+        """Fetch and apply the current status once."""
+        try:
+            body = await asyncio.to_thread(self._fetch)
+            status = self.parse(body)
+            self.last_error = None
+        except Exception as e:
+            logger.warning("Could not read stream status from %s: %s", self.status_url, e)
+            self.last_error = str(e)
+            status = {"online": False, "listeners": 0}
+        self.last_polled_at = datetime.utcnow()
+        return self.apply(status)
+
+    async def _run(self):
+        while True:
+            await self.poll_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start polling in the background (no-op when no status URL is configured)."""
+        if self.status_url and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background poller."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def current_track(self):
+        """Get the now-playing snapshot with progress as of now."""
+        track = dict(self.now_playing)
+        started_at = self._started_at
+        track["progress"] = int((datetime.utcnow() - started_at).total_seconds()) if started_at else None
+        return track
+
+    def stats(self):
+        """Get poller health for metrics."""
+        return {
+            "status_url": self.status_url,
+            "server_type": self.server_type,
+            "interval": self.interval,
+            "last_polled_at": self.last_polled_at.isoformat() if self.last_polled_at else None,
+            "last_error": self.last_error,
+            "push": self.events.stats(),
+        }
+
+
+now_playing_engine = NowPlayingEngine()
@@ -0,0 +1,112 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+Pages are ordered by (sort_field, id) and the opaque cursor encodes the
+last item of the previous page, so each page costs the same no matter
+how deep into a collection it is.
+"""
+
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Response
+
+# Page size limits
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PageParams:
+    """Query parameters shared by every paginated list route."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="Opaque token from the previous page's X-Next-Cursor header")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(sort_value, item_id: str) -> str:
+    """Encode the position of an item as an opaque cursor."""
+    if isinstance(sort_value, datetime):
+        key = ["d", sort_value.isoformat()]
+    else:
+        key = ["v", sort_value]
+    raw = json.dumps([key, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_scalar(value) -> bool:
+    # Only values encode_cursor can produce; anything else (e.g. a dict) would
+    # end up as an operator in the page query
+    if value is None or isinstance(value, str):
+        return True
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return math.isfinite(value)
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor back into (sort_value, id)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (kind, sort_value), item_id = json.loads(raw)
+        if kind == "d" and isinstance(sort_value, str):
+            sort_value = datetime.fromisoformat(sort_value)
+        elif kind != "v" or not _is_scalar(sort_value):
+            raise ValueError("Unexpected sort value")
+        if isinstance(item_id, bool) or not isinstance(item_id, (str, int)):
+            raise ValueError("Unexpected item id")
+        return sort_value, str(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def cursor_filter(sort_field: str, sort_value, item_id: str) -> dict:
+    """Build the filter selecting items after a cursor in descending order."""
+    if sort_value is None:
+        # Items without a sort value sort last; only the id tie-break remains
+        return {sort_field: None, "id": {"$lt": item_id}}
+    return {
+        "$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "id": {"$lt": item_id}},
+            {sort_field: None},
+        ]
+    }
+
+
+async def paginate(collection, query: dict, page: PageParams, sort_field: str = "created_at", projection=None):
+    """
+    Fetch one page of a collection, newest first.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    if page.cursor:
+        sort_value, item_id = decode_cursor(page.cursor)
+        query = {"$and": [query, cursor_filter(sort_field, sort_value, item_id)]}
+
+    # Fetch one extra item to learn whether there is a next page
+    items = await collection.find(query, projection).sort(
+        [(sort_field, -1), ("id", -1)]
+    ).limit(page.limit + 1).to_list(page.limit + 1)
+
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["id"])
+
+    return items, next_cursor
+
+
+def set_pagination_headers(request: Request, response: Response, next_cursor: Optional[str]):
+    """Advertise the next page through X-Next-Cursor and a Link header."""
+    if next_cursor is None:
+        return
+    next_url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
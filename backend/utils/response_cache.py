@@ -0,0 +1,261 @@
+"""
+Response cache for itsyourradio's public read endpoints.
+Artist, podcast and blog listings are read far more often than they
+change, so their serialized JSON is kept in an in-process LRU, and in
+Redis when REDIS_URL is set so a cold process can start from what the
+others already rendered. Each entry is tagged with the entities it shows
+(e.g. "artist:<id>", "show:<id>") and write handlers invalidate exactly
+those tags; with Redis the invalidation is broadcast to every process.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from utils.etag import body_etag
+from utils.fast_json import render_json
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))  # 0 disables caching
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 300))  # Backstop; writes invalidate entries directly
+REDIS_URL = os.environ.get("REDIS_URL")
+RESPONSE_CACHE_REDIS_PREFIX = os.environ.get("RESPONSE_CACHE_REDIS_PREFIX", "itsyourradio:responses:")
+# Recently invalidated tags remembered for responses still being rendered
+RESPONSE_CACHE_INVALIDATION_HISTORY = int(os.environ.get("RESPONSE_CACHE_INVALIDATION_HISTORY", 4096))
+
+# Response headers worth replaying from a cached entry (pagination links)
+CACHED_HEADERS = ("x-next-cursor", "link")
+
+
+@dataclass
+class CachedResponse:
+    """Serialized body of a response and the headers and tags that go with it."""
+    body: bytes
+    etag: str  # Hashed once when stored, so conditional requests don't rehash the body
+    headers: Dict[str, str]
+    tags: Tuple[str, ...]
+    expires_at: float
+
+    def response(self) -> Response:
+        return Response(content=self.body, media_type="application/json", headers={**self.headers, "ETag": self.etag})
+
+
+def cache_key(request: Request) -> str:
+    """Identify a response by route path and its (sorted) query parameters."""
+    params = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{params}"
+
+
+class ResponseCache:
+    """Two-tier (process LRU, then Redis) cache of serialized responses with tag invalidation."""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES, ttl: int = RESPONSE_CACHE_TTL,
+                 invalidation_history: int = RESPONSE_CACHE_INVALIDATION_HISTORY):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.invalidation_history = invalidation_history
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tags: Dict[str, set] = {}  # tag -> keys of local entries carrying it
+        self._bytes = 0
+        # Invalidation counter, so a response rendered before a write isn't cached after it.
+        # Only the latest tags are remembered; a render that started before the oldest
+        # forgotten one can't be checked, so it isn't cached.
+        self._sequence = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()  # tag -> sequence, oldest first
+        self._forgotten_sequence = 0
+        self._redis = None
+        self._listener = None
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # Local tier
+
+    def _store_local(self, key: str, entry: CachedResponse):
+        self._drop_key(key)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self._bytes > self.max_bytes and self._entries:
+            self._drop_key(next(iter(self._entries)))
+
+    def _drop_key(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _drop_tags(self, tags: Iterable[str]):
+        self._sequence += 1
+        for tag in tags:
+            self._invalidated[tag] = self._sequence
+            self._invalidated.move_to_end(tag)
+            for key in list(self._tags.get(tag, ())):
+                self._drop_key(key)
+        while len(self._invalidated) > self.invalidation_history:
+            _, sequence = self._invalidated.popitem(last=False)
+            self._forgotten_sequence = max(self._forgotten_sequence, sequence)
+
+    # Lookups
+
+    async def get(self, request: Request) -> Optional[Response]:
+        """Get the cached response for a request, or None (and remember when the miss happened)."""
+        if not self.max_bytes:
+            return None
+        key = cache_key(request)
+        request.state.response_cache_sequence = self._sequence
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.response()
+            self._drop_key(key)
+
+        if self._redis is not None:
+            try:
+                stored = await self._redis.hgetall(RESPONSE_CACHE_REDIS_PREFIX + key)
+            except Exception as e:
+                logger.warning("Response cache lookup in Redis failed: %s", e)
+                stored = None
+            if stored and request.state.response_cache_sequence == self._sequence:
+                entry = CachedResponse(
+                    body=stored[b"body"],
+                    etag=stored[b"etag"].decode() if b"etag" in stored else body_etag(stored[b"body"]),
+                    headers=json.loads(stored[b"headers"]),
+                    tags=tuple(json.loads(stored[b"tags"])),
+                    expires_at=time.monotonic() + self.ttl,
+                )
+                self._store_local(key, entry)
+                self.redis_hits += 1
+                return entry.response()
+
+        self.misses += 1
+        return None
+
+    async def put(self, request: Request, response: Response, model, content, tags: Iterable[str],
+                  fields: Optional[Tuple[str, ...]] = None) -> Response:
+        """
+        Serialize content as the route's response model (or just some of its
+        fields), cache it under the given tags and return it as a response.
+        Pagination headers already set on response are kept with the entry.
+        """
+        body = render_json(model, content, fields)
+        headers = {name: value for name, value in response.headers.items() if name.lower() in CACHED_HEADERS}
+        entry = CachedResponse(body=body, etag=body_etag(body), headers=headers, tags=tuple(dict.fromkeys(tags)),
+                               expires_at=time.monotonic() + self.ttl)
+        if not self.max_bytes:
+            return entry.response()
+
+        # Skip caching if one of the tags was invalidated while this was rendered
+        started = getattr(request.state, "response_cache_sequence", self._sequence)
+        if started < self._forgotten_sequence or any(self._invalidated.get(tag, 0) > started for tag in entry.tags):
+            return entry.response()
+
+        key = cache_key(request)
+        self._store_local(key, entry)
+        if self._redis is not None:
+            try:
+                redis_key = RESPONSE_CACHE_REDIS_PREFIX + key
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.hset(redis_key, mapping={
+                        "body": body, "etag": entry.etag, "headers": json.dumps(headers), "tags": json.dumps(entry.tags)
+                    })
+                    pipe.expire(redis_key, self.ttl)
+                    for tag in entry.tags:
+                        pipe.sadd(RESPONSE_CACHE_REDIS_PREFIX + "tag:" + tag, redis_key)
+                        pipe.expire(RESPONSE_CACHE_REDIS_PREFIX + "tag:" + tag, self.ttl)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning("Response cache store in Redis failed: %s", e)
+        return entry.response()
+
+    # Invalidation
+
+    async def invalidate(self, *tags: str):
+        """Drop every cached response carrying any of the tags, in every process."""
+        if not tags:
+            return
+        self.invalidations += 1
+        self._drop_tags(tags)
+        if self._redis is None:
+            return
+        try:
+            tag_keys = [RESPONSE_CACHE_REDIS_PREFIX + "tag:" + tag for tag in tags]
+            keys = set()
+            for tag_key in tag_keys:
+                keys.update(await self._redis.smembers(tag_key))
+            await self._redis.delete(*keys, *tag_keys)
+            await self._redis.publish(RESPONSE_CACHE_REDIS_PREFIX + "invalidate", json.dumps(tags))
+        except Exception as e:
+            logger.warning("Response cache invalidation in Redis failed: %s", e)
+
+    async def _listen(self):
+        """Apply invalidations published by other processes."""
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(RESPONSE_CACHE_REDIS_PREFIX + "invalidate")
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._drop_tags(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Response cache invalidation listener failed, reconnecting: %s", e)
+                # Anything published meanwhile was missed
+                self._entries.clear()
+                self._tags.clear()
+                self._bytes = 0
+                await asyncio.sleep(1)
+
+    def start(self):
+        """Connect the Redis tier, if configured."""
+        if REDIS_URL and self.max_bytes and self._redis is None:
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(REDIS_URL)
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def stats(self):
+        """Get hit-rate metrics."""
+        return {
+            "backend": "redis" if self._redis is not None else "local",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache()
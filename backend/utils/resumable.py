@@ -0,0 +1,142 @@
+"""
+Resumable upload storage for itsyourradio.
+Each upload session owns a preallocated part file on local disk. Chunks are
+written straight to their offset in that file, so parts can arrive in any
+order (and in parallel) and finalizing is just a verify-and-rename.
+"""
+
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+from typing import List
+
+from fastapi import HTTPException, status
+
+from utils.storage import storage
+from utils.uploads import UPLOAD_CHUNK_SIZE
+
+# Directory holding partial uploads (keep it on the same filesystem as public_html)
+UPLOAD_SESSIONS_DIR = Path(os.environ.get("UPLOAD_SESSIONS_DIR", "upload_sessions"))
+
+# Largest single chunk accepted in one PUT request
+MAX_CHUNK_SIZE = int(os.environ.get("MAX_UPLOAD_CHUNK_SIZE", 64 * 1024 * 1024))
+
+
+def part_file_path(session_id: str) -> Path:
+    """Get the path of the part file for a session."""
+    return UPLOAD_SESSIONS_DIR / f"{session_id}.part"
+
+
+def merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    """Merge overlapping or adjacent [start, end) byte ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(ranges: List[List[int]], total_size: int) -> List[List[int]]:
+    """Get the [start, end) byte ranges not yet received."""
+    missing = []
+    position = 0
+    for start, end in merge_ranges(ranges):
+        if start > position:
+            missing.append([position, start])
+        position = max(position, end)
+    if position < total_size:
+        missing.append([position, total_size])
+    return missing
+
+
+def received_bytes(ranges: List[List[int]]) -> int:
+    """Count the distinct bytes covered by the received ranges."""
+    return sum(end - start for start, end in merge_ranges(ranges))
+
+
+def _create_part_file(session_id: str, total_size: int):
+    UPLOAD_SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(part_file_path(session_id), "wb") as part:
+        part.truncate(total_size)
+
+
+async def create_part_file(session_id: str, total_size: int):
+    """Preallocate a (sparse) part file for a new session."""
+    await asyncio.to_thread(_create_part_file, session_id, total_size)
+
+
+async def write_chunk(session_id: str, offset: int, total_size: int, chunks) -> int:
+    """
+    Write a streamed chunk into the part file at offset.
+    chunks is an async iterator of bytes (e.g. request.stream()). Returns the
+    number of bytes written. Each call uses its own file handle, so chunks
+    for different offsets can be written concurrently.
+    """
+    if offset < 0 or offset >= total_size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Offset is outside the upload"
+        )
+
+    part = await asyncio.to_thread(open, part_file_path(session_id), "r+b")
+    written = 0
+    try:
+        await asyncio.to_thread(part.seek, offset)
+        async for data in chunks:
+            if not data:
+                continue
+            written += len(data)
+            if written > MAX_CHUNK_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Chunk too large (limit is {MAX_CHUNK_SIZE // (1024 * 1024)} MB)"
+                )
+            if offset + written > total_size:
+                raise HTTPException(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    detail="Chunk extends past the end of the upload"
+                )
+            await asyncio.to_thread(part.write, data)
+        await asyncio.to_thread(part.flush)
+    finally:
+        await asyncio.to_thread(part.close)
+
+    return written
+
+
+def _hash_part_file(session_id: str) -> str:
+    source = part_file_path(session_id)
+
+    # Hash the assembled file chunk by chunk
+    digest = hashlib.sha256()
+    with open(source, "rb") as part:
+        for chunk in iter(lambda: part.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        os.fsync(part.fileno())
+    os.chmod(source, 0o644)
+    return digest.hexdigest()
+
+
+async def finalize_part_file(session_id: str, key: str) -> str:
+    """
+    Move a completed part file into storage and return its SHA-256. The part
+    file is only consumed once it is stored, so a failed finalize can be retried.
+    """
+    sha256 = await asyncio.to_thread(_hash_part_file, session_id)
+    await storage.put_file(part_file_path(session_id), key)
+    return sha256
+
+
+def _discard_part_file(session_id: str):
+    try:
+        os.unlink(part_file_path(session_id))
+    except FileNotFoundError:
+        pass
+
+
+async def discard_part_file(session_id: str):
+    """Remove the part file of an abandoned session."""
+    await asyncio.to_thread(_discard_part_file, session_id)
@@ -0,0 +1,193 @@
+"""
+Podcast RSS feed rendering and caching for itsyourradio.
+Feeds are rendered once per show, kept (with a gzipped copy) until the
+show or its episodes change, and served with ETag / Last-Modified so
+polling podcast directories mostly get 304 responses.
+"""
+
+import gzip
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from fastapi import Request, Response
+
+# Feed cache configuration
+FEED_CACHE_SIZE = int(os.environ.get("FEED_CACHE_SIZE", 256))
+FEED_CACHE_TTL = int(os.environ.get("FEED_CACHE_TTL", 3600))  # Bound staleness across workers
+FEED_MAX_AGE = int(os.environ.get("FEED_MAX_AGE", 300))
+
+# Episode fields needed to render a feed
+EPISODE_FEED_FIELDS = {
+    "_id": 0, "id": 1, "title": 1, "description": 1, "file_path": 1,
+    "duration": 1, "file_size": 1, "mime_type": 1, "published_at": 1, "updated_at": 1,
+}
+
+
+@dataclass
+class CachedFeed:
+    """A rendered feed ready to be served."""
+    host_id: str
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    last_modified: datetime
+    rendered_at: float
+
+
+def _rfc822(value: datetime) -> str:
+    """Format a naive UTC datetime for RSS and HTTP headers."""
+    return value.strftime("%a, %d %b %Y %H:%M:%S +0000")
+
+
+def render_podcast_feed(show, episodes, host_name: str, website_url: str) -> bytes:
+    """Render the RSS 2.0 / iTunes feed for a show and its episodes."""
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd" '
+        'xmlns:content="http://purl.org/rss/1.0/modules/content/">\n',
+        "  <channel>\n",
+        f"    <title>{escape(show['title'])}</title>\n",
+        f"    <description>{escape(show['description'])}</description>\n",
+        f"    <link>{escape(website_url)}/podcasts/{escape(show['id'])}</link>\n",
+        "    <language>en-us</language>\n",
+        f"    <itunes:author>{escape(host_name)}</itunes:author>\n",
+        "    <itunes:owner>\n",
+        f"      <itunes:name>{escape(host_name)}</itunes:name>\n",
+        "      <itunes:email>podcasts@itsyourradio.com</itunes:email>\n",
+        "    </itunes:owner>\n",
+        f"    <itunes:image href={quoteattr(show.get('cover_art_url') or '')} />\n",
+        f"    <itunes:category text={quoteattr(show.get('category') or 'Music')} />\n",
+        "    <itunes:explicit>false</itunes:explicit>\n",
+    ]
+
+    for episode in episodes:
+        episode_url = f"{website_url}/{episode['file_path']}"
+        parts.append(
+            "    <item>\n"
+            f"      <title>{escape(episode['title'])}</title>\n"
+            f"      <description>{escape(episode['description'])}</description>\n"
+            f"      <pubDate>{_rfc822(episode['published_at'])}</pubDate>\n"
+            f"      <enclosure url={quoteattr(episode_url)} length=\"{int(episode.get('file_size') or 0)}\" "
+            f"type={quoteattr(episode.get('mime_type') or 'audio/mpeg')} />\n"
+            f"      <itunes:duration>{int(episode.get('duration') or 0)}</itunes:duration>\n"
+            "      <itunes:explicit>false</itunes:explicit>\n"
+            f'      <guid isPermaLink="false">{escape(episode["id"])}</guid>\n'
+            "    </item>\n"
+        )
+
+    parts.append("  </channel>\n</rss>\n")
+    return "".join(parts).encode("utf-8")
+
+
+class FeedCache:
+    """Small LRU cache of rendered feeds, keyed by show id."""
+
+    def __init__(self, max_size: int = FEED_CACHE_SIZE, ttl: int = FEED_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._feeds = OrderedDict()
+
+    def get(self, show_id: str) -> Optional[CachedFeed]:
+        """Get a cached feed if it is still fresh."""
+        feed = self._feeds.get(show_id)
+        if feed is None:
+            return None
+        if time.monotonic() - feed.rendered_at > self.ttl:
+            del self._feeds[show_id]
+            return None
+        self._feeds.move_to_end(show_id)
+        return feed
+
+    def store(self, show_id: str, host_id: str, body: bytes, last_modified: datetime) -> CachedFeed:
+        """Cache a freshly rendered feed."""
+        feed = CachedFeed(
+            host_id=host_id,
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=6),
+            etag='"%s"' % hashlib.sha256(body).hexdigest()[:32],
+            last_modified=last_modified.replace(microsecond=0),
+            rendered_at=time.monotonic(),
+        )
+        self._feeds[show_id] = feed
+        self._feeds.move_to_end(show_id)
+        while len(self._feeds) > self.max_size:
+            self._feeds.popitem(last=False)
+        return feed
+
+    def invalidate(self, show_id: str):
+        """Drop the cached feed of a show."""
+        self._feeds.pop(show_id, None)
+
+    def invalidate_host(self, host_id: str):
+        """Drop the cached feeds of every show hosted by a user."""
+        for show_id in [show_id for show_id, feed in self._feeds.items() if feed.host_id == host_id]:
+            del self._feeds[show_id]
+
+
+feed_cache = FeedCache()
+
+
+def _not_modified(request: Request, feed: CachedFeed) -> bool:
+    """Check the request's conditional headers against a feed."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or feed.etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return feed.last_modified <= since
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Check whether an Accept-Encoding header allows gzip (a q=0 entry refuses it)."""
+    qualities = {}
+    for entry in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def feed_response(request: Request, feed: CachedFeed) -> Response:
+    """Serve a cached feed, honouring conditional GET and gzip."""
+    headers = {
+        "ETag": feed.etag,
+        "Last-Modified": _rfc822(feed.last_modified).replace("+0000", "GMT"),
+        "Cache-Control": f"public, max-age={FEED_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+    }
+
+    if _not_modified(request, feed):
+        return Response(status_code=304, headers=headers)
+
+    body = feed.body
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        body = feed.gzip_body
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type="application/rss+xml; charset=utf-8", headers=headers)
@@ -0,0 +1,333 @@
+"""
+Full-text search for itsyourradio.
+Songs, albums, artists, podcasts, episodes and posts are kept in an
+in-process inverted index. Queries are tokenized the same way as the
+documents, every query term must match, the last one may be a prefix
+(for type-ahead), and results are ranked with BM25. The index is built
+from MongoDB at startup and then updated by the create/update handlers.
+Each API process keeps its own index, so when several run, set
+SEARCH_REBUILD_INTERVAL to pick up writes handled by the others.
+"""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ranking and limits
+SEARCH_BM25_K1 = float(os.environ.get("SEARCH_BM25_K1", 1.2))
+SEARCH_BM25_B = float(os.environ.get("SEARCH_BM25_B", 0.75))
+SEARCH_MAX_FIELD_TOKENS = int(os.environ.get("SEARCH_MAX_FIELD_TOKENS", 200))  # Long post bodies are cut off
+SEARCH_PREFIX_EXPANSIONS = int(os.environ.get("SEARCH_PREFIX_EXPANSIONS", 64))  # Terms a prefix may expand to
+SEARCH_REBUILD_INTERVAL = float(os.environ.get("SEARCH_REBUILD_INTERVAL", 0))  # Seconds; 0 builds once
+SEARCH_MAX_LIMIT = 50
+SEARCH_PREFIX_CACHE_SIZE = 10000
+
+_TOKEN = re.compile(r"[^\W_]+")
+_TAG = re.compile(r"<[^>]+>")
+
+
+@dataclass
+class SearchSource:
+    """A collection that is searchable, and how its documents are indexed."""
+    type: str
+    collection: str
+    title: str  # Field shown as the result title
+    fields: Dict[str, int]  # Indexed field -> weight
+    display: Tuple[str, ...] = ()  # Extra fields returned with each result
+    filter: dict = field(default_factory=dict)  # Only documents matching this are searchable
+
+
+SEARCH_SOURCES = [
+    SearchSource("artist", "users", "username", {"username": 3, "full_name": 3, "bio": 1},
+                 ("full_name", "profile_image_url"), {"role": "artist"}),
+    SearchSource("song", "songs", "title", {"title": 3}, ("artist_id", "album_id", "duration")),
+    SearchSource("album", "albums", "title", {"title": 3, "description": 1}, ("artist_id", "cover_art_url")),
+    SearchSource("podcast", "podcast_shows", "title", {"title": 3, "category": 2, "description": 1},
+                 ("host_id", "cover_art_url")),
+    SearchSource("episode", "podcast_episodes", "title", {"title": 3, "description": 1},
+                 ("show_id", "published_at", "duration")),
+    SearchSource("blog_post", "blog_posts", "title", {"title": 3, "content": 1},
+                 ("author_id", "featured_image_url", "published_at"), {"is_published": True}),
+    SearchSource("artist_post", "artist_posts", "title", {"title": 3, "content": 1},
+                 ("artist_id", "featured_image_url", "published_at"), {"is_published": True}),
+]
+SOURCES_BY_COLLECTION = {source.collection: source for source in SEARCH_SOURCES}
+SEARCH_TYPES = tuple(source.type for source in SEARCH_SOURCES)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-folded word tokens (HTML tags are dropped)."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", _TAG.sub(" ", text).lower())
+    if not text.isascii():
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN.findall(text)
+
+
+def _matches(doc: dict, conditions: dict) -> bool:
+    return all(doc.get(key) == value for key, value in conditions.items())
+
+
+class SearchIndex:
+    """An inverted index over every searchable document, ranked with BM25."""
+
+    def __init__(self, sources=SEARCH_SOURCES):
+        self.sources = {source.type: source for source in sources}
+        self._postings: Dict[str, Dict[int, int]] = {}  # term -> {doc number: weighted term frequency}
+        self._terms: List[str] = []  # Sorted, for prefix lookups
+        self._docs: Dict[int, tuple] = {}  # doc number -> (type, id, length, terms, result)
+        self._numbers: Dict[Tuple[str, str], int] = {}
+        self._ranked_cache: Dict[str, List[int]] = {}  # term -> doc numbers, best first
+        self._prefix_cache: Dict[str, List[str]] = {}  # prefix -> expansions, until terms are added or removed
+        self._next_number = 0
+        self._total_length = 0
+        self.ready = False
+        self._task = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _document_terms(self, source: SearchSource, doc: dict) -> Counter:
+        counts = Counter()
+        for name, weight in source.fields.items():
+            for token in tokenize(doc.get(name))[:SEARCH_MAX_FIELD_TOKENS]:
+                counts[token] += weight
+        return counts
+
+    def upsert(self, doc_type: str, doc: dict):
+        """Add or replace a document; documents the source filters out are removed instead."""
+        source = self.sources[doc_type]
+        if not _matches(doc, source.filter):
+            self.remove(doc_type, doc["id"])
+            return
+        counts = self._document_terms(source, doc)
+        result = {"type": doc_type, "id": doc["id"], "title": doc.get(source.title)}
+        result.update({name: doc.get(name) for name in source.display})
+
+        self.remove(doc_type, doc["id"])
+        number = self._next_number
+        self._next_number += 1
+        self._numbers[(doc_type, doc["id"])] = number
+        length = sum(counts.values())
+        self._docs[number] = (doc_type, doc["id"], length, tuple(counts), result)
+        self._total_length += length
+
+        for term, frequency in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._terms, term)
+                self._prefix_cache.clear()
+            postings[number] = frequency
+            self._ranked_cache.pop(term, None)
+
+    def remove(self, doc_type: str, doc_id: str):
+        """Drop a document from the index if it is there."""
+        number = self._numbers.pop((doc_type, doc_id), None)
+        if number is None:
+            return
+        _, _, length, terms, _ = self._docs.pop(number)
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[number]
+            self._ranked_cache.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+                self._prefix_cache.clear()
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """The most common indexed terms starting with prefix."""
+        expansions = self._prefix_cache.get(prefix)
+        if expansions is None:
+            start = bisect.bisect_left(self._terms, prefix)
+            end = bisect.bisect_left(self._terms, prefix + "\uffff", lo=start)
+            expansions = heapq.nlargest(
+                SEARCH_PREFIX_EXPANSIONS, self._terms[start:end], key=lambda term: len(self._postings[term])
+            )
+            if len(self._prefix_cache) >= SEARCH_PREFIX_CACHE_SIZE:
+                self._prefix_cache.clear()
+            self._prefix_cache[prefix] = expansions
+        return expansions
+
+    def _query_terms(self, token: str, prefix: bool) -> Dict[str, float]:
+        """Indexed terms a query token matches, with the scale their scores get."""
+        terms = {token: 1.0} if token in self._postings else {}
+        if prefix:
+            terms.update((term, 0.9) for term in self._expand_prefix(token) if term != token)
+        return terms
+
+    def _scorer(self, term: str, scale: float):
+        """BM25 score of term in a document, as a function of (frequency, length)."""
+        doc_count = len(self._docs)
+        average_length = self._total_length / doc_count if doc_count else 1
+        frequency_of_term = len(self._postings[term])
+        idf = math.log(1 + (doc_count - frequency_of_term + 0.5) / (frequency_of_term + 0.5)) * scale
+        k1, b = SEARCH_BM25_K1, SEARCH_BM25_B
+        return lambda frequency, length: (
+            idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        )
+
+    def _ranked(self, term: str) -> List[int]:
+        """Documents containing term, highest scoring first (cached until the term's postings change)."""
+        ranked = self._ranked_cache.get(term)
+        if ranked is None:
+            postings = self._postings[term]
+            score = self._scorer(term, 1.0)
+            ranked = sorted(postings, key=lambda number: score(postings[number], self._docs[number][2]), reverse=True)
+            self._ranked_cache[term] = ranked
+        return ranked
+
+    def _top_for_terms(self, terms: Dict[str, float], types, limit: int) -> Dict[int, float]:
+        """
+        Best documents for a single query token. A document's score is its
+        best matching term, so the overall top results are among the top
+        results of each term; only the head of each term's ranking is read.
+        """
+        scores: Dict[int, float] = {}
+        for term, scale in terms.items():
+            postings = self._postings[term]
+            score = self._scorer(term, scale)
+            found = 0
+            for number in self._ranked(term) if len(postings) > limit else postings:
+                doc = self._docs[number]
+                if types and doc[0] not in types:
+                    continue
+                value = score(postings[number], doc[2])
+                if value > scores.get(number, 0):
+                    scores[number] = value
+                found += 1
+                if found >= limit:
+                    break
+        return scores
+
+    def _intersect(self, token_terms: List[Dict[str, float]], types) -> Dict[int, float]:
+        """
+        Documents matching every token, with summed scores. The token with
+        the fewest postings picks the candidates; the others are checked
+        against each candidate's own terms.
+        """
+        token_terms.sort(key=lambda terms: sum(len(self._postings[term]) for term in terms))
+        first, rest = token_terms[0], token_terms[1:]
+
+        totals: Dict[int, float] = {}
+        for term, scale in first.items():
+            postings = self._postings[term]
+            score = self._scorer(term, scale)
+            for number, frequency in postings.items():
+                doc = self._docs[number]
+                if types and doc[0] not in types:
+                    continue
+                value = score(frequency, doc[2])
+                if value > totals.get(number, 0):
+                    totals[number] = value
+
+        for terms in rest:
+            scorers = {term: self._scorer(term, scale) for term, scale in terms.items()}
+            matched: Dict[int, float] = {}
+            for number, total in totals.items():
+                doc = self._docs[number]
+                best = 0
+                for term in doc[3] if len(doc[3]) < len(terms) else terms:
+                    if term in scorers and number in self._postings[term]:
+                        best = max(best, scorers[term](self._postings[term][number], doc[2]))
+                if best:
+                    matched[number] = total + best
+            totals = matched
+            if not totals:
+                break
+        return totals
+
+    def search(self, query: str, types=None, limit: int = 20, prefix: bool = True) -> List[dict]:
+        """
+        Find documents containing every query term, best first. With prefix
+        set, the last term also matches longer words (e.g. "radi" finds
+        "radio"), slightly below an exact match.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        token_terms = [
+            self._query_terms(token, prefix and position == len(tokens) - 1)
+            for position, token in enumerate(tokens)
+        ]
+        if not all(token_terms):
+            return []
+
+        if len(token_terms) == 1:
+            totals = self._top_for_terms(token_terms[0], types, limit)
+        else:
+            totals = self._intersect(token_terms, types)
+        best = heapq.nlargest(limit, totals.items(), key=lambda item: item[1])
+        return [{**self._docs[number][4], "score": round(score, 4)} for number, score in best]
+
+    async def build(self, db):
+        """Index every searchable document in the database."""
+        started = time.perf_counter()
+        for source in self.sources.values():
+            projection = {"_id": 0, "id": 1, source.title: 1, **{name: 1 for name in source.fields}}
+            projection.update({name: 1 for name in (*source.display, *source.filter)})
+            count = 0
+            async for doc in db[source.collection].find(source.filter, projection):
+                self.upsert(source.type, doc)
+                count += 1
+                if count % 1000 == 0:
+                    await asyncio.sleep(0)  # Let requests through while a large catalog loads
+        self.ready = True
+        logger.info(
+            "Search index built: %s documents, %s terms in %.2fs",
+            len(self._docs), len(self._terms), time.perf_counter() - started
+        )
+
+    async def _maintain(self, db):
+        await self.build(db)
+        while SEARCH_REBUILD_INTERVAL > 0:
+            await asyncio.sleep(SEARCH_REBUILD_INTERVAL)
+            try:
+                fresh = SearchIndex(self.sources.values())
+                await fresh.build(db)
+            except Exception:
+                logger.exception("Search index rebuild failed")
+                continue
+            # Swap the new postings in; this process's index keeps answering meanwhile
+            for name in ("_postings", "_terms", "_docs", "_numbers", "_next_number", "_total_length",
+                         "_ranked_cache", "_prefix_cache"):
+                setattr(self, name, getattr(fresh, name))
+
+    def start(self, db):
+        """Build the index in the background (and rebuild it periodically if configured)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintain(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def index_document(self, collection: str, doc: Optional[dict]):
+        """Update the index after a document in a searchable collection was written."""
+        source = SOURCES_BY_COLLECTION.get(collection)
+        if source is not None and doc is not None:
+            self.upsert(source.type, doc)
+
+    def stats(self):
+        """Get index metrics."""
+        return {"ready": self.ready, "documents": len(self._docs), "terms": len(self._terms)}
+
+
+search_index = SearchIndex()
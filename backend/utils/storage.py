@@ -0,0 +1,349 @@
+"""
+File storage backends for itsyourradio.
+Uploads, derived files (waveform peaks, image variants) and blobs are
+addressed by a key that mirrors their old public_html path, e.g.
+"station/music/<artist>/<album>/<file>" or "uploads/blobs/ab/cd/<sha256>.png".
+The local backend keeps them under public_html as before; the S3 backend
+puts them in an S3-compatible bucket (AWS, MinIO, R2, ...) so media no
+longer has to live on the web node. Set STORAGE_BACKEND=s3 to use it.
+"""
+
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from utils.uploads import PUBLIC_HTML_DIR, UPLOAD_CHUNK_SIZE, StoredUpload, save_upload, upload_too_large
+
+# Backend selection
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+
+# Local directory for files on their way into (or copied out of) remote storage
+STORAGE_STAGING_DIR = Path(os.environ.get("STORAGE_STAGING_DIR", "storage_staging"))
+
+# S3-compatible object store settings
+S3_BUCKET = os.environ.get("S3_BUCKET")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # Leave unset for AWS
+S3_REGION = os.environ.get("S3_REGION", "us-east-1")
+S3_KEY_PREFIX = os.environ.get("S3_KEY_PREFIX", "")
+S3_PART_SIZE = max(5 * 1024 * 1024, int(os.environ.get("S3_PART_SIZE", 16 * 1024 * 1024)))  # S3 minimum is 5 MB
+S3_UPLOAD_CONCURRENCY = int(os.environ.get("S3_UPLOAD_CONCURRENCY", 4))
+S3_PRESIGN_EXPIRES = int(os.environ.get("S3_PRESIGN_EXPIRES", 3600))
+
+
+@dataclass
+class ObjectInfo:
+    """Size and modification time of a stored file."""
+    size: int
+    modified: float  # Unix timestamp
+    sha256: Optional[str] = None  # When the store keeps a checksum
+
+
+class LocalStorage:
+    """Stores files under the public_html tree on this machine."""
+
+    remote = False
+
+    def __init__(self, root: Path = PUBLIC_HTML_DIR, staging_dir: Optional[Path] = None):
+        self.root = root
+        # Same filesystem as the root, so staged files are renamed into place
+        self.staging_dir = staging_dir or root / ".staging"
+
+    def path(self, key: str) -> Path:
+        """Local path of a stored file."""
+        return self.root / key
+
+    async def save(self, file: UploadFile, key: str, max_size: int) -> StoredUpload:
+        """Stream an upload into storage."""
+        return await save_upload(file, self.path(key), max_size)
+
+    def _move_in(self, source: Path, key: str):
+        dest = self.path(key)
+        if source.resolve() == dest.resolve():
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(source, dest)
+
+    async def put_file(self, source: Path, key: str):
+        """Move a finished local file into storage."""
+        await asyncio.to_thread(self._move_in, source, key)
+
+    async def stat(self, key: str) -> Optional[ObjectInfo]:
+        """Get a stored file's size and mtime, or None if it doesn't exist."""
+        try:
+            stat = await asyncio.to_thread(os.stat, self.path(key))
+        except FileNotFoundError:
+            return None
+        return ObjectInfo(size=stat.st_size, modified=stat.st_mtime)
+
+    async def exists(self, key: str) -> bool:
+        """Whether a file is stored under a key."""
+        return await asyncio.to_thread(self.path(key).is_file)
+
+    async def delete(self, key: str):
+        """Delete a stored file if it exists."""
+        await asyncio.to_thread(self.path(key).unlink, missing_ok=True)
+
+    async def list(self, prefix: str) -> List[str]:
+        """Keys of the files in prefix's directory whose names start with the rest of prefix."""
+        directory, _, name = prefix.rpartition("/")
+
+        def scan():
+            try:
+                entries = os.scandir(self.root / directory)
+            except FileNotFoundError:
+                return []
+            with entries:
+                return [f"{directory}/{entry.name}" for entry in entries if entry.name.startswith(name) and entry.is_file()]
+
+        return await asyncio.to_thread(scan)
+
+    async def presigned_url(self, key: str, expires: int = S3_PRESIGN_EXPIRES) -> Optional[str]:
+        """Local files are served by us, so there is no presigned URL."""
+        return None
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        """Yield a local path holding the stored file (the file itself here)."""
+        yield self.path(key)
+
+
+class S3Storage:
+    """Stores files in an S3-compatible bucket, uploading large files in parallel parts."""
+
+    remote = True
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+        region: str = S3_REGION,
+        key_prefix: str = S3_KEY_PREFIX,
+        part_size: int = S3_PART_SIZE,
+        concurrency: int = S3_UPLOAD_CONCURRENCY,
+        staging_dir: Path = STORAGE_STAGING_DIR,
+    ):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        if not bucket:
+            raise RuntimeError("S3_BUCKET must be set to use S3 storage")
+        self.bucket = bucket
+        self.key_prefix = key_prefix.strip("/") + "/" if key_prefix.strip("/") else ""
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.staging_dir = staging_dir
+        # Credentials come from the usual AWS environment variables / config files
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=Config(
+                signature_version="s3v4",
+                max_pool_connections=max(10, concurrency * 2),
+                retries={"max_attempts": 5, "mode": "standard"},
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=part_size, multipart_chunksize=part_size, max_concurrency=concurrency
+        )
+
+    def _key(self, key: str) -> str:
+        return self.key_prefix + key
+
+    async def save(self, file: UploadFile, key: str, max_size: int) -> StoredUpload:
+        """
+        Stream an upload into the bucket. Small files are sent with a single
+        PUT; larger ones as a multipart upload whose parts are sent while the
+        request body is still arriving, a few at a time, so memory use is
+        bounded by part size x concurrency.
+        """
+        if file.size is not None and file.size > max_size:
+            raise upload_too_large(max_size)
+
+        digest = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        upload_id = None
+        part_number = 0
+        pending = set()
+        parts = []
+
+        async def send_part(number: int, body: bytes):
+            response = await asyncio.to_thread(
+                self.client.upload_part,
+                Bucket=self.bucket, Key=self._key(key), UploadId=upload_id, PartNumber=number, Body=body,
+            )
+            parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise upload_too_large(max_size)
+                await asyncio.to_thread(digest.update, chunk)
+                buffer += chunk
+
+                while len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        created = await asyncio.to_thread(
+                            self.client.create_multipart_upload,
+                            Bucket=self.bucket, Key=self._key(key), ContentType=_content_type(key),
+                        )
+                        upload_id = created["UploadId"]
+                    body, buffer = bytes(buffer[:self.part_size]), buffer[self.part_size:]
+                    part_number += 1
+                    pending.add(asyncio.create_task(send_part(part_number, body)))
+                    if len(pending) >= self.concurrency:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            task.result()
+
+            if upload_id is None:
+                await asyncio.to_thread(
+                    self.client.put_object,
+                    Bucket=self.bucket, Key=self._key(key), Body=bytes(buffer), ContentType=_content_type(key),
+                )
+            else:
+                if buffer:
+                    part_number += 1
+                    pending.add(asyncio.create_task(send_part(part_number, bytes(buffer))))
+                for task in asyncio.as_completed(pending):
+                    await task
+                pending = set()
+                await asyncio.to_thread(
+                    self.client.complete_multipart_upload,
+                    Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                    MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+                )
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if upload_id is not None:
+                await asyncio.to_thread(
+                    self.client.abort_multipart_upload, Bucket=self.bucket, Key=self._key(key), UploadId=upload_id
+                )
+            raise
+        finally:
+            await file.close()
+
+        return StoredUpload(path=Path(key), size=size, sha256=digest.hexdigest())
+
+    async def put_file(self, source: Path, key: str):
+        """Upload a finished local file (in parallel parts if it is large), then remove it."""
+        await asyncio.to_thread(
+            self.client.upload_file, str(source), self.bucket, self._key(key),
+            ExtraArgs={"ContentType": _content_type(key)}, Config=self.transfer_config,
+        )
+        await asyncio.to_thread(source.unlink, missing_ok=True)
+
+    async def stat(self, key: str) -> Optional[ObjectInfo]:
+        """Get a stored object's size and mtime, or None if it doesn't exist."""
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(
+                self.client.head_object, Bucket=self.bucket, Key=self._key(key), ChecksumMode="ENABLED"
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        checksum = head.get("ChecksumSHA256")
+        return ObjectInfo(
+            size=head["ContentLength"],
+            modified=head["LastModified"].timestamp(),
+            sha256=base64.b64decode(checksum).hex() if checksum else None,
+        )
+
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under a key."""
+        return await self.stat(key) is not None
+
+    async def delete(self, key: str):
+        """Delete a stored object (deleting a missing one is not an error)."""
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self._key(key))
+
+    async def list(self, prefix: str) -> List[str]:
+        """Keys of the objects starting with prefix."""
+        def scan():
+            keys = []
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+                keys.extend(item["Key"][len(self.key_prefix):] for item in page.get("Contents", []))
+            return keys
+
+        return await asyncio.to_thread(scan)
+
+    async def presigned_url(self, key: str, expires: int = S3_PRESIGN_EXPIRES) -> Optional[str]:
+        """A time-limited URL clients can GET the object from directly."""
+        return await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=expires,
+        )
+
+    async def presigned_put_url(self, key: str, sha256: str, expires: int = S3_PRESIGN_EXPIRES) -> Tuple[str, Dict[str, str]]:
+        """
+        A time-limited URL clients can PUT an object to directly, and the
+        headers they must send with it. The SHA-256 is part of the signature,
+        so the store rejects a body that doesn't match it.
+        """
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "put_object",
+            Params={
+                "Bucket": self.bucket, "Key": self._key(key),
+                "ContentType": _content_type(key), "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=expires,
+        )
+        return url, {"Content-Type": _content_type(key), "x-amz-checksum-sha256": checksum}
+
+    @asynccontextmanager
+    async def local_copy(self, key: str):
+        """
+        Download an object to a temp directory and yield its path. The file
+        keeps its original name, so files derived from it next to it (peaks,
+        image variants) get the same names they would have in storage.
+        """
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        directory = Path(tempfile.mkdtemp(dir=self.staging_dir, prefix="copy-"))
+        try:
+            path = directory / Path(key).name
+            await asyncio.to_thread(
+                self.client.download_file, self.bucket, self._key(key), str(path), Config=self.transfer_config
+            )
+            yield path
+        finally:
+            await asyncio.to_thread(shutil.rmtree, directory, True)
+
+
+def _content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def create_storage():
+    """Create the storage backend selected by STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(S3_BUCKET)
+    if STORAGE_BACKEND != "local":
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return LocalStorage()
+
+
+storage = create_storage()
@@ -0,0 +1,96 @@
+"""
+Cache of verified access tokens for itsyourradio.
+Dashboard pages fire many authenticated calls per view with the same
+token; caching the verified claims (keyed by a digest of the token, never
+the token itself) lets repeat requests skip signature verification.
+Entries never outlive the token's own expiry.
+The cache and its revocation list live in each worker process, so a
+revoked (logged out) token is only refused by the worker that revoked it;
+the others accept it until it expires, as they would without the cache.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Cache configuration
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 4096))
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 300))
+
+
+def token_digest(token: str) -> str:
+    """Digest a token for use as a cache key."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCache:
+    """Bounded LRU/TTL cache of verified token claims, with revocation."""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE, ttl: int = TOKEN_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (token_data, expires_at)
+        self._revoked = {}  # digest -> token expiry
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str):
+        """Get the cached claims for a token, or None if not cached."""
+        digest = token_digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        token_data, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[digest]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return token_data
+
+    def put(self, token: str, token_data, exp: Optional[float] = None):
+        """Cache verified claims until the token expires (if it does) or the TTL runs out."""
+        digest = token_digest(token)
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(exp, expires_at)
+        self._entries[digest] = (token_data, expires_at)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def is_revoked(self, token: str) -> bool:
+        """Check a freshly verified token against this process's revocation list."""
+        return token_digest(token) in self._revoked
+
+    def revoke(self, token: str, exp: Optional[float] = None):
+        """Revoke a single token (e.g. on logout) in this process until it expires."""
+        digest = token_digest(token)
+        self._entries.pop(digest, None)
+        # A token without an expiry stays valid, so it stays revoked
+        self._revoked[digest] = exp if exp is not None else float("inf")
+        self._prune_revoked()
+
+    def _prune_revoked(self):
+        now = time.time()
+        for digest in [digest for digest, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[digest]
+
+    def stats(self):
+        """Get hit-rate metrics."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revoked_tokens": len(self._revoked),
+        }
+
+
+token_cache = TokenCache()
@@ -0,0 +1,186 @@
+"""
+Streaming upload helpers for itsyourradio.
+Uploaded files are copied to disk in fixed-size chunks, hashed on the way
+through and atomically renamed into place, so memory use stays flat no
+matter how large the file is.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile, status
+
+# Root of the public web tree that uploads are written into
+PUBLIC_HTML_DIR = Path(os.environ.get("PUBLIC_HTML_DIR", "public_html"))
+
+# Size of each chunk copied from the request to disk
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+# Per-route upload size limits (in bytes)
+MAX_IMAGE_UPLOAD_SIZE = int(os.environ.get("MAX_IMAGE_UPLOAD_SIZE", 10 * 1024 * 1024))
+MAX_MUSIC_UPLOAD_SIZE = int(os.environ.get("MAX_MUSIC_UPLOAD_SIZE", 200 * 1024 * 1024))
+MAX_PODCAST_UPLOAD_SIZE = int(os.environ.get("MAX_PODCAST_UPLOAD_SIZE", 500 * 1024 * 1024))
+
+# Allowance for multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+@dataclass
+class StoredUpload:
+    """A file that has been written to its final location."""
+    path: Path  # Local path, or the storage key when it went to remote storage
+    size: int
+    sha256: str
+
+
+def upload_too_large(max_size: int):
+    """Build the error raised when an upload exceeds its size limit."""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large (limit is {max_size // (1024 * 1024)} MB)"
+    )
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    """Strip any directory components from a client-supplied filename."""
+    name = Path(filename or "").name
+    if name in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    return name
+
+
+def safe_path_segment(segment: str) -> str:
+    """Make a client-supplied name safe to use as a single directory name."""
+    cleaned = segment.replace("/", "_").replace("\\", "_").strip()
+    if cleaned in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="Invalid name")
+    return cleaned
+
+
+def _open_temp_file(directory: Path):
+    """Create the destination directory and a temp file inside it."""
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _write_chunk(buffer, digest, chunk: bytes):
+    """Hash and write one chunk (both release the GIL for large chunks)."""
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+def _commit_temp_file(buffer, temp_path: str, dest: Path):
+    """Flush the temp file to disk and atomically move it into place."""
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, dest)
+
+
+def _discard_temp_file(buffer, temp_path: str):
+    """Close and remove a partially written temp file."""
+    buffer.close()
+    try:
+        os.unlink(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_upload(file: UploadFile, dest: Path, max_size: int) -> StoredUpload:
+    """
+    Stream an uploaded file to dest in chunks.
+    The file is written to a temp file in the destination directory and
+    renamed into place only once it is complete, so readers never see a
+    partial file. All disk I/O runs off the event loop.
+    """
+    # Reject early when the size is already known
+    if file.size is not None and file.size > max_size:
+        raise upload_too_large(max_size)
+
+    buffer, temp_path = await asyncio.to_thread(_open_temp_file, dest.parent)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_size:
+                raise upload_too_large(max_size)
+
+            await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+
+        await asyncio.to_thread(_commit_temp_file, buffer, temp_path, dest)
+    except BaseException:
+        await asyncio.to_thread(_discard_temp_file, buffer, temp_path)
+        raise
+    finally:
+        await file.close()
+
+    return StoredUpload(path=dest, size=size, sha256=digest.hexdigest())
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Enforce per-route upload size limits before the body is parsed.
+    Requests whose Content-Length is over the limit are rejected straight
+    away; chunked requests are cut off as soon as they cross it.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        max_size = self.limits.get(scope["path"])
+        if max_size is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_body = max_size + MULTIPART_OVERHEAD
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body:
+            await self._reject(send, max_size)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    raise upload_too_large(max_size)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send, max_size: int):
+        error = upload_too_large(max_size)
+        body = ('{"detail":"%s"}' % error.detail).encode()
+        await send({
+            "type": "http.response.start",
+            "status": error.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,65 @@
+"""
+Cross-request cache of user documents for itsyourradio.
+Authorization checks need the current user on almost every request; a
+short-lived cache keeps that from costing a MongoDB round-trip each time.
+Handlers that change a user must call invalidate().
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+# Cache configuration
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 2048))
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 60))
+
+
+class UserCache:
+    """Bounded LRU/TTL cache of user documents keyed by user id."""
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl: int = USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (user, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str):
+        """Get a cached user document, or None if not cached."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def put(self, user_id: str, user: dict):
+        """Cache a user document."""
+        self._entries[user_id] = (user, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Drop a user so the next request reloads it."""
+        self._entries.pop(user_id, None)
+
+    def stats(self):
+        """Get hit-rate metrics."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+user_cache = UserCache()
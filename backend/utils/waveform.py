@@ -0,0 +1,241 @@
+"""
+Waveform peaks for itsyourradio.
+Audio is decoded once after upload (by ffmpeg, or directly for WAV) and
+reduced to int8 min/max pairs per bucket at a few fixed resolutions. The
+peaks are written to a small binary file next to the audio so players
+can draw a waveform without downloading the audio itself.
+"""
+
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import wave
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from fastapi import HTTPException, Request, Response
+
+from utils.storage import storage
+
+# Decoding settings
+WAVEFORM_SAMPLE_RATE = int(os.environ.get("WAVEFORM_SAMPLE_RATE", 11025))
+WAVEFORM_BASE_BUCKET = int(os.environ.get("WAVEFORM_BASE_BUCKET", 64))  # samples per finest bucket
+WAVEFORM_READ_SIZE = 1024 * 1024
+WAVEFORM_MAX_AGE = int(os.environ.get("WAVEFORM_MAX_AGE", 86400))
+
+# Bucket counts stored per file, finest first
+WAVEFORM_LEVELS = tuple(
+    sorted((int(level) for level in os.environ.get("WAVEFORM_LEVELS", "8192,2048,512").split(",")), reverse=True)
+)
+
+# Peaks file layout: header, then per level a bucket count and interleaved int8 (min, max) pairs
+PEAKS_MAGIC = b"IYRW"
+PEAKS_VERSION = 1
+_HEADER = struct.Struct("<4sBBHIIQ")  # magic, version, levels, reserved, sample rate, frames per base bucket, total frames
+_LEVEL = struct.Struct("<I")
+
+
+def peaks_path(audio_path: Path) -> Path:
+    """Where the peaks for an audio file are stored."""
+    return audio_path.with_name(audio_path.name + ".peaks")
+
+
+class PeakAccumulator:
+    """Reduces a stream of int16 samples to min/max per fixed-size bucket."""
+
+    def __init__(self, samples_per_bucket: int):
+        self.samples_per_bucket = samples_per_bucket
+        self.total_samples = 0
+        self._carry = np.empty(0, dtype=np.int16)
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+
+    def feed(self, samples: np.ndarray):
+        """Add samples; whole buckets are reduced immediately, the remainder is carried over."""
+        self.total_samples += len(samples)
+        if len(self._carry):
+            samples = np.concatenate((self._carry, samples))
+        whole = len(samples) - len(samples) % self.samples_per_bucket
+        if whole:
+            buckets = samples[:whole].reshape(-1, self.samples_per_bucket)
+            self._mins.append(buckets.min(axis=1))
+            self._maxs.append(buckets.max(axis=1))
+        self._carry = samples[whole:].copy()
+
+    def finish(self):
+        """Get (mins, maxs) as int8 arrays, including the final partial bucket."""
+        if len(self._carry):
+            self._mins.append(self._carry.min(keepdims=True))
+            self._maxs.append(self._carry.max(keepdims=True))
+            self._carry = np.empty(0, dtype=np.int16)
+        if not self._mins:
+            return np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int8)
+        mins = np.concatenate(self._mins) >> 8
+        maxs = np.concatenate(self._maxs) >> 8
+        return mins.astype(np.int8), maxs.astype(np.int8)
+
+
+def build_levels(mins: np.ndarray, maxs: np.ndarray, levels=WAVEFORM_LEVELS):
+    """Reduce the finest buckets to each level's bucket count, as interleaved min/max bytes."""
+    result = []
+    for count in levels:
+        if len(mins) > count:
+            edges = np.linspace(0, len(mins), count + 1).astype(np.int64)[:-1]
+            level_mins = np.minimum.reduceat(mins, edges)
+            level_maxs = np.maximum.reduceat(maxs, edges)
+        else:
+            level_mins, level_maxs = mins, maxs
+        pairs = np.empty(len(level_mins) * 2, dtype=np.int8)
+        pairs[0::2] = level_mins
+        pairs[1::2] = level_maxs
+        result.append(pairs.tobytes())
+    return result
+
+
+def write_peaks(path: Path, accumulator: PeakAccumulator, sample_rate: int, frames_per_bucket: int, total_frames: int):
+    """Atomically write a peaks file for the accumulated samples; returns the bucket count per level."""
+    levels = build_levels(*accumulator.finish())
+    parts = [_HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, len(levels), 0, sample_rate, frames_per_bucket, total_frames)]
+    for level in levels:
+        parts.append(_LEVEL.pack(len(level) // 2))
+        parts.append(level)
+
+    descriptor, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".peaks-")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(b"".join(parts))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return [len(level) // 2 for level in levels]
+
+
+def wav_peaks(audio_path: Path) -> dict:
+    """Compute peaks for a PCM WAV file without ffmpeg."""
+    with wave.open(str(audio_path), "rb") as audio:
+        channels, width, sample_rate = audio.getnchannels(), audio.getsampwidth(), audio.getframerate()
+        if width not in (1, 2, 4):
+            raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+        # Keep buckets the same length in time as the ffmpeg path; channels are interleaved
+        frames_per_bucket = max(1, round(WAVEFORM_BASE_BUCKET * sample_rate / WAVEFORM_SAMPLE_RATE))
+        accumulator = PeakAccumulator(frames_per_bucket * channels)
+        frames_per_read = max(1, WAVEFORM_READ_SIZE // (width * channels))
+        while True:
+            data = audio.readframes(frames_per_read)
+            if not data:
+                break
+            if width == 1:
+                samples = (np.frombuffer(data, dtype=np.uint8).astype(np.int16) - 128) << 8
+            elif width == 2:
+                samples = np.frombuffer(data, dtype="<i2")
+            else:
+                samples = (np.frombuffer(data, dtype="<i4") >> 16).astype(np.int16)
+            accumulator.feed(samples)
+
+    total_frames = accumulator.total_samples // channels
+    buckets = write_peaks(peaks_path(audio_path), accumulator, sample_rate, frames_per_bucket, total_frames)
+    return {"duration": round(total_frames / sample_rate, 3), "levels": buckets}
+
+
+async def ffmpeg_peaks(audio_path: Path, ffmpeg: str = "ffmpeg") -> dict:
+    """Compute peaks by streaming mono 16-bit PCM out of ffmpeg."""
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg, "-hide_banner", "-nostats", "-loglevel", "error", "-i", str(audio_path),
+        "-vn", "-ac", "1", "-ar", str(WAVEFORM_SAMPLE_RATE), "-f", "s16le", "-",
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    accumulator = PeakAccumulator(WAVEFORM_BASE_BUCKET)
+
+    # Drain stderr alongside stdout so a chatty ffmpeg can't fill the pipe and stall
+    tail = collections.deque(maxlen=20)
+
+    async def drain_stderr():
+        async for line in process.stderr:
+            tail.append(line.decode(errors="replace"))
+
+    drain = asyncio.create_task(drain_stderr())
+    try:
+        odd_byte = b""
+        while True:
+            data = await process.stdout.read(WAVEFORM_READ_SIZE)
+            if not data:
+                break
+            data = odd_byte + data
+            usable = len(data) - len(data) % 2
+            odd_byte = data[usable:]
+            accumulator.feed(np.frombuffer(data[:usable], dtype="<i2"))
+        await drain
+        return_code = await process.wait()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        drain.cancel()
+        raise
+
+    if return_code != 0:
+        raise RuntimeError(f"ffmpeg exited with {return_code}: {''.join(tail)[-500:].strip()}")
+    buckets = await asyncio.to_thread(
+        write_peaks, peaks_path(audio_path), accumulator,
+        WAVEFORM_SAMPLE_RATE, WAVEFORM_BASE_BUCKET, accumulator.total_samples
+    )
+    return {"duration": round(accumulator.total_samples / WAVEFORM_SAMPLE_RATE, 3), "levels": buckets}
+
+
+def read_peaks(path: Path, buckets: Optional[int] = None) -> dict:
+    """Load the level closest to (at least) the requested bucket count from a peaks file."""
+    with open(path, "rb") as file:
+        magic, version, level_count, _, sample_rate, _, total_frames = _HEADER.unpack(file.read(_HEADER.size))
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            raise ValueError("Not a peaks file")
+
+        levels = []
+        for _ in range(level_count):
+            (count,) = _LEVEL.unpack(file.read(_LEVEL.size))
+            levels.append((count, file.tell()))
+            file.seek(count * 2, os.SEEK_CUR)
+
+        # Levels are finest first: take the coarsest one that still has enough buckets
+        count, offset = levels[0]
+        if buckets:
+            for candidate in levels:
+                if candidate[0] >= buckets:
+                    count, offset = candidate
+        file.seek(offset)
+        peaks = np.frombuffer(file.read(count * 2), dtype=np.int8)
+
+    return {
+        "duration": round(total_frames / sample_rate, 3) if sample_rate else None,
+        "buckets": count,
+        "levels": [level[0] for level in levels],
+        "peaks": peaks.tolist(),  # Interleaved min, max per bucket, scaled to -128..127
+    }
+
+
+async def waveform_response(request: Request, audio_key: str, buckets: Optional[int]):
+    """Serve one level of a stored audio file's peaks as JSON, with an ETag for revalidation."""
+    key = peaks_path(Path(audio_key)).as_posix()
+    info = await storage.stat(key)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Waveform not available yet")
+
+    version = f"{info.size}-{info.modified}-{buckets or 0}"
+    etag = '"%s"' % hashlib.sha256(version.encode()).hexdigest()[:32]
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={WAVEFORM_MAX_AGE}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    async with storage.local_copy(key) as path:
+        waveform = await asyncio.to_thread(read_peaks, path, buckets)
+    return Response(
+        content=json.dumps(waveform, separators=(",", ":")),
+        media_type="application/json",
+        headers=headers
+    )
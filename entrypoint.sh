@@ -5,6 +5,13 @@ set -e
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
 echo "Starting FastAPI backend"
+# Let nginx send media files (see the /_media/ location in nginx.conf)
+export MEDIA_ACCEL_REDIRECT="${MEDIA_ACCEL_REDIRECT:-/_media/}"
+# Secret nginx checks direct-upload URLs against (see the /_upload/ location in nginx.conf)
+export DIRECT_UPLOAD_SECRET="${DIRECT_UPLOAD_SECRET:-$(head -c 32 /dev/urandom | base64 | tr -d '/+=')}"
+sed -i "s|__DIRECT_UPLOAD_SECRET__|$DIRECT_UPLOAD_SECRET|" /etc/nginx/nginx.conf
+mkdir -p direct_uploads/.tmp
+chown -R nobody direct_uploads
 # Start Uvicorn with proper host binding
 uvicorn server:app --host 0.0.0.0 --port 8001 &
 BACKEND_PID=$!
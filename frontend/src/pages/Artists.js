@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import axios from 'axios';
+import { fetchAllPages } from '../utils/pagination';
 
 const Artists = () => {
   const [artists, setArtists] = useState([]);
@@ -10,8 +10,7 @@ const Artists = () => {
   useEffect(() => {
     const fetchArtists = async () => {
       try {
-        const response = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/artists`);
-        setArtists(response.data);
+        setArtists(await fetchAllPages(`${process.env.REACT_APP_BACKEND_URL}/api/artists`));
       } catch (err) {
         console.error('Error fetching artists:', err);
         setError('Failed to load artists. Please try again later.');
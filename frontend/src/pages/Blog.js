@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import axios from 'axios';
+import { fetchAllPages } from '../utils/pagination';
 
 const Blog = () => {
   const [posts, setPosts] = useState([]);
@@ -10,8 +10,7 @@ const Blog = () => {
   useEffect(() => {
     const fetchPosts = async () => {
       try {
-        const response = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/blog`);
-        setPosts(response.data);
+        setPosts(await fetchAllPages(`${process.env.REACT_APP_BACKEND_URL}/api/blog`, { view: 'summary' }));
       } catch (err) {
         console.error('Error fetching blog posts:', err);
         setError('Failed to load blog posts. Please try again later.');
@@ -21,7 +20,7 @@ const Blog = () => {
           {
             id: '1',
             title: 'New Music Friday: Top Releases This Week',
-            content: 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. Phasellus ac magna non augue porttitor scelerisque ac id diam...',
+            excerpt: 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. Phasellus ac magna non augue porttitor scelerisque ac id diam...',
             author_id: '101',
             featured_image_url: 'https://images.unsplash.com/photo-1511379938547-c1f69419868d?ixlib=rb-1.2.1&auto=format&fit=crop&w=500&q=60',
             published_at: '2023-06-15T10:00:00Z',
@@ -33,7 +32,7 @@ const Blog = () => {
           {
             id: '2',
             title: 'Interview with Rising Star DJ MAXVS',
-            content: 'Nullam at quam ut lacus aliquam tempor vel sed ipsum. Donec pellentesque tincidunt imperdiet. Mauris sit amet justo vulputate...',
+            excerpt: 'Nullam at quam ut lacus aliquam tempor vel sed ipsum. Donec pellentesque tincidunt imperdiet. Mauris sit amet justo vulputate...',
             author_id: '102',
             featured_image_url: 'https://images.unsplash.com/photo-1571330735066-03aaa9429d89?ixlib=rb-1.2.1&auto=format&fit=crop&w=500&q=60',
             published_at: '2023-06-10T14:30:00Z',
@@ -45,7 +44,7 @@ const Blog = () => {
           {
             id: '3',
             title: 'The Evolution of Electronic Music: From Kraftwerk to Present',
-            content: 'Cras finibus convallis enim, at dignissim justo aliquam sed. Etiam augue massa, consequat id commodo in, pretium et velit...',
+            excerpt: 'Cras finibus convallis enim, at dignissim justo aliquam sed. Etiam augue massa, consequat id commodo in, pretium et velit...',
             author_id: '103',
             featured_image_url: 'https://images.unsplash.com/photo-1598488035139-bdbb2231ce04?ixlib=rb-1.2.1&auto=format&fit=crop&w=500&q=60',
             published_at: '2023-06-05T09:45:00Z',
@@ -120,7 +119,7 @@ const Blog = () => {
                     {posts[0].title}
                   </h2>
                   <p className="text-gray-300 mb-6 line-clamp-3">
-                    {posts[0].content.substring(0, 200)}...
+                    {posts[0].excerpt}
                   </p>
                   <div className="flex items-center">
                     <span className="text-purple-400">Read More</span>
@@ -168,7 +167,7 @@ const Blog = () => {
                     {post.title}
                   </h2>
                   <p className="text-gray-300 mb-4 line-clamp-2">
-                    {post.content.substring(0, 120)}...
+                    {post.excerpt}
                   </p>
                   <div className="flex items-center">
                     <span className="text-purple-400 text-sm">Read More</span>
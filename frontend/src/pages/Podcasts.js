@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import axios from 'axios';
+import { fetchAllPages } from '../utils/pagination';
 import { useMediaPlayer } from '../contexts/MediaPlayerContext';
 
 const PodcastCard = ({ podcast, onPlayEpisode }) => {
@@ -12,8 +12,9 @@ const PodcastCard = ({ podcast, onPlayEpisode }) => {
     if (!expanded) {
       setLoading(true);
       try {
-        const response = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/podcasts/${podcast.id}/episodes`);
-        setEpisodes(response.data);
+        setEpisodes(await fetchAllPages(
+          `${process.env.REACT_APP_BACKEND_URL}/api/podcasts/${podcast.id}/episodes`, { view: 'summary' }
+        ));
       } catch (err) {
         console.error('Error fetching episodes:', err);
         // For demo purposes, add some sample episodes
@@ -21,14 +22,14 @@ const PodcastCard = ({ podcast, onPlayEpisode }) => {
           {
             id: '101',
             title: 'Episode 1: Introduction',
-            description: 'The first episode introducing the show and its format.',
+            excerpt: 'The first episode introducing the show and its format.',
             published_at: '2023-01-15T12:00:00Z',
             duration: 1845 // 30:45
           },
           {
             id: '102',
             title: 'Episode 2: Special Guest Interview',
-            description: 'An interview with a special guest in the industry.',
+            excerpt: 'An interview with a special guest in the industry.',
             published_at: '2023-02-01T12:00:00Z',
             duration: 3600 // 60:00
           }
@@ -103,7 +104,7 @@ const PodcastCard = ({ podcast, onPlayEpisode }) => {
                         </svg>
                       </button>
                     </div>
-                    <p className="text-sm text-gray-300 mt-1 line-clamp-2">{episode.description}</p>
+                    <p className="text-sm text-gray-300 mt-1 line-clamp-2">{episode.excerpt}</p>
                   </li>
                 ))}
               </ul>
@@ -136,16 +137,13 @@ const Podcasts = () => {
     const fetchPodcasts = async () => {
       try {
         // Get all podcasts
-        const response = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/podcasts`);
-        setPodcasts(response.data);
+        setPodcasts(await fetchAllPages(`${process.env.REACT_APP_BACKEND_URL}/api/podcasts`));
         
         // Get originals
-        const originalsResponse = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/podcasts/originals`);
-        setOriginals(originalsResponse.data);
+        setOriginals(await fetchAllPages(`${process.env.REACT_APP_BACKEND_URL}/api/podcasts/originals`));
         
         // Get classics
-        const classicsResponse = await axios.get(`${process.env.REACT_APP_BACKEND_URL}/api/podcasts/classics`);
-        setClassics(classicsResponse.data);
+        setClassics(await fetchAllPages(`${process.env.REACT_APP_BACKEND_URL}/api/podcasts/classics`));
       } catch (err) {
         console.error('Error fetching podcasts:', err);
         setError('Failed to load podcasts. Please try again later.');
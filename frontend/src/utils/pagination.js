@@ -0,0 +1,21 @@
+import axios from 'axios';
+
+// Largest page the API serves (MAX_PAGE_SIZE in backend/utils/pagination.py)
+const PAGE_SIZE = 200;
+
+/**
+ * Fetch every item of a paginated list endpoint, following the
+ * X-Next-Cursor header from page to page.
+ */
+export const fetchAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, {
+      params: { ...params, limit: PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'] || null;
+  } while (cursor);
+  return items;
+};
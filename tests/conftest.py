@@ -0,0 +1,22 @@
+"""
+Shared test setup: the backend modules import each other as top-level
+packages (utils, models, mongo), so its directory goes on the path, and
+the MongoDB client is created lazily against a URL that is never used.
+Tests that need a database get a mongomock one through the `db` fixture.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def db():
+    from mongomock_motor import AsyncMongoMockClient
+
+    return AsyncMongoMockClient()["itsyourradio_test"]
@@ -0,0 +1,105 @@
+import asyncio
+import io
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from utils import blobstore
+from utils.blobstore import BlobStore
+from utils.jobs import LocalBackend, job_queue
+from utils.storage import LocalStorage
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(500)
+
+
+@pytest.fixture
+def store(db, tmp_path, monkeypatch):
+    storage = LocalStorage(root=tmp_path)
+    writes = []
+    put_file = storage.put_file
+
+    async def counting_put_file(source, key):
+        writes.append(key)
+        await put_file(source, key)
+
+    monkeypatch.setattr(storage, "put_file", counting_put_file)
+    monkeypatch.setattr(blobstore, "storage", storage)
+    monkeypatch.setattr(blobstore, "BLOB_ORPHAN_GRACE", 0)  # Collect as soon as nothing refers to a blob
+    job_queue.db, job_queue.backend = db, LocalBackend()
+    return BlobStore(), storage, writes
+
+
+def put(store, db, data=IMAGE):
+    return store.put(db, UploadFile(file=io.BytesIO(data), filename="art.png"), 1024 * 1024, ".png")
+
+
+async def refs(db, path):
+    return (await db.blobs.find_one({"path": path}))["refs"]
+
+
+def test_same_bytes_are_written_once_and_referenced_twice(db, store):
+    blobs, storage, writes = store
+
+    async def scenario():
+        first = await put(blobs, db)
+        second = await put(blobs, db)
+        await blobs.acquire(db, first.url)
+        await blobs.acquire(db, second.url)
+        return first, second, await refs(db, first.path)
+
+    first, second, count = asyncio.run(scenario())
+    assert first.path == second.path
+    assert (first.created, second.created) == (True, False)
+    assert writes == [first.path]
+    assert count == 2
+    assert storage.path(first.path).read_bytes() == IMAGE
+    assert not any(storage.staging_dir.iterdir())
+
+
+def test_blob_is_deleted_only_after_the_last_release(db, store):
+    blobs, storage, _ = store
+
+    async def scenario():
+        blob = await put(blobs, db)
+        await blobs.acquire(db, blob.url)
+        await blobs.acquire(db, blob.url)
+        await blobs.release(db, blob.url)
+        kept = await blobs.collect(db, blob.path), storage.path(blob.path).exists()
+        await blobs.release(db, blob.url)
+        collected = await blobs.collect(db, blob.path), storage.path(blob.path).exists()
+        return kept, collected, await db.blobs.count_documents({})
+
+    kept, collected, records = asyncio.run(scenario())
+    assert kept == (False, True)
+    assert collected == (True, False)
+    assert records == 0
+
+
+def test_concurrent_release_and_acquire_keep_the_blob(db, store):
+    blobs, storage, _ = store
+
+    async def scenario():
+        blob = await put(blobs, db)
+        await blobs.acquire(db, blob.url)
+        # One document lets go while another picks the same blob up
+        await asyncio.gather(blobs.release(db, blob.url), blobs.acquire(db, blob.url))
+        return blob, await blobs.collect(db, blob.path), await refs(db, blob.path)
+
+    blob, collected, count = asyncio.run(scenario())
+    assert not collected
+    assert count == 1
+    assert storage.path(blob.path).exists()
+
+
+def test_track_moves_the_reference(db, store):
+    blobs, _, _ = store
+
+    async def scenario():
+        old = await put(blobs, db)
+        new = await put(blobs, db, IMAGE + b"new")
+        await blobs.acquire(db, old.url)
+        await blobs.track(db, old.url, new.url)
+        await blobs.track(db, new.url, new.url)
+        return await refs(db, old.path), await refs(db, new.path)
+
+    assert asyncio.run(scenario()) == (0, 1)
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import sys
+import types
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+import pytest
+import requests
+from fastapi import HTTPException
+from moto import mock_aws
+
+# server.py imports init_db from the old SQL backend, which can't be imported
+# outside it; these tests call the route functions and never run startup
+sys.modules.setdefault("utils.db_init", types.SimpleNamespace(init_db=lambda: None))
+
+import server  # noqa: E402
+from models import DirectUploadComplete, DirectUploadCreate, UploadKind  # noqa: E402
+from utils import direct_uploads  # noqa: E402
+from utils.jobs import LocalBackend, job_queue  # noqa: E402
+from utils.storage import LocalStorage, S3Storage  # noqa: E402
+
+ARTIST = {"id": "u1", "role": "artist", "username": "band", "email": "band@example.com"}
+DATA = b"ID3" + bytes(4093)
+
+
+@pytest.fixture
+def local(db, tmp_path, monkeypatch):
+    """Local storage, with nginx's secure_link location writing into a temp directory."""
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(direct_uploads, "storage", LocalStorage(root=tmp_path / "public_html"))
+    monkeypatch.setattr(direct_uploads, "DIRECT_UPLOAD_SECRET", "secret")
+    monkeypatch.setattr(direct_uploads, "DIRECT_UPLOAD_DIR", tmp_path / "direct_uploads")
+    (tmp_path / "direct_uploads").mkdir()
+    job_queue.db, job_queue.backend = db, LocalBackend()
+    return tmp_path
+
+
+def create(sha256: str = hashlib.sha256(DATA).hexdigest()):
+    request = DirectUploadCreate(kind=UploadKind.MUSIC, filename="song.mp3", total_size=len(DATA), sha256=sha256)
+    return server.create_direct_upload(request, current_user=ARTIST)
+
+
+def test_local_grant_is_a_signed_expiring_link(local):
+    grant = asyncio.run(create())
+    query = parse_qs(urlparse(grant.url).query)
+    assert urlparse(grant.url).path == "/_upload/" + grant.id
+    assert int(query["expires"][0]) == int((grant.expires_at - datetime(1970, 1, 1)).total_seconds())
+    assert grant.url == direct_uploads.sign_local_url(grant.id, int(query["expires"][0]))
+
+
+def test_expired_grant_is_rejected(local, db):
+    async def scenario():
+        grant = await create()
+        direct_uploads.staged_path(grant.id).write_bytes(DATA)
+        expired = datetime.utcnow() - timedelta(seconds=direct_uploads.DIRECT_UPLOAD_COMPLETE_GRACE + 60)
+        await db.direct_uploads.update_one({"id": grant.id}, {"$set": {"expires_at": expired}})
+        await server.complete_direct_upload(grant.id, None, current_user=ARTIST)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 410
+
+
+def test_sha_mismatch_is_refused_and_the_staged_file_removed(local, db):
+    async def scenario():
+        grant = await create()
+        staged = direct_uploads.staged_path(grant.id)
+        staged.write_bytes(b"x" * len(DATA))
+        with pytest.raises(HTTPException) as error:
+            await server.complete_direct_upload(grant.id, None, current_user=ARTIST)
+        upload = await db.direct_uploads.find_one({"id": grant.id})
+        return error.value, staged.exists(), upload["status"]
+
+    error, staged_exists, status = asyncio.run(scenario())
+    assert error.status_code == 409
+    assert not staged_exists
+    assert status == "uploading"  # The client may PUT the file again
+
+
+def test_completed_upload_registers_exactly_one_song(local, db):
+    async def scenario():
+        grant = await create()
+        direct_uploads.staged_path(grant.id).write_bytes(DATA)
+        details = DirectUploadComplete(title="Song")
+        result = await server.complete_direct_upload(grant.id, details, current_user=ARTIST)
+        with pytest.raises(HTTPException) as again:
+            await server.complete_direct_upload(grant.id, details, current_user=ARTIST)
+        return result, again.value, await db.songs.find({}, {"_id": 0}).to_list(10)
+
+    result, again, songs = asyncio.run(scenario())
+    assert again.status_code == 409
+    assert len(songs) == 1
+    assert songs[0]["file_path"] == result["path"] == "station/music/band/Singles/song.mp3"
+    assert (local / "public_html" / result["path"]).read_bytes() == DATA
+    assert not any((local / "direct_uploads").iterdir())
+
+
+def test_s3_presigned_put_and_completion(db, monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(server, "db", db)
+    job_queue.db, job_queue.backend = db, LocalBackend()
+
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="media")
+        monkeypatch.setattr(direct_uploads, "storage", S3Storage("media", endpoint_url=None))
+
+        async def scenario():
+            good = await create()
+            assert good.headers["x-amz-checksum-sha256"]
+            assert requests.put(good.url, data=DATA, headers=good.headers).status_code == 200
+            result = await server.complete_direct_upload(good.id, None, current_user=ARTIST)
+
+            # An object that doesn't match the declared hash is refused even if the store kept no checksum
+            bad = await create(sha256="0" * 64)
+            requests.put(bad.url, data=DATA, headers=bad.headers)
+            with pytest.raises(HTTPException) as error:
+                await server.complete_direct_upload(bad.id, None, current_user=ARTIST)
+            return result, error.value
+
+        result, error = asyncio.run(scenario())
+    assert result["sha256"] == hashlib.sha256(DATA).hexdigest()
+    assert error.status_code == 409
@@ -0,0 +1,75 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from utils.etag import ETagMiddleware, body_etag
+
+app = FastAPI()
+app.add_middleware(ETagMiddleware, cache_control=[("/api/public/", "public, max-age=60")])
+
+
+@app.get("/api/public/items")
+async def items():
+    return [{"id": 1}]
+
+
+@app.get("/api/private")
+async def private():
+    return {"secret": True}
+
+
+@app.get("/api/tagged")
+async def tagged():
+    return JSONResponse({"id": 2}, headers={"ETag": '"route-etag"'})
+
+
+@app.get("/api/stream")
+async def stream():
+    async def chunks():
+        yield b"["
+        yield b"1]"
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+@app.get("/api/missing")
+async def missing():
+    raise HTTPException(status_code=404, detail="Not found")
+
+
+client = TestClient(app)
+
+
+def test_etag_and_304_on_if_none_match():
+    response = client.get("/api/public/items")
+    assert response.headers["etag"] == body_etag(response.content)
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+    cached = client.get("/api/public/items", headers={"If-None-Match": f'"other", W/{response.headers["etag"]}'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == response.headers["etag"]
+    assert cached.headers["cache-control"] == "public, max-age=60"
+
+    assert client.get("/api/public/items", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_route_etag_is_kept_and_authenticated_requests_are_private():
+    response = client.get("/api/tagged", headers={"Authorization": "Bearer token"})
+    assert response.headers["etag"] == '"route-etag"'
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert client.get("/api/tagged", headers={"If-None-Match": '"route-etag"'}).status_code == 304
+    assert client.get("/api/private").headers["cache-control"] == "no-cache"
+
+
+def test_streaming_and_error_responses_pass_through():
+    streamed = client.get("/api/stream")
+    assert streamed.content == b"[1]"
+    assert "etag" not in streamed.headers
+
+    missing = client.get("/api/missing", headers={"If-None-Match": "*"})
+    assert missing.status_code == 404
+    assert "etag" not in missing.headers
+
+
+def test_non_get_requests_are_untouched():
+    assert "etag" not in client.post("/api/public/items").headers
@@ -0,0 +1,22 @@
+import pytest
+
+from utils.excerpts import make_excerpt
+
+
+@pytest.mark.parametrize("text", [None, "", "   ", "<p> </p>"])
+def test_empty_bodies_have_no_excerpt(text):
+    assert make_excerpt(text) is None
+
+
+def test_short_body_is_kept_as_plain_text():
+    assert make_excerpt("<p>Hello&nbsp;<b>there</b> &amp;\n\n welcome</p>") == "Hello there & welcome"
+
+
+def test_long_body_is_cut_at_a_word_boundary():
+    excerpt = make_excerpt("The quick brown fox, jumps over the lazy dog", length=20)
+    assert excerpt == "The quick brown…"
+
+
+def test_long_word_is_cut_mid_word():
+    excerpt = make_excerpt("Supercalifragilisticexpialidocious indeed", length=10)
+    assert excerpt == "Supercalif…"
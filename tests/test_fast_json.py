@@ -0,0 +1,90 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional, Union
+
+import orjson
+import pytest
+from pydantic import BaseModel, Field, TypeAdapter, field_serializer
+
+from utils import fast_json
+from utils.fast_json import FastSerializer
+
+
+class Kind(str, Enum):
+    music = "music"
+    talk = "talk"
+
+
+class Credit(BaseModel):
+    name: str
+    share: float = 1.0
+
+
+class Track(BaseModel):
+    id: str
+    title: str
+    kind: Kind = Kind.music
+    duration: Optional[float] = None
+    plays: int = 0
+    tags: List[str] = Field(default_factory=list)
+    credits: List[Credit] = Field(default_factory=list)
+    created_at: datetime
+
+
+def rendered_by_pydantic(model, doc) -> bytes:
+    adapter = TypeAdapter(model)
+    return adapter.dump_json(adapter.validate_python(doc))
+
+
+@pytest.mark.parametrize("doc", [
+    {
+        "id": "t1", "title": "Song", "kind": "talk", "duration": 180, "plays": 4, "tags": ["a"],
+        "credits": [{"name": "Someone", "share": 1, "stray": True}], "created_at": datetime(2024, 1, 2, 3, 4, 5, 6000),
+        "_id": "mongo-id", "not_in_model": 1,
+    },
+    {"id": "t2", "title": "Sparse", "created_at": datetime(2024, 1, 2)},
+    {"id": "t3", "title": "Nulls", "duration": None, "created_at": datetime(2024, 1, 2)},
+])
+def test_dump_matches_pydantic(doc):
+    assert orjson.dumps(FastSerializer(Track).dump(doc)) == rendered_by_pydantic(Track, doc)
+
+
+def test_check_passes_for_supported_models():
+    FastSerializer(Track).check()
+
+
+def test_missing_required_field_is_an_error():
+    with pytest.raises(ValueError):
+        FastSerializer(Track).dump({"id": "t1", "created_at": datetime(2024, 1, 2)})
+
+
+def test_subset_renders_and_projects_only_its_fields():
+    serializer = FastSerializer(Track, ("id", "duration"))
+    assert serializer.projection == {"_id": 0, "id": 1, "duration": 1}
+    assert serializer.dump({"id": "t1", "title": "Song", "duration": 3}) == {"id": "t1", "duration": 3.0}
+
+
+def test_models_needing_validation_are_refused():
+    class Mixed(BaseModel):
+        value: Union[int, str]
+
+    class Custom(BaseModel):
+        value: int
+
+        @field_serializer("value")
+        def double(self, value):
+            return value * 2
+
+    for model in (Mixed, Custom):
+        with pytest.raises(TypeError):
+            FastSerializer(model)
+
+
+def test_field_selections_are_bounded(monkeypatch):
+    monkeypatch.setattr(fast_json, "FAST_JSON_SUBSET_CACHE_SIZE", 2)
+    monkeypatch.setattr(fast_json, "_subsets", fast_json.OrderedDict())
+    first = fast_json._subset(Track, ("id",))
+    fast_json._subset(Track, ("title",))
+    assert fast_json._subset(Track, ("id",)) is first  # Reuse keeps it recent
+    fast_json._subset(Track, ("plays",))
+    assert list(key[1] for key in fast_json._subsets) == [("id",), ("plays",)]
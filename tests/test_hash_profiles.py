@@ -0,0 +1,33 @@
+import asyncio
+
+from utils import hash_profiles
+from utils.indexes import ensure_indexes
+
+
+def test_calibrated_cost_is_stored_and_shared(db):
+    calls = []
+
+    async def calibrate(cost):
+        calls.append(cost)
+        return cost
+
+    async def scenario():
+        await ensure_indexes(db)
+        first = await hash_profiles.stored_cost(db, "bcrypt", lambda: calibrate(13))
+        # Another worker that would have calibrated differently gets the stored cost
+        second = await hash_profiles.stored_cost(db, "bcrypt", lambda: calibrate(11))
+        return first, second
+
+    assert asyncio.run(scenario()) == (13, 13)
+    assert calls == [13]
+
+
+def test_bcrypt_calibration_never_goes_below_the_floor(monkeypatch):
+    monkeypatch.setattr(hash_profiles, "_time_hash", lambda handler: 5000.0)  # A very slow or busy boot
+    assert hash_profiles.calibrate_bcrypt_rounds(budget_ms=250) == hash_profiles.BCRYPT_MIN_ROUNDS == 12
+
+
+def test_bcrypt_calibration_fits_the_budget(monkeypatch):
+    monkeypatch.setattr(hash_profiles, "_time_hash", lambda handler: 100.0)
+    # 100ms at 12 rounds, 200ms at 13, 400ms at 14
+    assert hash_profiles.calibrate_bcrypt_rounds(budget_ms=250) == 13
@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from models import JobStatus
+from utils.jobs import JobQueue, LocalBackend
+
+
+def test_sweep_requeues_running_jobs_only_past_their_timeout(db):
+    queue = JobQueue()
+
+    @queue.register("quick", timeout=60)
+    async def quick(db, payload):
+        pass
+
+    @queue.register("slow", timeout=3600)
+    async def slow(db, payload):
+        pass
+
+    async def scenario():
+        queue.db, queue.backend = db, LocalBackend()
+        now = datetime.utcnow()
+        started = now - timedelta(minutes=30)
+        await db.jobs.insert_many([
+            {"id": "quick-1", "type": "quick", "status": JobStatus.RUNNING, "started_at": started, "run_after": started},
+            {"id": "slow-1", "type": "slow", "status": JobStatus.RUNNING, "started_at": started, "run_after": started},
+        ])
+        await queue.sweep()
+        return {job["id"]: job["status"] async for job in db.jobs.find()}
+
+    statuses = asyncio.run(scenario())
+    assert statuses["quick-1"] == JobStatus.QUEUED  # Dead worker: run again
+    assert statuses["slow-1"] == JobStatus.RUNNING  # Still within its hour
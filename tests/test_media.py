@@ -0,0 +1,122 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, Request
+
+from utils import media
+from utils.jobs import LocalBackend, job_queue
+from utils.media import media_file_details, parse_range, record_media_file
+from utils.media_jobs import apply_media_details, enqueue_media_jobs
+from utils.uploads import StoredUpload
+
+PATH = "station/music/artist/album/track.mp3"
+
+
+def upload(sha256: str) -> StoredUpload:
+    return StoredUpload(path=Path(PATH), size=1234, sha256=sha256)
+
+
+async def upload_and_process(db, stored: StoredUpload, duration: float = 181.5):
+    """What an upload route does, with the probe job's result applied when it is first queued."""
+    generation = await record_media_file(db, PATH, stored)
+    before = await db.jobs.count_documents({})
+    jobs = await enqueue_media_jobs(PATH, stored, generation, "u1")
+    if await db.jobs.count_documents({}) > before:
+        await apply_media_details(db, PATH, {"duration": duration, "bitrate": 320000, "sample_rate": 44100})
+    return jobs
+
+
+def test_reupload_of_same_bytes_keeps_details(db):
+    async def scenario():
+        job_queue.db, job_queue.backend = db, LocalBackend()
+        first = await upload_and_process(db, upload("a" * 64))
+        second = await upload_and_process(db, upload("a" * 64))
+        assert first == second  # Same content: the existing jobs are returned, nothing runs again
+        return await media_file_details(db, PATH)
+
+    details = asyncio.run(scenario())
+    assert details["duration"] == 181.5
+    assert details["bitrate"] == 320000
+    assert details["file_size"] == 1234
+
+
+def test_upload_of_different_bytes_clears_details(db):
+    async def scenario():
+        job_queue.db, job_queue.backend = db, LocalBackend()
+        await upload_and_process(db, upload("a" * 64))
+        await record_media_file(db, PATH, upload("b" * 64))
+        return await media_file_details(db, PATH)
+
+    details = asyncio.run(scenario())
+    assert details["duration"] is None
+    assert details["mime_type"] == "audio/mpeg"
+
+
+def test_returning_to_earlier_bytes_processes_them_again(db):
+    async def scenario():
+        job_queue.db, job_queue.backend = db, LocalBackend()
+        first = await upload_and_process(db, upload("a" * 64), duration=1.0)
+        await upload_and_process(db, upload("b" * 64), duration=2.0)
+        third = await upload_and_process(db, upload("a" * 64), duration=1.0)
+        assert set(first.values()).isdisjoint(third.values())  # A's old finished jobs aren't reused
+        return await media_file_details(db, PATH)
+
+    details = asyncio.run(scenario())
+    assert details["duration"] == 1.0
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-200", (800, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    (None, None),
+    ("", None),
+    ("items=0-10", None),
+    ("bytes=0-10,20-30", None),
+    ("bytes=abc-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=500-100"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(HTTPException) as error:
+        parse_range(header, 1000)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == "bytes */1000"
+
+
+def media_request(path: str, **headers) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": path, "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_accel_redirect_uses_nginx_etag(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "MEDIA_ACCEL_REDIRECT", "/_media/")
+    monkeypatch.setattr(media, "PUBLIC_HTML_DIR", tmp_path)
+    file = tmp_path / "uploads" / "song.mp3"
+    file.parent.mkdir()
+    file.write_bytes(b"x" * 3000)
+    stat = os.stat(file)
+    nginx_etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+    async def scenario():
+        await db.media_files.insert_one({"path": "uploads/song.mp3", "size": 3000, "sha256": "a" * 64})
+        redirected = await media.media_response(
+            media_request("/uploads/song.mp3", range="bytes=100-", if_range=nginx_etag), db, "uploads/song.mp3"
+        )
+        cached = await media.media_response(media_request("/uploads/song.mp3", if_none_match=nginx_etag), db, "uploads/song.mp3")
+        return redirected, cached
+
+    redirected, cached = asyncio.run(scenario())
+    # nginx answers the range itself, comparing If-Range with this same ETag
+    assert redirected.headers["x-accel-redirect"] == "/_media/uploads/song.mp3"
+    assert redirected.headers["etag"] == nginx_etag
+    assert cached.status_code == 304
@@ -0,0 +1,70 @@
+import struct
+import wave
+
+from utils.media_probe import probe_media
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo, no padding: 417-byte frames
+MP3_FRAME = b"\xFF\xFB\x90\x00" + bytes(413)
+
+
+def id3v2_tag(size: int) -> bytes:
+    synchsafe = bytes((size >> shift) & 0x7F for shift in (21, 14, 7, 0))
+    return b"ID3\x04\x00\x00" + synchsafe + bytes(size)
+
+
+def test_wav(tmp_path):
+    path = tmp_path / "tone.wav"
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(8000)
+        file.writeframes(bytes(16000))
+
+    info = probe_media(path)
+    assert info.mime_type == "audio/wav"
+    assert info.duration == 1.0
+    assert info.bitrate == 128
+    assert info.sample_rate == 8000
+
+
+def test_constant_bitrate_mp3_after_id3_tag(tmp_path):
+    path = tmp_path / "track.mp3"
+    path.write_bytes(id3v2_tag(300) + MP3_FRAME * 100)
+
+    info = probe_media(path)
+    assert info.mime_type == "audio/mpeg"
+    assert info.bitrate == 128
+    assert info.sample_rate == 44100
+    assert info.duration == round(417 * 100 * 8 / 128000, 3)
+
+
+def test_flac(tmp_path):
+    sample_rate, total_samples = 48000, 48000 * 3
+    packed = (sample_rate << 44) | (1 << 41) | (15 << 36) | total_samples
+    streaminfo = bytes(10) + packed.to_bytes(8, "big") + bytes(16)
+    path = tmp_path / "track.flac"
+    path.write_bytes(b"fLaC" + b"\x80" + struct.pack(">I", 34)[1:] + streaminfo + bytes(1000))
+
+    info = probe_media(path)
+    assert info.mime_type == "audio/flac"
+    assert info.duration == 3.0
+    assert info.sample_rate == 48000
+
+
+def test_unrecognized_file_falls_back_to_extension(tmp_path):
+    path = tmp_path / "broken.mp3"
+    path.write_bytes(b"not audio at all" * 10)
+
+    info = probe_media(path)
+    assert info.mime_type == "audio/mpeg"
+    assert info.duration is None
+    assert info.bitrate is None
+
+
+def test_truncated_file_does_not_raise(tmp_path):
+    path = tmp_path / "short.ogg"
+    path.write_bytes(b"OggS")
+
+    info = probe_media(path)
+    assert info.mime_type == "audio/ogg"
+    assert info.duration is None
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from utils.now_playing import NowPlayingEngine
+
+
+class FakeStatusServer:
+    """Serves a status document the tests can swap out between polls."""
+
+    def __init__(self, document):
+        self.document = document
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server.document.encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def icecast_document(title, listeners=3):
+    return json.dumps({"icestats": {"source": [
+        {"listenurl": "http://radio:8000/other", "title": "Someone - Elsewhere", "listeners": 9},
+        {"listenurl": "http://radio:8000/stream", "title": title, "listeners": listeners, "bitrate": 128,
+         "server_type": "audio/mpeg", "server_name": "itsyourradio"},
+    ]}})
+
+
+@pytest.fixture
+def icecast():
+    server = FakeStatusServer(icecast_document("Artist One - First Song"))
+    yield server
+    server.stop()
+
+
+def test_icecast_snapshot_and_change_detection(icecast):
+    engine = NowPlayingEngine(status_url=icecast.url + "/status-json.xsl", server_type="icecast", mount="/stream", interval=1)
+    subscriber = engine.events.subscribe()
+
+    assert asyncio.run(engine.poll_once()) is True
+    assert engine.last_error is None
+    assert engine.now_playing["artist"] == "Artist One"
+    assert engine.now_playing["title"] == "First Song"
+    assert engine.now_playing["started_at"] is not None
+    assert engine.stream_info["status"] == "online"
+    assert engine.stream_info["listeners"] == 3
+    assert engine.stream_info["bitrate"] == "128kbps"
+
+    # Same track, more listeners: not a track change, but the stream info moves
+    icecast.document = icecast_document("Artist One - First Song", listeners=5)
+    assert asyncio.run(engine.poll_once()) is False
+    assert engine.stream_info["listeners"] == 5
+
+    icecast.document = icecast_document("Artist Two - Second Song", listeners=5)
+    assert asyncio.run(engine.poll_once()) is True
+    assert engine.now_playing["title"] == "Second Song"
+
+    # Unread events coalesce to the latest of each type
+    events = {event.type: json.loads(event.json)["data"] for event in asyncio.run(subscriber.next_events(timeout=0))}
+    assert events["now-playing"]["title"] == "Second Song"
+    assert events["stream"]["listeners"] == 5
+
+
+def test_shoutcast_snapshot():
+    server = FakeStatusServer(json.dumps({
+        "streamstatus": 1, "currentlisteners": 7, "bitrate": "192", "content": "audio/aacp",
+        "servertitle": "itsyourradio", "songtitle": "Band - Tune",
+    }))
+    try:
+        engine = NowPlayingEngine(status_url=server.url + "/stats?json=1", server_type="shoutcast", mount=None, interval=1)
+        assert asyncio.run(engine.poll_once()) is True
+    finally:
+        server.stop()
+
+    assert engine.now_playing["artist"] == "Band"
+    assert engine.now_playing["title"] == "Tune"
+    assert engine.stream_info["status"] == "online"
+    assert engine.stream_info["listeners"] == 7
+    assert engine.stream_info["format"] == "audio/aacp"
+
+
+def test_server_down_marks_the_stream_offline(icecast):
+    engine = NowPlayingEngine(status_url=icecast.url + "/status-json.xsl", server_type="icecast", mount="/stream", interval=1)
+    asyncio.run(engine.poll_once())
+    assert engine.stream_info["status"] == "online"
+
+    icecast.stop()
+    assert asyncio.run(engine.poll_once()) is True
+    assert engine.last_error
+    assert engine.stream_info["status"] == "offline"
+    assert engine.stream_info["listeners"] == 0
+    assert engine.now_playing["title"] is None
+    assert engine.stats()["last_error"] == engine.last_error
@@ -0,0 +1,70 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from utils.pagination import PageParams, decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(created_at, "abc")) == (created_at, "abc")
+    assert decode_cursor(encode_cursor(42, "abc")) == (42, "abc")
+    assert decode_cursor(encode_cursor(None, "abc")) == (None, "abc")
+    assert decode_cursor(encode_cursor(1.5, 7)) == (1.5, "7")
+    assert decode_cursor(encode_cursor("Title", "abc")) == ("Title", "abc")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "W10", encode_cursor(1, "x")[:-3]])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def forged(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+@pytest.mark.parametrize("payload", [
+    [["v", {"$gt": ""}], "x"],
+    [["v", True], "x"],
+    [["v", [1, 2]], "x"],
+    [["v", 1], {"$ne": None}],
+    [["v", 1], False],
+    [["d", 1700000000], "x"],
+    [["d", "yesterday"], "x"],
+    [["x", 1], "x"],
+])
+def test_forged_cursor_values_are_a_400(payload):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(forged(payload))
+    assert error.value.status_code == 400
+
+
+def test_nan_sort_value_is_a_400():
+    with pytest.raises(HTTPException):
+        decode_cursor(base64.urlsafe_b64encode(b'[["v",NaN],"x"]').decode())
+
+
+def test_pages_cover_every_item_once(db):
+    base = datetime(2024, 1, 1)
+    docs = [{"id": f"item-{i:02d}", "created_at": base + timedelta(minutes=i // 3)} for i in range(20)]
+    docs += [{"id": f"undated-{i}", "created_at": None} for i in range(3)]
+
+    async def scenario():
+        await db.items.insert_many([dict(doc) for doc in docs])
+        seen, cursor = [], None
+        while True:
+            items, cursor = await paginate(db.items, {}, PageParams(limit=4, cursor=cursor), projection={"_id": 0})
+            seen.extend(item["id"] for item in items)
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(scenario())
+    # Ties on created_at are broken by id, and undated items come last
+    expected = sorted((doc for doc in docs if doc["created_at"]), key=lambda doc: (doc["created_at"], doc["id"]), reverse=True)
+    assert seen == [doc["id"] for doc in expected] + ["undated-2", "undated-1", "undated-0"]
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from utils import auth
+
+
+def test_full_queue_is_rejected_with_503(monkeypatch):
+    monkeypatch.setattr(auth, "PASSWORD_HASH_QUEUE_LIMIT", 1)
+    release = threading.Event()
+
+    def slow_hash():
+        release.wait(5)
+        return "hashed"
+
+    async def scenario():
+        rejected_before = auth.password_hash_stats()["rejected"]
+        # Fill every worker and the one queue slot
+        busy = [asyncio.create_task(auth._run_password_job(slow_hash)) for _ in range(auth.PASSWORD_HASH_WORKERS + 1)]
+        await asyncio.sleep(0)
+        stats = auth.password_hash_stats()
+        with pytest.raises(HTTPException) as error:
+            await auth._run_password_job(slow_hash)
+        release.set()
+        results = await asyncio.gather(*busy)
+        return error.value, stats, results, auth.password_hash_stats()["rejected"] - rejected_before
+
+    error, stats, results, rejected = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == str(auth.PASSWORD_HASH_RETRY_AFTER)
+    assert stats["queue_depth"] == 1
+    assert results == ["hashed"] * (auth.PASSWORD_HASH_WORKERS + 1)
+    assert rejected == 1
+
+
+def test_hashing_runs_off_the_event_loop():
+    async def scenario():
+        hashed = await auth.get_password_hash_async("correct horse")
+        return hashed, await auth.verify_password_async("correct horse", hashed), await auth.verify_password_async("wrong", hashed)
+
+    _, good, bad = asyncio.run(scenario())
+    assert good and not bad
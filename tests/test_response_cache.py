@@ -0,0 +1,107 @@
+import asyncio
+from typing import List
+
+import fakeredis
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from utils.response_cache import ResponseCache
+
+
+class Item(BaseModel):
+    id: str
+    name: str
+
+
+def request(path: str = "/api/artists", query: bytes = b"") -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+
+async def fill(cache: ResponseCache, req: Request, name: str, tags=("artists",)):
+    """What a cached route does on a miss."""
+    return await cache.put(req, Response(), List[Item], [{"id": "1", "name": name}], tags)
+
+
+def test_hit_until_a_tag_is_invalidated():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024 * 1024, ttl=60)
+        assert await cache.get(request()) is None
+        await fill(cache, request(), "first", tags=("artists", "artist:1"))
+        hit = await cache.get(request(query=b""))
+        await cache.invalidate("artist:2")
+        still = await cache.get(request())
+        await cache.invalidate("artist:1")
+        return hit, still, await cache.get(request())
+
+    hit, still, gone = asyncio.run(scenario())
+    assert hit.body == b'[{"id":"1","name":"first"}]'
+    assert still is not None
+    assert gone is None
+
+
+def test_fill_started_before_an_invalidation_is_not_stored():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024 * 1024, ttl=60)
+        slow = request()
+        assert await cache.get(slow) is None  # Render starts from data read before the write
+        await cache.invalidate("artists")
+        served = await fill(cache, slow, "stale")
+        return served, await cache.get(request())
+
+    served, cached = asyncio.run(scenario())
+    assert b"stale" in served.body  # The request itself is still answered
+    assert cached is None
+
+
+def test_invalidation_history_is_bounded():
+    async def scenario():
+        cache = ResponseCache(max_bytes=1024 * 1024, ttl=60, invalidation_history=2)
+        early = request("/api/blog")
+        await cache.get(early)
+        for artist_id in range(10):
+            await cache.invalidate(f"artist:{artist_id}:posts")
+        # Renders that started before a forgotten invalidation can't be checked, so aren't cached
+        await fill(cache, early, "early", tags=("blog",))
+        skipped = await cache.get(request("/api/blog"))
+        late = request("/api/blog")
+        await cache.get(late)
+        await fill(cache, late, "late", tags=("blog",))
+        return cache, skipped, await cache.get(request("/api/blog"))
+
+    cache, skipped, cached = asyncio.run(scenario())
+    assert list(cache._invalidated) == ["artist:8:posts", "artist:9:posts"]
+    assert skipped is None
+    assert b"late" in cached.body
+
+
+def test_redis_tier_is_shared_and_invalidated_across_processes():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        first, second = ResponseCache(max_bytes=1024 * 1024, ttl=60), ResponseCache(max_bytes=1024 * 1024, ttl=60)
+        for cache in (first, second):
+            cache._redis = fakeredis.FakeAsyncRedis(server=server)
+            cache._listener = asyncio.create_task(cache._listen())
+        channel = "itsyourradio:responses:invalidate"
+        while (await first._redis.pubsub_numsub(channel))[0][1] < 2:  # Let the listeners subscribe
+            await asyncio.sleep(0.01)
+
+        await first.get(request())
+        await fill(first, request(), "shared")
+        from_redis = await second.get(request())
+        local = await second.get(request())
+
+        await first.invalidate("artists")
+        for _ in range(100):  # Delivered to the other process over pub/sub
+            if not second._entries:
+                break
+            await asyncio.sleep(0.01)
+        after = await second.get(request())
+        for cache in (first, second):
+            await cache.stop()
+        return from_redis, local, after, second.stats()
+
+    from_redis, local, after, stats = asyncio.run(scenario())
+    assert b"shared" in from_redis.body
+    assert local.headers["etag"] == from_redis.headers["etag"]
+    assert after is None
+    assert (stats["redis_hits"], stats["hits"]) == (1, 1)
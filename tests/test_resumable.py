@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+
+from utils import resumable
+from utils.resumable import (
+    create_part_file, discard_part_file, finalize_part_file, merge_ranges,
+    missing_ranges, part_file_path, received_bytes, write_chunk,
+)
+from utils.storage import LocalStorage
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(root=tmp_path / "public_html")
+    monkeypatch.setattr(resumable, "UPLOAD_SESSIONS_DIR", tmp_path / "sessions")
+    monkeypatch.setattr(resumable, "storage", storage)
+    return storage
+
+
+async def body(data: bytes, size: int = 1000):
+    """Stream data the way request.stream() does."""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_range_bookkeeping():
+    assert merge_ranges([[10, 20], [0, 5], [5, 8], [15, 30]]) == [[0, 8], [10, 30]]
+    assert missing_ranges([[10, 20], [0, 5]], 30) == [[5, 10], [20, 30]]
+    assert missing_ranges([], 30) == [[0, 30]]
+    assert missing_ranges([[0, 30]], 30) == []
+    assert received_bytes([[0, 10], [5, 15], [20, 25]]) == 20
+
+
+def test_out_of_order_chunks_are_assembled_and_finalized(storage):
+    chunks = [(4096, DATA[4096:8192]), (8192, DATA[8192:]), (0, DATA[:4096])]
+
+    async def scenario():
+        await create_part_file("s1", len(DATA))
+        ranges, progress = [], []
+        for offset, data in chunks:
+            written = await write_chunk("s1", offset, len(DATA), body(data))
+            ranges.append([offset, offset + written])
+            progress.append(missing_ranges(ranges, len(DATA)))
+        sha256 = await finalize_part_file("s1", "music/u1/song.mp3")
+        return progress, sha256
+
+    progress, sha256 = asyncio.run(scenario())
+    assert progress == [[[0, 4096], [8192, len(DATA)]], [[0, 4096]], []]
+    assert sha256 == hashlib.sha256(DATA).hexdigest()
+    assert storage.path("music/u1/song.mp3").read_bytes() == DATA
+    assert not part_file_path("s1").exists()
+
+
+def test_chunks_outside_the_upload_are_rejected(storage):
+    async def scenario():
+        await create_part_file("s2", 100)
+        errors = []
+        for offset, data in ((100, b"x"), (90, b"x" * 20)):
+            try:
+                await write_chunk("s2", offset, 100, body(data))
+            except HTTPException as error:
+                errors.append(error.status_code)
+        await discard_part_file("s2")
+        return errors
+
+    assert asyncio.run(scenario()) == [416, 416]
+    assert not part_file_path("s2").exists()
@@ -0,0 +1,64 @@
+import asyncio
+
+from utils.search import SearchIndex, tokenize
+
+
+def test_tokenize_folds_case_accents_and_markup():
+    assert tokenize("<p>Café  DEL Mar</p> — vol_2") == ["cafe", "del", "mar", "vol", "2"]
+    assert tokenize(None) == []
+
+
+def test_bm25_ranking():
+    index = SearchIndex()
+    index.upsert("song", {"id": "s1", "title": "Radio Radio"})
+    index.upsert("song", {"id": "s2", "title": "Radio Days And Nights Of Summer"})
+    index.upsert("song", {"id": "s3", "title": "Summer Nights"})
+    index.upsert("album", {"id": "a1", "title": "Static", "description": "A radio album"})
+
+    results = index.search("radio")
+    # More occurrences in a shorter field rank higher; a description match is weighted below a title
+    assert [result["id"] for result in results] == ["s1", "s2", "a1"]
+    assert results[0]["score"] > results[1]["score"] > results[2]["score"]
+    assert [result["id"] for result in index.search("summer nights")] == ["s3", "s2"]
+    assert [result["id"] for result in index.search("radio", types=["album"])] == ["a1"]
+
+
+def test_prefix_matches_rank_below_exact_ones():
+    index = SearchIndex()
+    index.upsert("song", {"id": "exact", "title": "Sun"})
+    index.upsert("song", {"id": "longer", "title": "Sunday"})
+
+    assert [result["id"] for result in index.search("sun")] == ["exact", "longer"]
+    assert [result["id"] for result in index.search("sun", prefix=False)] == ["exact"]
+    assert [result["id"] for result in index.search("sunda")] == ["longer"]
+
+
+def test_writes_are_visible_immediately():
+    index = SearchIndex()
+    index.index_document("songs", {"id": "s1", "title": "Old Title"})
+    assert [result["id"] for result in index.search("old")] == ["s1"]
+
+    index.index_document("songs", {"id": "s1", "title": "New Title"})
+    assert index.search("old") == []
+    assert index.search("new")[0]["title"] == "New Title"
+
+    # Unpublishing a post takes it out of the results
+    index.index_document("blog_posts", {"id": "p1", "title": "Launch", "is_published": True})
+    assert index.search("launch")
+    index.index_document("blog_posts", {"id": "p1", "title": "Launch", "is_published": False})
+    assert index.search("launch") == []
+
+
+def test_build_indexes_the_database(db):
+    async def scenario():
+        await db.users.insert_many([
+            {"id": "u1", "username": "dj_nova", "full_name": "Nova", "role": "artist"},
+            {"id": "u2", "username": "nova_listener", "role": "member"},
+        ])
+        index = SearchIndex()
+        await index.build(db)
+        return index
+
+    index = asyncio.run(scenario())
+    assert index.ready
+    assert [(result["type"], result["id"]) for result in index.search("nova")] == [("artist", "u1")]
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import io
+import os
+from urllib.parse import urlparse
+
+import boto3
+import pytest
+from fastapi import HTTPException, Request
+from moto import mock_aws
+from starlette.datastructures import UploadFile
+
+from utils import media
+from utils.storage import S3Storage
+
+PART_SIZE = 5 * 1024 * 1024  # The smallest part S3 accepts
+
+
+@pytest.fixture
+def s3(monkeypatch, tmp_path):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="media")
+        yield S3Storage("media", endpoint_url=None, key_prefix="radio", part_size=PART_SIZE,
+                        concurrency=2, staging_dir=tmp_path / "staging")
+
+
+def upload_file(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="upload.bin")
+
+
+def test_multipart_round_trip(s3):
+    data = os.urandom(2 * PART_SIZE + 12345)
+    stored = asyncio.run(s3.save(upload_file(data), "station/music/a/b/song.mp3", 50 * 1024 * 1024))
+
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    obj = s3.client.get_object(Bucket="media", Key="radio/station/music/a/b/song.mp3")
+    assert obj["Body"].read() == data
+    assert obj["ETag"].endswith('-3"')  # Two full parts and the remainder
+    assert obj["ContentType"] == "audio/mpeg"
+
+
+def test_small_file_is_a_single_put(s3):
+    stored = asyncio.run(s3.save(upload_file(b"tiny"), "uploads/note.txt", 1024))
+
+    assert stored.size == 4
+    obj = s3.client.get_object(Bucket="media", Key="radio/uploads/note.txt")
+    assert obj["Body"].read() == b"tiny"
+    assert "-" not in obj["ETag"]
+
+
+def test_oversize_upload_aborts_the_multipart_upload(s3):
+    data = os.urandom(3 * PART_SIZE)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(s3.save(upload_file(data), "station/music/a/b/big.mp3", 2 * PART_SIZE))
+
+    assert error.value.status_code == 413
+    assert s3.client.list_multipart_uploads(Bucket="media").get("Uploads", []) == []
+    assert asyncio.run(s3.stat("station/music/a/b/big.mp3")) is None
+
+
+def test_put_file_stat_and_presigned_url(s3, tmp_path):
+    source = tmp_path / "peaks.json"
+    source.write_bytes(b"[0, 1, 2]")
+
+    async def scenario():
+        await s3.put_file(source, "station/music/a/b/song.peaks")
+        return await s3.stat("station/music/a/b/song.peaks"), await s3.presigned_url("station/music/a/b/song.peaks", 60)
+
+    info, url = asyncio.run(scenario())
+    assert not source.exists()  # Removed once uploaded
+    assert info.size == 9
+    assert urlparse(url).path.endswith("/radio/station/music/a/b/song.peaks")
+    assert "X-Amz-Signature=" in url and "X-Amz-Expires=60" in url
+
+
+def test_remote_media_requests_redirect_to_the_bucket(s3, monkeypatch, db):
+    monkeypatch.setattr(media, "storage", s3)
+    request = Request({"type": "http", "method": "GET", "path": "/api/media/uploads/x.png", "query_string": b"", "headers": []})
+
+    response = asyncio.run(media.media_response(request, db, "uploads/x.png"))
+    assert response.status_code == 302
+    assert urlparse(response.headers["location"]).path.endswith("/radio/uploads/x.png")
+    assert response.headers["cache-control"].startswith("private")
@@ -0,0 +1,56 @@
+import asyncio
+import sys
+import types
+
+import pytest
+from fastapi import HTTPException
+
+# server.py imports init_db from the old SQL backend, which can't be imported
+# outside it; these tests call the route functions and never run startup
+sys.modules.setdefault("utils.db_init", types.SimpleNamespace(init_db=lambda: None))
+
+import server  # noqa: E402
+from utils.broadcast import Broadcaster  # noqa: E402
+
+
+@pytest.fixture
+def events(monkeypatch):
+    events = Broadcaster(max_subscribers=1)
+    monkeypatch.setattr(server.now_playing_engine, "events", events)
+    events.publish("now_playing", {"title": "Song"})
+    return events
+
+
+def test_subscription_lasts_as_long_as_the_stream(events):
+    async def scenario():
+        response = await server.stream_events()
+        before = events.stats()["subscribers"]  # Nothing is held until the response is sent
+        first = await response.body_iterator.__anext__()
+        during = events.stats()["subscribers"]
+        await response.body_iterator.aclose()
+        return before, first, during, events.stats()["subscribers"]
+
+    before, first, during, after = asyncio.run(scenario())
+    assert (before, during, after) == (0, 1, 0)
+    assert b"event: now_playing" in first
+
+
+def test_unsent_response_holds_no_subscription(events):
+    async def scenario():
+        await server.stream_events()  # e.g. the client went away before the body was sent
+        return events.stats()["subscribers"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_full_broadcaster_is_refused(events):
+    async def scenario():
+        listener = events.subscribe()
+        with pytest.raises(HTTPException) as error:
+            await server.stream_events()
+        events.unsubscribe(listener)
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "30"
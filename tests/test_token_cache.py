@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException, Request
+from jose import jwt
+
+from utils import auth
+from utils.auth import ALGORITHM, SECRET_KEY, create_access_token, get_current_user, revoke_token
+from utils.token_cache import TokenCache, token_cache, token_digest
+
+
+@pytest.fixture
+def user(db, monkeypatch):
+    monkeypatch.setattr(auth, "db", db)
+    asyncio.run(db.users.insert_one({"id": "u1", "role": "member", "username": "dj", "email": "dj@example.com"}))
+
+
+def current_user(token: str):
+    request = Request({"type": "http", "method": "GET", "path": "/api/users/me", "headers": []})
+    return asyncio.run(get_current_user(request, token))
+
+
+def test_cached_claims_never_outlive_the_token():
+    cache = TokenCache(ttl=300)
+    cache.put("short", "claims", time.time() - 1)
+    cache.put("long", "claims", time.time() + 3600)
+    assert cache.get("short") is None
+    assert cache._entries[token_digest("long")][1] <= time.time() + 300
+
+
+def test_token_without_exp_is_cached_for_the_ttl(user):
+    token = jwt.encode({"sub": "u1", "role": "member"}, SECRET_KEY, algorithm=ALGORITHM)
+    assert current_user(token)["id"] == "u1"
+    assert token_cache.get(token).user_id == "u1"
+    assert token_cache._entries[token_digest(token)][1] <= time.time() + token_cache.ttl
+
+    # With no expiry to wait for, a revoked token stays revoked
+    revoke_token(token)
+    token_cache._prune_revoked()
+    with pytest.raises(HTTPException) as error:
+        current_user(token)
+    assert error.value.status_code == 401
+
+
+def test_revoked_token_is_refused(user):
+    token = create_access_token({"sub": "u1", "role": "member"})
+    assert current_user(token)["id"] == "u1"
+    revoke_token(token)
+    with pytest.raises(HTTPException):
+        current_user(token)
@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import time
+import types
+
+import pytest
+from fastapi import HTTPException, Request
+
+# server.py imports init_db from the old SQL backend, which can't be imported
+# outside it; these tests call the route functions and never run startup
+sys.modules.setdefault("utils.db_init", types.SimpleNamespace(init_db=lambda: None))
+
+import server  # noqa: E402
+from models import UserUpdate  # noqa: E402
+from utils import auth  # noqa: E402
+from utils.auth import create_access_token, get_current_user, has_role  # noqa: E402
+from utils.user_cache import UserCache, user_cache  # noqa: E402
+
+ADMIN = {"id": "admin", "role": "admin", "username": "admin", "email": "admin@example.com"}
+
+
+@pytest.fixture
+def users(db, monkeypatch):
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(auth, "db", db)
+    user_cache._entries.clear()
+    asyncio.run(db.users.insert_one({"id": "u1", "role": "member", "username": "dj", "email": "dj@example.com"}))
+    return create_access_token({"sub": "u1", "role": "member"})
+
+
+def current_user(token: str):
+    """Resolve the user the way a fresh request does."""
+    request = Request({"type": "http", "method": "GET", "path": "/api/users/me", "headers": []})
+    return asyncio.run(get_current_user(request, token))
+
+
+def test_profile_update_evicts_the_cached_user(users):
+    user = current_user(users)
+    assert "full_name" not in user
+    assert "u1" in user_cache._entries
+
+    asyncio.run(server.update_user_profile(UserUpdate(full_name="DJ Nova"), current_user=user))
+    assert "u1" not in user_cache._entries
+    assert current_user(users)["full_name"] == "DJ Nova"
+
+
+def test_admin_update_evicts_the_cached_user(users):
+    assert current_user(users)["username"] == "dj"
+    asyncio.run(server.update_user("u1", UserUpdate(username="nova"), current_user=ADMIN))
+    assert current_user(users)["username"] == "nova"
+
+
+def test_role_change_takes_effect_once_evicted(db, users):
+    check = has_role(["artist"])
+    with pytest.raises(HTTPException):
+        asyncio.run(check(current_user=current_user(users)))
+
+    asyncio.run(db.users.update_one({"id": "u1"}, {"$set": {"role": "artist"}}))
+    assert current_user(users)["role"] == "member"  # Served from the cache until evicted
+    user_cache.invalidate("u1")
+    assert asyncio.run(check(current_user=current_user(users)))["role"] == "artist"
+
+
+def test_entries_expire_and_the_least_recent_is_evicted(monkeypatch):
+    cache = UserCache(max_size=2, ttl=60)
+    cache.put("a", {"id": "a"})
+    cache.put("b", {"id": "b"})
+    cache.get("a")
+    cache.put("c", {"id": "c"})
+    assert list(cache._entries) == ["a", "c"]
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,43 @@
+import asyncio
+import sys
+import textwrap
+
+import pytest
+
+from utils.waveform import WAVEFORM_SAMPLE_RATE, ffmpeg_peaks, read_peaks
+
+
+def fake_ffmpeg(tmp_path, script: str):
+    """An ffmpeg stand-in that runs the given Python code."""
+    path = tmp_path / "ffmpeg"
+    path.write_text(f"#!{sys.executable}\nimport sys\n" + textwrap.dedent(script))
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_noisy_stderr_does_not_stall_the_decode(tmp_path):
+    # Far more log output than a pipe buffer holds, written before any audio
+    ffmpeg = fake_ffmpeg(tmp_path, f"""
+        for _ in range(20000):
+            sys.stderr.write("[mp3 @ 0x0] skipping junk\\n")
+        sys.stderr.flush()
+        sys.stdout.buffer.write(b"\\x00\\x40" * {WAVEFORM_SAMPLE_RATE})
+    """)
+    audio = tmp_path / "song.mp3"
+    audio.write_bytes(b"")
+
+    result = asyncio.run(asyncio.wait_for(ffmpeg_peaks(audio, ffmpeg), timeout=10))
+    assert result["duration"] == 1.0
+    assert read_peaks(tmp_path / "song.mp3.peaks")["duration"] == 1.0
+
+
+def test_failure_reports_the_end_of_stderr(tmp_path):
+    ffmpeg = fake_ffmpeg(tmp_path, """
+        for line in range(1000):
+            sys.stderr.write(f"line {line}\\n")
+        sys.exit(1)
+    """)
+    with pytest.raises(RuntimeError) as error:
+        asyncio.run(ffmpeg_peaks(tmp_path / "song.mp3", ffmpeg))
+    assert "exited with 1" in str(error.value)
+    assert str(error.value).endswith("line 999")